@@ -0,0 +1,346 @@
+import click
+import contextlib
+import datetime
+import functools
+import http.server
+import io
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+
+import matplotlib
+
+matplotlib.use("Agg")
+import joblib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+PAR_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(PAR_PATH, "src"))
+
+import data_transformation
+import instrumentation
+import modeling_and_evaluation as me
+import run_eda
+from utils import load_ucisepsis
+from synthetic_cohort import (
+    D_REFERENCE_FILENAMES,
+    fit_cohort_distribution,
+    iter_cohort_chunks,
+)
+
+RAW_TRAIN_NAME = "s41598-020-73558-3_sepsis_survival_primary_cohort.csv"
+RAW_TEST_NAME = "s41598-020-73558-3_sepsis_survival_study_cohort.csv"
+D_MODEL_FILENAME = os.path.join(PAR_PATH, "results/models/logistic_reg.pkl")
+D_RESULTS_FILENAME = os.path.join(PAR_PATH, "benchmarks/results/benchmark_results.csv")
+DEFAULT_SIZES = "10000,100000,1000000,10000000"
+TEST_FRACTION = 0.17  # study cohort size relative to the primary cohort
+RANDOM_STATE = 15
+STAGES = [
+    "load_ucisepsis",
+    "clean_data",
+    "compute_descriptive_stats",
+    "univariate_figure",
+    "multivariate_figure",
+    "corr_heatmap",
+    "model_training",
+    "classification_metrics",
+    "model_interpretation",
+]
+
+
+def build_fixture_archive(path, cohorts):
+    """
+    Writes a nested ZIP archive laid out like the UCI download.
+
+    Args:
+        path (str): Destination of the outer ZIP file.
+        cohorts (dict): Mapping of inner CSV file name to DataFrame.
+    """
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, "w", zipfile.ZIP_DEFLATED) as inner_zip:
+        for name, df in cohorts.items():
+            inner_zip.writestr(name, df.to_csv(index=False))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as outer_zip:
+        outer_zip.writestr(
+            "sepsis_survival_minimal_clinical_records.zip", inner.getvalue()
+        )
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves files without logging every request to stderr."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve_directory(directory):
+    """Serves a directory over HTTP on a free localhost port."""
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextlib.contextmanager
+def redirect_outputs(workdir):
+    """
+    Points every output path of the pipeline modules at a scratch directory.
+
+    Module-level path constants under the repository root are rewritten to
+    the same relative location under ``workdir``, and the working directory
+    is changed so that relative output paths land there too. Everything is
+    restored on exit, so a benchmark never overwrites real results.
+    """
+    patched = []
+    for module in (me, run_eda, data_transformation, instrumentation):
+        for name, value in list(vars(module).items()):
+            if name.isupper() and isinstance(value, str) and value.startswith(PAR_PATH):
+                new_value = os.path.join(workdir, os.path.relpath(value, PAR_PATH))
+                os.makedirs(os.path.dirname(new_value), exist_ok=True)
+                patched.append((module, name, value))
+                setattr(module, name, new_value)
+    for folder in ("results/figures", "results/tables", "results/models", "results/shap"):
+        os.makedirs(os.path.join(workdir, folder), exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+        for module, name, value in patched:
+            setattr(module, name, value)
+
+
+def measure(func, *args, **kwargs):
+    """
+    Runs ``func`` twice: once timed, once to measure its peak traced memory.
+
+    ``tracemalloc`` slows down Python-level code considerably, so the wall
+    time comes from a first run without tracing. Peak memory is then taken
+    from a second, traced run: the largest amount of memory allocated
+    through Python (including NumPy and pandas buffers) in this process
+    while ``func`` runs. Memory used by worker processes, e.g. the joblib
+    workers of a parallel search, is not included. Stages must therefore be
+    safe to repeat; they only rewrite their own outputs.
+
+    Returns:
+        tuple: ``(result, seconds, peak_mb)``, with the result of the timed run
+    """
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        plt.close("all")
+
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        plt.close("all")
+    return result, seconds, peak / 1024**2
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PAR_PATH,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_size(distribution, n_rows, stages, workdir):
+    """
+    Runs the selected stages on a synthetic cohort of ``n_rows`` records.
+
+    Returns:
+        list[dict]: One benchmark record per stage.
+    """
+    train_raw = pd.concat(
+        iter_cohort_chunks(distribution, n_rows, seed=RANDOM_STATE), ignore_index=True
+    )
+    test_raw = pd.concat(
+        iter_cohort_chunks(
+            distribution, max(int(n_rows * TEST_FRACTION), 1), seed=RANDOM_STATE + 1
+        ),
+        ignore_index=True,
+    )
+    raw_dir = os.path.join(workdir, "data/raw")
+    os.makedirs(raw_dir, exist_ok=True)
+    raw_train = os.path.join(raw_dir, RAW_TRAIN_NAME)
+    raw_test = os.path.join(raw_dir, RAW_TEST_NAME)
+    train_raw.to_csv(raw_train, index=False)
+    test_raw.to_csv(raw_test, index=False)
+    processed_train = os.path.join(workdir, "data/processed/sepsis_train.csv")
+    processed_test = os.path.join(workdir, "data/processed/sepsis_test.csv")
+
+    state = {}
+    steps = {
+        "load_ucisepsis": lambda: load_ucisepsis(
+            RAW_TRAIN_NAME, url=f"{state['url']}/archive.zip"
+        ),
+        "clean_data": lambda: data_transformation.clean_data.callback(
+            raw_train, raw_test, processed_train, processed_test
+        ),
+        "compute_descriptive_stats": lambda: run_eda.compute_descriptive_stats(
+            state["train_df"]
+        ),
+        "univariate_figure": lambda: run_eda.get_univariate_subplots(
+            state["train_df"], run_eda.UNIVARIATE_FILENAME, "png", False
+        ),
+        "multivariate_figure": lambda: run_eda.get_multivariate_subplots(
+            state["train_df"], run_eda.MULTIVARIATE_FILENAME, "png", False
+        ),
+        "corr_heatmap": lambda: run_eda.get_corr_heatmap(
+            state["train_df"],
+            run_eda.CORR_COLS,
+            run_eda.CORR_HEATMAP_FILENAME,
+            "png",
+            False,
+        ),
+        "model_training": lambda: state.__setitem__(
+            "model", me.model_training(state["X_train"], state["y_train"])
+        ),
+        "classification_metrics": lambda: me.classification_metrics(
+            state["model"], state["X_train"], state["X_test"],
+            state["y_train"], state["y_test"],
+        ),
+        "model_interpretation": lambda: me.model_interpretation(
+            state["model"], state["X_train"], state["X_test"]
+        ),
+    }
+
+    records = []
+    with serve_directory(workdir) as url, redirect_outputs(workdir):
+        state["url"] = url
+        build_fixture_archive(
+            os.path.join(workdir, "archive.zip"),
+            {RAW_TRAIN_NAME: train_raw, RAW_TEST_NAME: test_raw},
+        )
+        for stage in STAGES:
+            if stage not in stages:
+                continue
+            # Inputs are prepared outside of the measured call
+            needs_data = stage not in ("load_ucisepsis", "clean_data")
+            if needs_data and "train_df" not in state:
+                if not os.path.exists(processed_train):
+                    data_transformation.clean_data.callback(
+                        raw_train, raw_test, processed_train, processed_test
+                    )
+                state["train_df"] = pd.read_csv(processed_train)
+                (
+                    state["X_train"], state["X_test"], state["y_train"], state["y_test"]
+                ) = me.load_data(processed_train, processed_test)
+            if stage in ("classification_metrics", "model_interpretation"):
+                if "model" not in state:
+                    # Fall back to the committed model when training is skipped
+                    state["model"] = joblib.load(D_MODEL_FILENAME)
+
+            click.echo(f"[BENCHMARK] {stage} on {n_rows:,} rows...")
+            record = {"stage": stage, "n_rows": n_rows}
+            try:
+                _, seconds, peak_mb = measure(steps[stage])
+                record.update(
+                    status="ok",
+                    seconds=seconds,
+                    peak_mb=peak_mb,
+                    rows_per_sec=n_rows / seconds if seconds > 0 else np.nan,
+                    error="",
+                )
+            except (Exception, SystemExit) as e:
+                # A stage that breaks at this size is a result, not a crash
+                record.update(
+                    status="error",
+                    seconds=np.nan,
+                    peak_mb=np.nan,
+                    rows_per_sec=np.nan,
+                    error=f"{type(e).__name__}: {e}"[:200],
+                )
+            if record["status"] == "ok":
+                click.echo(
+                    f"[BENCHMARK] {stage}: {record['seconds']:.3f}s, "
+                    f"peak {record['peak_mb']:.1f} MB"
+                )
+            else:
+                click.echo(f"[BENCHMARK] {stage}: failed ({record['error']})")
+            records.append(record)
+    return records
+
+
+@click.command()
+@click.option(
+    "--sizes",
+    default=DEFAULT_SIZES,
+    show_default=True,
+    help="Comma-separated synthetic cohort sizes (rows in the train cohort)",
+)
+@click.option(
+    "--stages",
+    default=",".join(STAGES),
+    show_default=True,
+    help="Comma-separated stages to benchmark",
+)
+@click.option(
+    "--reference",
+    multiple=True,
+    default=D_REFERENCE_FILENAMES,
+    show_default=True,
+    help="Raw cohort CSV(s) whose joint distribution the synthetic cohorts follow",
+)
+@click.option(
+    "--output",
+    default=D_RESULTS_FILENAME,
+    show_default=True,
+    help="CSV file the benchmark records are appended to",
+)
+def main(sizes, stages, reference, output):
+    """Times each pipeline stage and records its peak memory on synthetic
+    cohorts of increasing size, appending the results to a CSV file."""
+    stages = [s.strip() for s in stages.split(",") if s.strip()]
+    unknown = sorted(set(stages) - set(STAGES))
+    if unknown:
+        raise click.BadParameter(f"Unknown stages {unknown}; choose from {STAGES}")
+    distribution = fit_cohort_distribution(reference)
+
+    run_info = {
+        "run_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "host": platform.node(),
+    }
+    for n_rows in (int(s) for s in sizes.split(",")):
+        with tempfile.TemporaryDirectory() as workdir:
+            records = run_size(distribution, n_rows, stages, workdir)
+        results = pd.DataFrame([{**run_info, **r} for r in records])
+        output_dir = os.path.dirname(output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        results.to_csv(
+            output, mode="a", index=False, header=not os.path.exists(output)
+        )
+        click.echo(f"Successfully appended benchmark results to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+SELECT scored.*,
+    1.0 / (1.0 + EXP(-scored.log_odds)) AS survival_probability
+FROM (
+  SELECT src.*,
+    2.9929255921953746
+    + (-1.068984650217961) * ((src."age" - 62.735254618707124) / 24.126696248327413)
+    + (-0.018064044747291726) * ((src."episode_number" - 1.34937933287358) / 0.7517951098137892)
+    + (-0.17849932623069037) * (CASE WHEN src."sex" = 'male' THEN 1.0 WHEN src."sex" IN ('female', 'male') THEN 0.0 END) AS log_odds
+  FROM "sepsis_cohort" AS src
+) AS scored;
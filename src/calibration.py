@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+
+CALIBRATION_BINS = 10
+RECALIBRATION_METHODS = ["platt", "isotonic"]
+
+
+def reliability_curve(y_true, y_prob, n_bins=CALIBRATION_BINS):
+    """
+    Bins predicted probabilities into equal-width bins in a single pass.
+
+    Each probability is mapped to its bin arithmetically and the counts,
+    predicted and observed totals of all bins are aggregated with one
+    ``np.bincount`` each.
+
+    Parameters
+    ----------
+    y_true : array-like
+        Binary outcomes.
+    y_prob : array-like
+        Predicted probabilities of the positive class.
+    n_bins : int, optional
+        Number of equal-width bins on [0, 1].
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per bin with ``lower``, ``upper``, ``n``, ``mean_predicted``
+        and ``observed_rate`` (NaN for empty bins).
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_prob = np.asarray(y_prob, dtype=np.float64)
+    bins = np.clip((y_prob * n_bins).astype(np.int64), 0, n_bins - 1)
+    n = np.bincount(bins, minlength=n_bins)
+    predicted = np.bincount(bins, weights=y_prob, minlength=n_bins)
+    observed = np.bincount(bins, weights=y_true, minlength=n_bins)
+    edges = np.arange(n_bins + 1) / n_bins
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return pd.DataFrame(
+            {
+                "bin": np.arange(n_bins),
+                "lower": edges[:-1],
+                "upper": edges[1:],
+                "n": n,
+                "mean_predicted": predicted / n,
+                "observed_rate": observed / n,
+            }
+        )
+
+
+def brier_score(y_true, y_prob):
+    """Mean squared difference between probabilities and outcomes."""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    return float(np.mean((np.asarray(y_prob, dtype=np.float64) - y_true) ** 2))
+
+
+def expected_calibration_error(curve):
+    """
+    Expected calibration error of a reliability curve.
+
+    Parameters
+    ----------
+    curve : pandas.DataFrame
+        Output of ``reliability_curve``.
+
+    Returns
+    -------
+    float
+        Bin-size weighted mean of ``|mean_predicted - observed_rate|``.
+    """
+    filled = curve[curve["n"] > 0]
+    gaps = (filled["mean_predicted"] - filled["observed_rate"]).abs()
+    return float((filled["n"] * gaps).sum() / filled["n"].sum())
+
+
+def calibration_summary(y_true, probabilities, n_bins=CALIBRATION_BINS):
+    """
+    Brier score, ECE and reliability curve of one or more sets of scores.
+
+    Parameters
+    ----------
+    y_true : array-like
+        Binary outcomes.
+    probabilities : dict
+        Mapping of a name (e.g. "uncalibrated") to predicted probabilities
+        of the positive class for the same rows.
+    n_bins : int, optional
+        Number of equal-width bins of the reliability curves.
+
+    Returns
+    -------
+    tuple of pandas.DataFrame
+        ``(summary, curves)``: one row per name with ``n``, ``brier_score``
+        and ``ece``, and the stacked reliability curves with a ``model``
+        column.
+    """
+    rows, curves = [], []
+    for name, y_prob in probabilities.items():
+        curve = reliability_curve(y_true, y_prob, n_bins)
+        rows.append(
+            {
+                "model": name,
+                "n": len(y_prob),
+                "brier_score": brier_score(y_true, y_prob),
+                "ece": expected_calibration_error(curve),
+            }
+        )
+        curve.insert(0, "model", name)
+        curves.append(curve)
+    return pd.DataFrame(rows), pd.concat(curves, ignore_index=True)
+
+
+def fit_recalibrator(decision, y_true, method="platt"):
+    """
+    Fits a mapping from the model's log-odds to calibrated probabilities.
+
+    Parameters
+    ----------
+    decision : array-like
+        Log-odds of the positive class, ideally out-of-fold.
+    y_true : array-like
+        Binary outcomes.
+    method : str, optional
+        "platt" fits a logistic regression on the log-odds, which amounts
+        to a new slope and intercept; "isotonic" fits a monotone
+        piecewise-linear map.
+
+    Returns
+    -------
+    dict
+        ``{"method": "platt", "slope", "intercept"}`` or
+        ``{"method": "isotonic", "x", "y"}`` with the knots of the map, as
+        accepted by ``model_artifacts.export_logistic``.
+
+    Raises
+    ------
+    ValueError
+        If `method` is unknown.
+    """
+    decision = np.asarray(decision, dtype=np.float64)
+    if method == "platt":
+        platt = LogisticRegression(penalty=None).fit(decision[:, None], y_true)
+        return {
+            "method": "platt",
+            "slope": float(platt.coef_[0, 0]),
+            "intercept": float(platt.intercept_[0]),
+        }
+    if method == "isotonic":
+        isotonic = IsotonicRegression(y_min=0, y_max=1, out_of_bounds="clip")
+        isotonic.fit(decision, y_true)
+        return {
+            "method": "isotonic",
+            "x": isotonic.X_thresholds_.astype(np.float64),
+            "y": isotonic.y_thresholds_.astype(np.float64),
+        }
+    raise ValueError(f"method must be one of {RECALIBRATION_METHODS}")
+
+
+def apply_recalibration(recalibrator, decision):
+    """
+    Calibrated probabilities of the positive class for the given log-odds.
+
+    Parameters
+    ----------
+    recalibrator : dict
+        Output of ``fit_recalibrator``.
+    decision : array-like
+        Log-odds of the positive class.
+
+    Returns
+    -------
+    numpy.ndarray
+        1D array of probabilities.
+    """
+    decision = np.asarray(decision, dtype=np.float64)
+    if recalibrator["method"] == "platt":
+        logit = recalibrator["slope"] * decision + recalibrator["intercept"]
+        return 1.0 / (1.0 + np.exp(-logit))
+    return np.interp(decision, recalibrator["x"], recalibrator["y"])
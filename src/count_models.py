@@ -0,0 +1,496 @@
+import click
+import hashlib
+import json
+import os
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+from sklearn.compose import make_column_transformer
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from model_artifacts import artifact_recalibrator, export_logistic, load_artifact
+from record_keys import pack, unique_keys, unpack
+from save_csv import save_csv
+
+# Features of the logistic pipeline, shared with modeling_and_evaluation
+NUMERIC_FEATURES = ["age", "episode_number"]
+CATEGORICAL_FEATURES = ["sex"]
+FEATURES = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+TARGET = "hospital_outcome"
+RANDOM_STATE = 15
+BOOTSTRAP_REPLICATES = 500
+BOOTSTRAP_LEVEL = 0.95
+
+
+def deduplicate_training_data(X, y):
+    """
+    Collapses repeated (features, target) rows into weighted unique rows.
+
+    With only a few low-cardinality features, the training cohort has far
+    fewer distinct rows than records. For estimators whose objective is a
+    sum over records, such as the logistic regression, fitting on the
+    distinct rows with their counts as sample weights gives the same model
+    as fitting on every record. Resampling estimators are not covered by
+    this: scikit-learn's forest bootstrap draws rows uniformly, so a random
+    forest needs its resampling drawn by count (see
+    ``record_bootstrap_forest``). Records are counted on their packed keys
+    (see record_keys); frames that cannot be packed go through pandas.
+
+    Args:
+        X (pd.DataFrame): Training feature matrix.
+        y (pd.Series): Target variable aligned with `X`.
+
+    Returns:
+        tuple: ``(X_unique, y_unique, counts)`` where ``counts`` is a NumPy
+        array with the number of records behind each unique row.
+    """
+    target = y.name if y.name is not None else TARGET
+    if sorted(X.columns) == sorted(FEATURES):
+        try:
+            keys = pack(X, outcome=y)
+        except (ValueError, TypeError):
+            pass
+        else:
+            keys, counts = unique_keys(keys)
+            unique = unpack(keys, outcome=True)
+            X_unique = unique[list(X.columns)].astype(X.dtypes.to_dict())
+            return X_unique, unique[TARGET].astype(y.dtype).rename(target), counts
+    records = pd.concat(
+        [X.reset_index(drop=True), y.rename(target).reset_index(drop=True)], axis=1
+    )
+    counts = records.value_counts(sort=False, dropna=False).reset_index(name="count")
+    return counts[list(X.columns)], counts[target], counts["count"].to_numpy()
+
+
+def build_count_table(X, y):
+    """
+    Summarizes a training set as record counts per (features, target) cell.
+
+    The features are discrete and low-cardinality, so this table is a
+    sufficient statistic for the logistic pipeline: fitting on it with the
+    counts as weights gives the same model as fitting on every record.
+
+    Args:
+        X (pd.DataFrame): Training feature matrix with the columns in FEATURES.
+        y (pd.Series): Target variable aligned with `X`.
+
+    Returns:
+        pd.DataFrame: One row per cell with the FEATURES, TARGET and ``count``
+        columns.
+    """
+    X_unique, y_unique, counts = deduplicate_training_data(X[FEATURES], y.rename(TARGET))
+    table = X_unique.assign(**{TARGET: y_unique.to_numpy()})
+    table["count"] = counts
+    return table
+
+
+def data_fingerprint(X, y):
+    """
+    SHA-256 of a batch's count table, independent of the record order.
+
+    Args:
+        X (pd.DataFrame): Feature matrix with the columns in FEATURES.
+        y (pd.Series): Target variable aligned with `X`.
+
+    Returns:
+        str: Hex digest.
+    """
+    table = build_count_table(X, y).sort_values(FEATURES + [TARGET])
+    return hashlib.sha256(table.to_csv(index=False).encode()).hexdigest()
+
+
+def merge_count_tables(*tables):
+    """
+    Merges count tables by adding the counts of matching cells.
+
+    Args:
+        *tables (pd.DataFrame): Outputs of ``build_count_table``.
+
+    Returns:
+        pd.DataFrame: The merged count table.
+    """
+    cells = FEATURES + [TARGET]
+    return (
+        pd.concat(tables, ignore_index=True)
+        .groupby(cells, sort=False, dropna=False)["count"]
+        .sum()
+        .reset_index()
+    )
+
+
+def fit_from_counts(counts, C=1.0, class_weight=None, max_iter=1000):
+    """
+    Fits the logistic regression pipeline from a count table alone.
+
+    Every step is fitted on the unique cells weighted by their counts: the
+    StandardScaler's mean and variance are the weighted moments, and the
+    logistic loss is the weighted sum over cells, so the result matches a
+    fit on the expanded records. ``class_weight="balanced"`` is resolved from
+    the weighted class totals for the same reason.
+
+    Args:
+        counts (pd.DataFrame): Count table, see ``build_count_table``.
+        C (float): Inverse regularization strength.
+        class_weight (dict or str, optional): None, "balanced" or a mapping of
+            class to weight.
+        max_iter (int): Maximum number of solver iterations.
+
+    Returns:
+        sklearn.pipeline.Pipeline: The fitted pipeline.
+    """
+    X_unique = counts[FEATURES]
+    y_unique = counts[TARGET]
+    weights = counts["count"].to_numpy()
+    if isinstance(class_weight, str) and class_weight == "balanced":
+        class_totals = counts.groupby(TARGET)["count"].sum()
+        class_weight = (weights.sum() / (len(class_totals) * class_totals)).to_dict()
+
+    preprocessor = make_column_transformer(
+        (StandardScaler(), NUMERIC_FEATURES),
+        (OneHotEncoder(drop="if_binary"), CATEGORICAL_FEATURES),
+    )
+    preprocessor.fit(X_unique)
+    preprocessor.named_transformers_["standardscaler"].fit(
+        X_unique[NUMERIC_FEATURES], sample_weight=weights
+    )
+    classifier = LogisticRegression(
+        C=C, class_weight=class_weight, max_iter=max_iter, random_state=RANDOM_STATE
+    )
+    classifier.fit(preprocessor.transform(X_unique), y_unique, sample_weight=weights)
+    return make_pipeline(preprocessor, classifier)
+
+
+def count_sources_path(counts_path):
+    """Path of the list of batches folded into the count table at `counts_path`."""
+    return f"{os.path.splitext(counts_path)[0]}_sources.json"
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def save_count_table(counts, fingerprints, counts_path):
+    """
+    Saves a count table with the fingerprints of the batches folded into it.
+
+    Both files are written to a temporary name and renamed into place. The
+    list of batches also holds the SHA-256 of the table it describes, so a
+    run interrupted between the two renames leaves a pair that
+    ``load_count_sources`` refuses instead of one that silently disagrees.
+
+    Args:
+        counts (pd.DataFrame): Count table, see ``build_count_table``.
+        fingerprints (list of str): ``data_fingerprint`` of every batch in
+            `counts`, written to ``count_sources_path(counts_path)``.
+        counts_path (str): Destination CSV file.
+    """
+    save_csv(counts, counts_path)
+    sources_path = count_sources_path(counts_path)
+    tmp_path = f"{sources_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(
+            {"batches": fingerprints, "counts_sha256": _file_digest(counts_path)},
+            f,
+            indent=2,
+        )
+    os.replace(tmp_path, sources_path)
+    click.echo(f"Successfully saved training count table as: {counts_path}")
+
+
+def load_count_sources(counts_path):
+    """
+    Fingerprints of the batches folded into the count table at `counts_path`.
+
+    Raises:
+        FileNotFoundError: If the table or its list of batches is missing.
+        ValueError: If the list was written for a different table, e.g.
+            after a run was interrupted between writing the two files.
+    """
+    with open(count_sources_path(counts_path)) as f:
+        sources = json.load(f)
+    if sources.get("counts_sha256") != _file_digest(counts_path):
+        raise ValueError(
+            f"The list of batches does not match {counts_path}, so it cannot "
+            "tell which records are counted; retrain the model to rebuild both"
+        )
+    return sources["batches"]
+
+
+def refit_from_counts(X_new, y_new, counts_path, model_path, artifact_path):
+    """
+    Merges a new batch into the stored count table and refits the model.
+
+    The hyperparameters found by the last ``model_training`` run are reused;
+    only the count table and the new batch are read, never the historical
+    records. A recalibration folded into the current artifact is carried
+    over unchanged to the refitted one (it was fitted on the previous
+    model's scores; run ``recalibrate`` to refit it). The merged table, the
+    pickled pipeline and the compact artifact are saved in place.
+
+    Args:
+        X_new (pd.DataFrame): Feature matrix of the new records.
+        y_new (pd.Series): Target variable aligned with `X_new`.
+        counts_path (str): Count table to update.
+        model_path (str): Pickled pipeline of the last ``model_training``
+            run, replaced by the refitted one.
+        artifact_path (str): Its compact artifact, replaced likewise.
+
+    Returns:
+        sklearn.pipeline.Pipeline: The refitted pipeline.
+
+    Raises:
+        FileNotFoundError: If there is no stored count table, list of its
+            batches, model or artifact.
+        ValueError: If the batch is already folded into the count table,
+            which would count its records twice, or if the table and its list
+            of batches disagree.
+    """
+    fingerprints = load_count_sources(counts_path)
+    fingerprint = data_fingerprint(X_new, y_new)
+    if fingerprint in fingerprints:
+        raise ValueError(
+            f"This batch is already folded into {counts_path}; refusing to "
+            "count its records twice"
+        )
+    counts = merge_count_tables(
+        pd.read_csv(counts_path), build_count_table(X_new, y_new)
+    )
+    click.echo(
+        f"[MODEL TRAINING] Merged {len(X_new)} new records -> "
+        f"{int(counts['count'].sum())} records in {len(counts)} cells"
+    )
+    params = joblib.load(model_path)[-1].get_params()
+    recalibrator = artifact_recalibrator(load_artifact(artifact_path))
+    clf = fit_from_counts(
+        counts,
+        C=params["C"],
+        class_weight=params["class_weight"],
+        max_iter=params["max_iter"],
+    )
+    save_count_table(counts, fingerprints + [fingerprint], counts_path)
+    joblib.dump(clf, model_path)
+    click.echo(f"Successfully saved model as: {model_path}")
+    export_logistic(clf, artifact_path, recalibrator)
+    click.echo(f"Successfully saved compact model as: {artifact_path}")
+    if recalibrator is not None:
+        click.echo(f"Carried over the {recalibrator['method']} recalibration")
+    return clf
+
+
+def coefficient_table(model):
+    """
+    Returns the logistic regression coefficients with readable feature names.
+
+    Args:
+        model (sklearn.pipeline.Pipeline): A fitted logistic pipeline.
+
+    Returns:
+        pd.DataFrame: A single row with one column per model feature
+        (e.g. ``age``, ``episode_number``, ``is_male``).
+    """
+    feature_names = model.named_steps["columntransformer"].get_feature_names_out()
+    clean_feature_names = []
+    for f in feature_names:
+        clean = f.replace("onehotencoder__", "").replace("standardscaler__", "")
+        # renaming sex_1
+        if clean == "sex_male":
+            clean_feature_names.append("is_male")
+        elif clean == "sex_female":
+            clean_feature_names.append("is_female")
+        else:
+            clean_feature_names.append(clean)
+
+    coeffs = model.named_steps["logisticregression"].coef_
+    return pd.DataFrame(dict(zip(clean_feature_names, coeffs[0])), index=[0])
+
+
+def _replicate_design(model, X, mean, scale):
+    """
+    Builds the design matrix of every replicate, shape (B, n, 1 + features).
+
+    Numeric columns are standardized with each replicate's own moments;
+    categorical columns use the one-hot encoding of the fitted `model`.
+    The first column is the intercept.
+    """
+    encoder = model.named_steps["columntransformer"].named_transformers_[
+        "onehotencoder"
+    ]
+    categorical = encoder.transform(X[CATEGORICAL_FEATURES])
+    if hasattr(categorical, "toarray"):
+        categorical = categorical.toarray()
+    numeric = X[NUMERIC_FEATURES].to_numpy(dtype=np.float64)
+    n_replicates, n_rows = len(mean), len(X)
+    return np.concatenate(
+        [
+            np.ones((n_replicates, n_rows, 1)),
+            (numeric[None] - mean[:, None]) / scale[:, None],
+            np.broadcast_to(categorical, (n_replicates,) + categorical.shape),
+        ],
+        axis=2,
+    )
+
+
+def fit_replicates(model, counts, weights, max_iter=100, tol=1e-10):
+    """
+    Fits one logistic regression per row of `weights` in a single batch.
+
+    Each replicate is the pipeline of `model` (same C and class_weight)
+    refitted on the count table with its own cell weights: the scaler
+    moments, the balanced class weights and the coefficients all use those
+    weights. The penalized log-likelihood is solved by Newton's method
+    (IRLS) on all replicates at once, stacking their design matrices and
+    Hessians, instead of one scikit-learn fit per replicate. With
+    ``weights = counts["count"]`` the result is the ``fit_from_counts``
+    model.
+
+    Args:
+        model (sklearn.pipeline.Pipeline): A fitted logistic pipeline.
+        counts (pd.DataFrame): Count table, see ``build_count_table``.
+        weights (np.ndarray): Cell weights of shape (B, len(counts)).
+        max_iter (int): Maximum number of Newton steps.
+        tol (float): Stop once no coefficient moves more than this.
+            A ``ConvergenceWarning`` is raised if `max_iter` steps do not
+            get there.
+
+    Returns:
+        dict: ``mean`` and ``scale`` of the numeric features, shape (B, k),
+        ``intercept`` of shape (B,) and ``coef`` of shape (B, features).
+    """
+    params = model.named_steps["logisticregression"].get_params()
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    y = counts[TARGET].to_numpy()
+    numeric = counts[NUMERIC_FEATURES].to_numpy(dtype=np.float64)
+
+    totals = weights.sum(axis=1, keepdims=True)
+    mean = weights @ numeric / totals
+    var = weights @ numeric**2 / totals - mean**2
+    # StandardScaler leaves constant columns unscaled
+    scale = np.where(var > 0, np.sqrt(np.clip(var, 0, None)), 1.0)
+
+    class_weight = params["class_weight"]
+    if isinstance(class_weight, str) and class_weight == "balanced":
+        classes = np.unique(y)
+        class_totals = np.stack([weights[:, y == c].sum(axis=1) for c in classes], 1)
+        per_class = totals / (len(classes) * class_totals)
+        sample_weight = weights * per_class[:, np.searchsorted(classes, y)]
+    elif class_weight:
+        sample_weight = weights * np.array([class_weight.get(c, 1.0) for c in y])
+    else:
+        sample_weight = weights
+    sample_weight = params["C"] * sample_weight
+
+    design = _replicate_design(model, counts, mean, scale)
+    n_params = design.shape[2]
+    # The intercept is not penalized
+    penalty = np.eye(n_params)
+    penalty[0, 0] = 0.0
+    beta = np.zeros((len(weights), n_params))
+    for _ in range(max_iter):
+        p = expit(np.einsum("bnd,bd->bn", design, beta))
+        residual = sample_weight * (p - y)
+        curvature = sample_weight * p * (1 - p)
+        gradient = np.einsum("bnd,bn->bd", design, residual) + beta @ penalty
+        hessian = (
+            np.einsum("bnd,bne->bde", design * curvature[..., None], design) + penalty
+        )
+        step = np.linalg.solve(hessian, gradient[..., None])[..., 0]
+        beta -= step
+        if np.abs(step).max() < tol:
+            break
+    else:
+        warnings.warn(
+            f"Newton's method did not converge in {max_iter} iterations; the "
+            f"largest coefficient step is still {np.abs(step).max():.3g}. "
+            "Increase max_iter.",
+            ConvergenceWarning,
+        )
+    return {"mean": mean, "scale": scale, "intercept": beta[:, 0], "coef": beta[:, 1:]}
+
+
+def bootstrap_logistic(
+    model, counts, n_replicates=BOOTSTRAP_REPLICATES, random_state=RANDOM_STATE
+):
+    """
+    Bootstrap replicates of the logistic pipeline from a count table.
+
+    Resampling N records with replacement only changes how often each
+    (features, target) cell occurs, so every replicate is drawn as a
+    multinomial reweighting of the cells and all of them are fitted
+    together by ``fit_replicates``.
+
+    Args:
+        model (sklearn.pipeline.Pipeline): The fitted logistic pipeline.
+        counts (pd.DataFrame): Count table of its training data.
+        n_replicates (int): Number of bootstrap replicates.
+        random_state (int): Seed of the resampling.
+
+    Returns:
+        dict: The replicates, see ``fit_replicates``.
+    """
+    cell_counts = counts["count"].to_numpy()
+    n_records = int(cell_counts.sum())
+    rng = np.random.default_rng(random_state)
+    weights = rng.multinomial(n_records, cell_counts / n_records, size=n_replicates)
+    return fit_replicates(model, counts, weights)
+
+
+def coefficient_intervals(model, replicates, level=BOOTSTRAP_LEVEL):
+    """
+    Percentile bootstrap intervals for the intercept and coefficients.
+
+    Args:
+        model (sklearn.pipeline.Pipeline): The fitted logistic pipeline,
+            whose coefficients are reported as the estimates.
+        replicates (dict): Output of ``bootstrap_logistic``.
+        level (float): Confidence level of the intervals.
+
+    Returns:
+        pd.DataFrame: One row per term with the ``estimate``, the bootstrap
+        ``std_error`` and the ``lower`` and ``upper`` bounds.
+    """
+    coefs = coefficient_table(model)
+    logreg = model.named_steps["logisticregression"]
+    draws = np.column_stack([replicates["intercept"], replicates["coef"]])
+    alpha = (1 - level) / 2
+    return pd.DataFrame(
+        {
+            "term": ["intercept"] + list(coefs.columns),
+            "estimate": np.concatenate([logreg.intercept_, logreg.coef_[0]]),
+            "std_error": draws.std(axis=0, ddof=1),
+            "lower": np.quantile(draws, alpha, axis=0),
+            "upper": np.quantile(draws, 1 - alpha, axis=0),
+        }
+    )
+
+
+def prediction_intervals(model, replicates, X, level=BOOTSTRAP_LEVEL):
+    """
+    Percentile bootstrap intervals for the predicted survival probability.
+
+    Args:
+        model (sklearn.pipeline.Pipeline): The fitted logistic pipeline.
+        replicates (dict): Output of ``bootstrap_logistic``.
+        X (pd.DataFrame): Feature rows to predict, e.g. the unique patient
+            profiles of the test set.
+        level (float): Confidence level of the intervals.
+
+    Returns:
+        pd.DataFrame: The FEATURES of `X` with the model's ``probability``
+        and its ``lower`` and ``upper`` bounds.
+    """
+    design = _replicate_design(model, X, replicates["mean"], replicates["scale"])
+    draws = expit(
+        np.einsum("bnd,bd->bn", design[..., 1:], replicates["coef"])
+        + replicates["intercept"][:, None]
+    )
+    alpha = (1 - level) / 2
+    return X[FEATURES].reset_index(drop=True).assign(
+        probability=model.predict_proba(X[FEATURES])[:, 1],
+        lower=np.quantile(draws, alpha, axis=0),
+        upper=np.quantile(draws, 1 - alpha, axis=0),
+    )
@@ -1,6 +1,9 @@
 import click
-from utils import load_ucisepsis
+from concurrent.futures import ThreadPoolExecutor
+from utils import fetch_archive, read_cohort, UCI_SEPSIS_URL
 from validations import check_file_format
+from instrumentation import instrumented, profile_option, span
+from save_csv import save_csv
 import sys
 import os
 
@@ -9,14 +12,109 @@ PAR_PATH = os.path.dirname(os.path.dirname(__file__))
 DEFAULT_OUTPUT = os.path.join(PAR_PATH, "data/raw")
 
 
+def fetch_cohorts(sources, output, n_jobs=None):
+    """
+    Downloads several cohort CSVs, validates their format and saves them to
+    the output directory.
+
+    Every distinct archive is downloaded and unpacked once, however many
+    cohorts are read from it. Archives are downloaded concurrently, then all
+    cohorts are extracted and written concurrently on a thread pool.
+
+    Status messages are printed using `click.echo`; any failure stops
+    execution with `sys.exit`.
+
+    Parameters
+    ----------
+    sources : iterable of (str, str)
+        ``(url, filename)`` pairs: the URL of a UCI-style ZIP archive and the
+        name of a CSV file inside its inner ZIP.
+    output : str
+        Directory where the raw CSVs are written.
+    n_jobs : int, optional
+        Number of threads; defaults to the ``ThreadPoolExecutor`` default.
+
+    Returns
+    -------
+    list of pandas.DataFrame
+        The downloaded cohorts, in the order of `sources`.
+    """
+    sources = list(sources)
+
+    # Validate formats before downloading anything
+    for _, filename in sources:
+        try:
+            check_file_format(filename)
+        except AssertionError as e:
+            click.echo(f"File format validation failed for '{filename}'.")
+            click.echo(str(e))
+            sys.exit("Stopping execution due to invalid file format.")
+    click.echo("File format validated successfully.")
+
+    urls = list(dict.fromkeys(url for url, _ in sources))
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        click.echo(f"Attempting to download {len(urls)} archive(s)...")
+        try:
+            with span("download_archives"):
+                archives = dict(zip(urls, pool.map(fetch_archive, urls)))
+        except Exception as e:
+            click.echo("ERROR: Could not download archive")
+            click.echo(str(e))
+            sys.exit("Stopping execution due to failed download.")
+
+        filenames = [filename for _, filename in sources]
+        click.echo(f"Extracting {', '.join(filenames)}...")
+        try:
+            with span("extract_cohorts") as step:
+                dfs = list(
+                    pool.map(
+                        read_cohort, [archives[url] for url, _ in sources], filenames
+                    )
+                )
+                step["rows"] = sum(len(df) for df in dfs)
+            click.echo("Files successfully downloaded and extracted.")
+        except Exception as e:
+            click.echo("ERROR: Could not extract files")
+            click.echo(str(e))
+            sys.exit("Stopping execution due to invalid file format.")
+
+        save_filenames = [os.path.join(output, filename) for filename in filenames]
+        try:
+            with span("write_csv", rows=sum(len(df) for df in dfs)):
+                list(pool.map(save_csv, dfs, save_filenames))
+        except Exception as e:
+            click.echo(f"Failed to save files to {output}")
+            click.echo(str(e))
+            sys.exit(1)
+    for save_filename in save_filenames:
+        click.echo(f"Saved dataset to: {save_filename}")
+
+    return dfs
+
+
 @click.command()
 @click.option(
     "--filename",
     "-n",
-    default=DEFAULT_FILENAME,
+    multiple=True,
+    default=[DEFAULT_FILENAME],
     required=False,
     show_default=True,
-    help="Name of CSV file INSIDE the UCI ZIP archive to load",
+    help="Name of CSV file INSIDE the UCI ZIP archive to load; repeat to load "
+    "several files from the same archive",
+)
+@click.option(
+    "--url",
+    default=UCI_SEPSIS_URL,
+    show_default=True,
+    help="URL of the ZIP archive the --filename files are read from",
+)
+@click.option(
+    "--source",
+    nargs=2,
+    multiple=True,
+    metavar="URL FILENAME",
+    help="Additional file to load from another archive",
 )
 @click.option(
     "--output",
@@ -26,48 +124,23 @@ DEFAULT_OUTPUT = os.path.join(PAR_PATH, "data/raw")
     show_default=True,
     help="Path to directory where raw data will be written to",
 )
-def download_data(filename, output):
+@click.option(
+    "--n_jobs",
+    type=int,
+    default=None,
+    help="Number of download/extract threads",
+)
+@profile_option
+@instrumented("download_data")
+def download_data(filename, url, source, output, n_jobs):
     """
-    Downloads the UCI Sepsis Survival dataset ZIP,
-    extracts the specified CSV file,
-    validates its format,
-    and saves the CSV locally.
+    Downloads the UCI Sepsis Survival dataset ZIP (and any other --source
+    archives) once, extracts the specified CSV files,
+    validates their format,
+    and saves the CSVs locally.
     """
 
-    click.echo(f"Attempting to load '{filename}' from UCI dataset...")
-
-    # Load the data using your existing function
-    try:
-        df = load_ucisepsis(filename)
-        click.echo("File successfully downloaded and extracted.")
-    except Exception as e:
-        click.echo(f"ERROR: Could not load file '{filename}'")
-        click.echo(str(e))
-        sys.exit("Stopping execution due to invalid file format.")
-
-    # Validate format using your existing checker
-    try:
-        check_file_format(filename)
-        click.echo("File format validated successfully.")
-    except AssertionError as e:
-        click.echo("File format validation failed.")
-        click.echo(str(e))
-        sys.exit("Stopping execution due to invalid file format.")
-
-    # Save output
-    try:
-        output_dir = os.path.dirname(output)
-        # To ensure the output path exists
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
-
-        save_filename = os.path.join(output, filename)
-        df.to_csv(save_filename, index=False)
-        click.echo(f"Saved dataset to: {save_filename}")
-    except Exception as e:
-        click.echo(f"Failed to save file to {output}")
-        click.echo(str(e))
-        sys.exit(1)
+    fetch_cohorts([(url, name) for name in filename] + list(source), output, n_jobs)
 
 
 if __name__ == "__main__":
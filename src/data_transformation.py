@@ -2,6 +2,8 @@ import click
 import pandas as pd
 import sys
 import os
+from instrumentation import instrumented, profile_option, span
+from save_csv import save_csv
 
 PAR_PATH = os.path.dirname(os.path.dirname(__file__))
 DEFAULT_RAW_DATA_PATH = os.path.join(PAR_PATH, "data/raw")
@@ -18,6 +20,78 @@ D_PROCESSED_TRAIN_FILENAME = os.path.join(
 D_PROCESSED_TEST_FILENAME = os.path.join(DEFAULT_PROCESSED_DATA_PATH, "sepsis_test.csv")
 
 
+def _clean_survival_df(df, verbose=True):
+    """Rename raw UCI columns and map coded values to readable categories.
+
+    Args:
+        df (pandas.DataFrame): Raw cohort with the ``age_years``,
+            ``sex_0male_1female`` and ``hospital_outcome_1alive_0dead`` columns.
+        verbose (bool): If True, progress messages are printed.
+
+    Returns:
+        pandas.DataFrame: The cleaned cohort with ``age``, ``sex``,
+        ``hospital_outcome`` and ``hospital_outcome_cat`` columns.
+
+    Raises:
+        TypeError: If `df` is not a pandas DataFrame.
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("Input must be a pandas DataFrame")
+
+    # Rename columns
+    ## The output is assembled from column views of the input; only the two
+    ## mapped columns are new arrays, nothing else is copied
+    if verbose:
+        click.echo("[Preprocessing] Renaming columns")
+    rename_map = {
+        "age_years": "age",
+        "sex_0male_1female": "sex",
+        "hospital_outcome_1alive_0dead": "hospital_outcome",
+    }
+    columns = {rename_map.get(col, col): df[col] for col in df.columns}
+
+    # Map sex and outcome
+    if verbose:
+        click.echo("[Preprocessing] Renaming Sex categories for better interpretability")
+    columns["sex"] = columns["sex"].map({0: "male", 1: "female"})
+
+    if verbose:
+        click.echo("[Preprocessing] Renaming Target categories for better interpretability")
+    outcome_map = {0: "Died", 1: "Survived"}
+    columns["hospital_outcome_cat"] = columns["hospital_outcome"].map(outcome_map)
+    return pd.DataFrame(columns, copy=False)
+
+
+def report_missing_values(train_df, test_df):
+    """Display the ratio of missing values per column of both datasets."""
+    click.echo("[Validations] Display missing values")
+    click.echo("\nMissing values (train):")
+    click.echo(train_df.isna().mean())
+    click.echo("\nMissing values (test):")
+    click.echo(test_df.isna().mean())
+
+
+def save_processed_data(train_df, test_df, output_train, output_test):
+    """Write the cleaned train and test datasets, creating folders as needed.
+
+    Files are written in chunks and renamed into place once complete; a
+    ``.gz`` or ``.zst`` extension compresses them.
+
+    Raises:
+        SystemExit: If either file cannot be written.
+    """
+    click.echo("[Preprocessing] Finished process, saving datasets...")
+    try:
+        with span("write_csv", rows=len(train_df) + len(test_df)):
+            save_csv(train_df, output_train)
+            click.echo(f"Successfully saved train dataset to: {output_train}")
+            save_csv(test_df, output_test)
+        click.echo(f"Successfully saved test dataset to: {output_test}")
+    except Exception as e:
+        click.echo(f"Error saving output files: {e}")
+        sys.exit(1)
+
+
 @click.command()
 @click.option(
     "--input-train",
@@ -51,64 +125,28 @@ D_PROCESSED_TEST_FILENAME = os.path.join(DEFAULT_PROCESSED_DATA_PATH, "sepsis_te
     show_default=True,
     help="Path to cleaned TEST CSV",
 )
+@profile_option
+@instrumented("clean_data")
 def clean_data(input_train, input_test, output_train, output_test):
     """Clean and transform train and test datasets."""
 
     # Load input files
     click.echo("[Loading data] Reading csv files")
     try:
-        train_df = pd.read_csv(input_train)
-        test_df = pd.read_csv(input_test)
+        with span("read_csv") as step:
+            train_df = pd.read_csv(input_train)
+            test_df = pd.read_csv(input_test)
+            step["rows"] = len(train_df) + len(test_df)
     except Exception as e:
         print("Error reading input files:", e)
         sys.exit(1)
 
-    # Rename columns
-    click.echo("[Preprocessing] Renaming columns")
-    rename_map = {
-        "age_years": "age",
-        "sex_0male_1female": "sex",
-        "hospital_outcome_1alive_0dead": "hospital_outcome",
-    }
-    train_df = train_df.rename(columns=rename_map)
-    test_df = test_df.rename(columns=rename_map)
-
-    # Map sex and outcome
-    click.echo("[Preprocessing] Renaming Sex categories for better interpretability")
-    train_df["sex"] = train_df["sex"].map({0: "male", 1: "female"})
-    test_df["sex"] = test_df["sex"].map({0: "male", 1: "female"})
-
-    click.echo("[Preprocessing] Renaming Target categories for better interpretability")
-    outcome_map = {0: "Died", 1: "Survived"}
-    train_df["hospital_outcome_cat"] = train_df["hospital_outcome"].map(outcome_map)
-    test_df["hospital_outcome_cat"] = test_df["hospital_outcome"].map(outcome_map)
+    with span("transform", rows=len(train_df) + len(test_df)):
+        train_df = _clean_survival_df(train_df)
+        test_df = _clean_survival_df(test_df, verbose=False)
 
-    # Report missing values
-    click.echo("[Validations] Display missing values")
-    click.echo("\nMissing values (train):")
-    click.echo(train_df.isna().mean())
-    click.echo("\nMissing values (test):")
-    click.echo(test_df.isna().mean())
-
-    # Save outputs
-    click.echo("[Preprocessing] Finished process, saving datasets...")
-    try:
-        train_dir = os.path.dirname(output_train)
-        test_dir = os.path.dirname(output_test)
-
-        # To ensure the output paths exist
-        if train_dir:
-            os.makedirs(train_dir, exist_ok=True)
-        if test_dir:
-            os.makedirs(test_dir, exist_ok=True)
-
-        train_df.to_csv(output_train, index=False)
-        click.echo(f"Successfully saved train dataset to: {output_train}")
-        test_df.to_csv(output_test, index=False)
-        click.echo(f"Successfully saved test dataset to: {output_test}")
-    except Exception as e:
-        click.echo("Error saving output files:", e)
-        sys.exit(1)
+    report_missing_values(train_df, test_df)
+    save_processed_data(train_df, test_df, output_train, output_test)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,411 @@
+import click
+import datetime
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from scipy.stats import chisquare
+from instrumentation import instrumented, profile_option, span
+from model_artifacts import load_artifact, predict_proba
+from processed_store import iter_dataset
+from record_keys import lookup_table, pack, packable
+from save_csv import save_csv
+
+PAR_PATH = os.path.dirname(os.path.dirname(__file__))
+DRIFT_REFERENCE_PATH = os.path.join(PAR_PATH, "results/models/drift_reference.json")
+DRIFT_STATE_PATH = os.path.join(PAR_PATH, "results/monitoring/drift_state.json")
+DRIFT_REPORT_PATH = os.path.join(PAR_PATH, "results/monitoring/drift_report.csv")
+MODEL_ARTIFACT_PATH = os.path.join(PAR_PATH, "results/models/logistic_reg.npz")
+DRIFT_STATE_VERSION = 1
+# Fixed bins, so histograms of any batch can be added to each other. Every
+# feature has one extra last bin for missing, unknown or out-of-range values.
+DRIFT_BINS = {
+    "age": {"edges": list(range(0, 131, 10))},
+    "sex": {"categories": ["male", "female"]},
+    "episode_number": {"edges": list(range(1, 17))},
+    "score": {"edges": [i / 10 for i in range(11)]},
+}
+DRIFT_FEATURES = ["age", "sex", "episode_number"]
+# Usual reading of the population stability index: < 0.1 stable,
+# 0.1-0.25 moderate shift, > 0.25 significant shift
+PSI_THRESHOLD = 0.25
+SMOOTHING = 1e-4
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def score_batch(X, table):
+    """
+    Survival probabilities of a batch.
+
+    Every possible record is scored once into `table` (see
+    ``record_keys.lookup_table``), so a batch is scored by indexing it with
+    the packed keys. Rows with a missing, unknown or out-of-range feature
+    have no key and get NaN, which ``histogram`` counts in the missing bin.
+
+    Parameters
+    ----------
+    X : pandas.DataFrame
+        Features of the batch.
+    table : numpy.ndarray
+        Scores of every packed feature key.
+
+    Returns
+    -------
+    numpy.ndarray
+        1D array of probabilities.
+    """
+    valid = packable(X)
+    scores = np.full(len(X), np.nan)
+    scores[valid] = table[pack(X[valid])]
+    return scores
+
+
+def histogram(values, bins, weights=None):
+    """
+    Counts values into the fixed bins of one feature in O(len(values)).
+
+    Parameters
+    ----------
+    values : array-like
+        Values of a single feature (or scores).
+    bins : dict
+        Either ``{"edges": [...]}`` for numeric values, with bins closed on
+        the left and the last edge closing the last bin, or
+        ``{"categories": [...]}`` for categorical values.
+    weights : array-like, optional
+        Integer number of records behind every value, e.g. the counts of a
+        count table.
+
+    Returns
+    -------
+    numpy.ndarray
+        Integer counts, one per bin plus a last bin for missing, unknown or
+        out-of-range values.
+    """
+    if "categories" in bins:
+        codes = pd.Categorical(values, categories=bins["categories"]).codes
+        n_bins = len(bins["categories"])
+        codes = np.where(codes < 0, n_bins, codes)
+    else:
+        edges = np.asarray(bins["edges"], dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        n_bins = len(edges) - 1
+        codes = np.searchsorted(edges, values, side="right") - 1
+        # The last edge belongs to the last bin
+        codes[values == edges[-1]] = n_bins - 1
+        codes[(codes < 0) | (codes >= n_bins) | np.isnan(values)] = n_bins
+    if weights is None:
+        return np.bincount(codes, minlength=n_bins + 1)
+    counts = np.bincount(codes, weights=weights, minlength=n_bins + 1)
+    return np.rint(counts).astype(np.int64)
+
+
+def batch_histograms(X, scores, bins=None, weights=None):
+    """
+    Histograms of every monitored feature and of the scores of a batch.
+
+    `bins` defaults to DRIFT_BINS; live batches are binned with the bins
+    stored in the reference, so they stay comparable if DRIFT_BINS changes.
+    `weights` are passed to ``histogram``.
+    """
+    bins = bins or DRIFT_BINS
+    counts = {
+        feature: histogram(X[feature], bins[feature], weights)
+        for feature in DRIFT_FEATURES
+    }
+    counts["score"] = histogram(scores, bins["score"], weights)
+    return counts
+
+
+def build_reference(X, scores, bins=None, weights=None):
+    """
+    Reference histograms of the training population.
+
+    Parameters
+    ----------
+    X : pandas.DataFrame
+        Training features with the DRIFT_FEATURES columns.
+    scores : array-like
+        Predicted survival probabilities of the training rows, from the
+        same model (artifact) the live batches are scored with.
+    bins : dict, optional
+        Bins of every feature and of the scores. Default is DRIFT_BINS.
+    weights : array-like, optional
+        Number of records behind every row of `X`, to build the reference
+        from a count table.
+
+    Returns
+    -------
+    dict
+        ``{"version", "created_at", "n", "bins", "counts"}``, ready to be saved
+        with ``save_json``.
+    """
+    bins = bins or DRIFT_BINS
+    counts = batch_histograms(X, scores, bins, weights)
+    return {
+        "version": DRIFT_STATE_VERSION,
+        "created_at": _now(),
+        "n": len(X) if weights is None else int(np.sum(weights)),
+        "bins": bins,
+        "counts": {k: v.tolist() for k, v in counts.items()},
+    }
+
+
+def new_state(reference):
+    """An empty live window with the bins of `reference`."""
+    return {
+        "version": DRIFT_STATE_VERSION,
+        "bins": reference["bins"],
+        "window_start": _now(),
+        "n_batches": 0,
+        "n": 0,
+        "counts": {k: [0] * len(v) for k, v in reference["counts"].items()},
+    }
+
+
+def update_state(state, X, scores, new_batch=True):
+    """
+    Adds a scored batch to the live window, in place.
+
+    Only the batch is binned; the cost does not grow with the number of
+    rows seen before.
+
+    Parameters
+    ----------
+    state : dict
+        Live window, see ``new_state``. The batch is binned with its bins.
+    X : pandas.DataFrame
+        Features of the scored batch.
+    scores : array-like
+        Predicted survival probabilities of the batch.
+    new_batch : bool, optional
+        Count `X` as a new batch for the report schedule. False when it is
+        a further partition of the batch added last. Default is True.
+
+    Returns
+    -------
+    dict
+        The updated `state`.
+    """
+    # Windows saved before the bins were stored were binned with DRIFT_BINS
+    bins = state.get("bins", DRIFT_BINS)
+    for key, counts in batch_histograms(X, scores, bins).items():
+        state["counts"][key] = (np.asarray(state["counts"][key]) + counts).tolist()
+    state["n_batches"] += int(new_batch)
+    state["n"] += len(X)
+    return state
+
+
+def drift_statistics(reference_counts, live_counts):
+    """
+    Compares two histograms over the same bins.
+
+    Proportions are smoothed with SMOOTHING so that bins that are empty on
+    one side do not make the statistics infinite.
+
+    Parameters
+    ----------
+    reference_counts, live_counts : array-like
+        Counts per bin.
+
+    Returns
+    -------
+    dict
+        ``psi`` (population stability index), ``kl_divergence`` of the live
+        from the reference distribution, and the ``chi2`` statistic and
+        ``chi2_pvalue`` of the live counts against the reference proportions.
+    """
+    reference = np.asarray(reference_counts, dtype=np.float64)
+    live = np.asarray(live_counts, dtype=np.float64)
+    n_bins = len(reference)
+    p_ref = (reference / reference.sum() + SMOOTHING) / (1 + SMOOTHING * n_bins)
+    p_live = (live / live.sum() + SMOOTHING) / (1 + SMOOTHING * n_bins)
+    log_ratio = np.log(p_live / p_ref)
+    chi2, pvalue = chisquare(live, p_ref * live.sum())
+    return {
+        "psi": float(np.sum((p_live - p_ref) * log_ratio)),
+        "kl_divergence": float(np.sum(p_live * log_ratio)),
+        "chi2": float(chi2),
+        "chi2_pvalue": float(pvalue),
+    }
+
+
+def drift_report(reference, state):
+    """
+    Drift statistics of every monitored feature and of the scores.
+
+    Parameters
+    ----------
+    reference : dict
+        Output of ``build_reference``.
+    state : dict
+        Live window, see ``update_state``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per feature with the window, the number of live rows, the
+        statistics of ``drift_statistics`` and a ``drifted`` flag
+        (PSI above PSI_THRESHOLD).
+
+    Raises
+    ------
+    ValueError
+        If the live window is empty or does not use the reference bins.
+    """
+    if state["n"] == 0:
+        raise ValueError("The live window has no scored rows yet")
+    rows = []
+    for key, reference_counts in reference["counts"].items():
+        if len(state["counts"][key]) != len(reference_counts):
+            raise ValueError(f"Bins of '{key}' differ from the reference")
+        stats = drift_statistics(reference_counts, state["counts"][key])
+        rows.append(
+            {
+                "window_start": state["window_start"],
+                "window_end": _now(),
+                "feature": key,
+                "n_batches": state["n_batches"],
+                "n": state["n"],
+                **stats,
+                "drifted": stats["psi"] > PSI_THRESHOLD,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def report_due(state, every_batches=None, every_seconds=None):
+    """Returns True if the live window is due for a report on the schedule."""
+    if state["n"] == 0:
+        return False
+    if every_batches is not None and state["n_batches"] >= every_batches:
+        return True
+    if every_seconds is not None:
+        started = datetime.datetime.fromisoformat(state["window_start"])
+        age = datetime.datetime.now() - started
+        return age.total_seconds() >= every_seconds
+    return every_batches is None
+
+
+def load_json(path):
+    """Loads a reference or live state, checking its version."""
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != DRIFT_STATE_VERSION:
+        raise ValueError(
+            f"Unsupported drift state version {data.get('version')}, "
+            f"expected {DRIFT_STATE_VERSION}"
+        )
+    return data
+
+
+def save_json(data, path):
+    """Writes a reference or live state atomically."""
+    dir_ = os.path.dirname(path)
+    if dir_:
+        os.makedirs(dir_, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+@click.command()
+@click.option(
+    "--batch",
+    "-b",
+    "batches",
+    multiple=True,
+    required=True,
+    help="Processed CSV (or store) of newly arriving patients, in order",
+)
+@click.option(
+    "--reference",
+    default=DRIFT_REFERENCE_PATH,
+    show_default=True,
+    help="Reference histograms saved at training time",
+)
+@click.option(
+    "--state",
+    default=DRIFT_STATE_PATH,
+    show_default=True,
+    help="Live histograms, kept between runs",
+)
+@click.option(
+    "--artifact",
+    default=MODEL_ARTIFACT_PATH,
+    show_default=True,
+    help="Compact model artifact used to score the batches",
+)
+@click.option(
+    "--report",
+    default=DRIFT_REPORT_PATH,
+    show_default=True,
+    help="CSV the drift reports are appended to",
+)
+@click.option(
+    "--every_batches",
+    type=int,
+    default=None,
+    help="Report after this many batches",
+)
+@click.option(
+    "--every_seconds",
+    type=float,
+    default=None,
+    help="Report once the live window is this old [default: every batch, "
+    "unless --every_batches is given]",
+)
+@profile_option
+@instrumented("drift_monitor")
+def main(batches, reference, state, artifact, report, every_batches, every_seconds):
+    """
+    Scores new batches, adds them to the live histograms and appends drift
+    statistics against the training population to the report when the
+    schedule is due. Each report starts a new live window.
+    """
+    try:
+        reference_data = load_json(reference)
+    except FileNotFoundError:
+        click.echo(
+            f"ERROR: No reference histograms at {reference}; train a model first"
+        )
+        sys.exit(1)
+    state_data = load_json(state) if os.path.exists(state) else None
+    if state_data is not None and state_data.get("bins", DRIFT_BINS) != (
+        reference_data["bins"]
+    ):
+        click.echo("[Drift] The reference bins changed; starting a new live window")
+        state_data = None
+    if state_data is None:
+        state_data = new_state(reference_data)
+    model = load_artifact(artifact)
+    table = lookup_table(lambda X: predict_proba(model, X)[:, 1])
+
+    for batch in batches:
+        with span("score_batch") as step:
+            n_rows = 0
+            # A processed store is scored one partition at a time
+            for i, X in enumerate(iter_dataset(batch)):
+                scores = score_batch(X, table)
+                update_state(state_data, X, scores, new_batch=i == 0)
+                n_rows += len(X)
+            step["rows"] = n_rows
+        click.echo(f"[Drift] Added {n_rows} rows from {batch}")
+        if report_due(state_data, every_batches, every_seconds):
+            drift = drift_report(reference_data, state_data)
+            click.echo(
+                drift[["feature", "n", "psi", "kl_divergence", "chi2_pvalue", "drifted"]]
+            )
+            save_csv(drift, report, append=True)
+            click.echo(f"Successfully appended drift report to: {report}")
+            state_data = new_state(reference_data)
+    save_json(state_data, state)
+
+
+if __name__ == "__main__":
+    main()
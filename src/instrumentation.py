@@ -0,0 +1,237 @@
+import click
+import contextlib
+import datetime
+import functools
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PAR_PATH = os.path.dirname(os.path.dirname(__file__))
+TRACE_DIR = os.path.join(PAR_PATH, "results/traces")
+PROFILERS = ["cprofile", "pyinstrument"]
+
+# The trace of the command currently running in this process, if any
+_ACTIVE_TRACE = None
+# Peak RSS seen so far by every open span, outermost first. A nested span
+# resets VmHWM, so it hands the peak before the reset and its own peak to
+# its parent
+_OPEN_SPAN_PEAKS = []
+
+
+def _read_proc_status_mb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    # Linux lets a process reset its own RSS high-water mark (VmHWM)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _lifetime_peak_rss_mb():
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return maxrss / 1024**2 if sys.platform == "darwin" else maxrss / 1024
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of this process in MB.
+
+    On Linux this is ``VmHWM``, which is reset at the start of every span,
+    so it is the peak since the latest span started. Elsewhere it falls back to
+    ``ru_maxrss``, the peak since the process started.
+
+    Returns:
+        float or None: Peak RSS in MB, or None if it cannot be measured.
+    """
+    hwm = _read_proc_status_mb("VmHWM")
+    return hwm if hwm is not None else _lifetime_peak_rss_mb()
+
+
+def _max_peak(*peaks):
+    peaks = [peak for peak in peaks if peak is not None]
+    return max(peaks) if peaks else None
+
+
+@contextlib.contextmanager
+def span(name, rows=None):
+    """
+    Times one pipeline step and records it in the active trace.
+
+    ``peak_rss_mb`` is the peak within the span, including nested spans.
+
+    The yielded dict can be updated inside the block, e.g. to set ``rows``
+    once the number of processed rows is known. Outside of an instrumented
+    command the step still runs, it is just not recorded.
+
+    Args:
+        name (str): Name of the step.
+        rows (int, optional): Number of rows the step processes.
+
+    Yields:
+        dict: The span record.
+    """
+    record = {"name": name, "rows": rows}
+    if _OPEN_SPAN_PEAKS:
+        _OPEN_SPAN_PEAKS[-1] = _max_peak(_OPEN_SPAN_PEAKS[-1], peak_rss_mb())
+    _reset_peak_rss()
+    _OPEN_SPAN_PEAKS.append(None)
+    start = time.perf_counter()
+    try:
+        yield record
+        record["status"] = "ok"
+    except BaseException as e:
+        record["status"] = f"error: {type(e).__name__}"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        record["seconds"] = seconds
+        if record["rows"] is not None and seconds > 0:
+            record["rows_per_sec"] = record["rows"] / seconds
+        peak = _max_peak(_OPEN_SPAN_PEAKS.pop(), peak_rss_mb())
+        record["peak_rss_mb"] = peak
+        if _OPEN_SPAN_PEAKS:
+            _OPEN_SPAN_PEAKS[-1] = _max_peak(_OPEN_SPAN_PEAKS[-1], peak)
+        if _ACTIVE_TRACE is not None:
+            record["start_offset"] = start - _ACTIVE_TRACE["_start"]
+            _ACTIVE_TRACE["spans"].append(record)
+
+
+def annotate_trace(key, value):
+    """Stores `value` under `key` in the active trace, if there is one."""
+    if _ACTIVE_TRACE is not None:
+        _ACTIVE_TRACE[key] = value
+
+
+@contextlib.contextmanager
+def _profiler(profile, base_path):
+    if profile is None:
+        yield None
+        return
+    if profile == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield f"{base_path}.prof"
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{base_path}.prof")
+        return
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        raise click.UsageError(
+            "--profile pyinstrument requires the optional 'pyinstrument' package"
+        )
+    profiler = Profiler()
+    profiler.start()
+    try:
+        yield f"{base_path}.html"
+    finally:
+        profiler.stop()
+        with open(f"{base_path}.html", "w") as f:
+            f.write(profiler.output_html())
+
+
+@contextlib.contextmanager
+def traced_run(command, profile=None, params=None):
+    """
+    Records a whole CLI run and writes its trace file on exit.
+
+    The trace is a JSON file in TRACE_DIR named after the command and the
+    start time. It holds the run parameters, total wall time, status and
+    every span recorded during the run. With ``profile`` set, a cProfile
+    ``.prof`` file or a pyinstrument ``.html`` report is written next to it.
+    The trace is written even if the command fails or calls ``sys.exit``.
+
+    Args:
+        command (str): Name of the command.
+        profile (str, optional): One of PROFILERS.
+        params (dict, optional): Command parameters to store in the trace.
+
+    Yields:
+        dict: The trace being recorded.
+    """
+    global _ACTIVE_TRACE
+    started_at = datetime.datetime.now()
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    base_path = os.path.join(
+        TRACE_DIR, f"{command}-{started_at.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    )
+    trace = {
+        "command": command,
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "params": {k: str(v) for k, v in (params or {}).items()},
+        "spans": [],
+        "_start": time.perf_counter(),
+    }
+    previous, _ACTIVE_TRACE = _ACTIVE_TRACE, trace
+    try:
+        with _profiler(profile, base_path) as profile_path:
+            trace["profile_path"] = profile_path
+            yield trace
+        trace["status"] = "ok"
+    except SystemExit as e:
+        trace["status"] = "ok" if e.code in (None, 0) else f"exit: {e.code}"
+        raise
+    except BaseException as e:
+        trace["status"] = f"error: {type(e).__name__}"
+        raise
+    finally:
+        _ACTIVE_TRACE = previous
+        trace["seconds"] = time.perf_counter() - trace.pop("_start")
+        trace["peak_rss_mb"] = _lifetime_peak_rss_mb()
+        with open(f"{base_path}.json", "w") as f:
+            json.dump(trace, f, indent=2)
+        click.echo(f"[Instrumentation] Trace saved to: {base_path}.json")
+
+
+profile_option = click.option(
+    "--profile",
+    type=click.Choice(PROFILERS),
+    default=None,
+    help="Profile the run and save the report next to the trace file",
+)
+
+
+def instrumented(command):
+    """
+    Decorates a click command callback so every run is traced.
+
+    Use it below ``@profile_option``; the wrapper consumes the ``profile``
+    argument and runs the command inside ``traced_run``.
+
+    Args:
+        command (str): Name of the command in the trace file.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, profile=None, **kwargs):
+            with traced_run(command, profile=profile, params=kwargs):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
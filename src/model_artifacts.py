@@ -0,0 +1,444 @@
+import numpy as np
+
+# Version 2 added recalibrated logistic artifacts, which a version 1 reader
+# would score without the recalibration. Artifacts without one are still
+# written as version 1, so older readers keep loading them
+ARTIFACT_FORMAT_VERSION = 2
+PLAIN_ARTIFACT_VERSION = 1
+SUPPORTED_ARTIFACT_VERSIONS = (PLAIN_ARTIFACT_VERSION, ARTIFACT_FORMAT_VERSION)
+FOREST_FAMILY = "random_forest"
+LOGISTIC_FAMILY = "logistic"
+
+
+def _export_preprocessor(column_transformer):
+    """
+    Extracts the fitted preprocessing of a pipeline as plain NumPy arrays.
+
+    Numeric columns are either standardized (``StandardScaler``) or passed
+    through, which is stored as a mean of 0 and a scale of 1. Categorical
+    columns are one-hot encoded with an optional dropped category.
+
+    Parameters
+    ----------
+    column_transformer : sklearn.compose.ColumnTransformer
+        The fitted ``columntransformer`` step of a pipeline.
+
+    Returns
+    -------
+    dict
+        Arrays describing the preprocessing, ready to be stored in an NPZ file.
+
+    Raises
+    ------
+    ValueError
+        If the transformer contains a step this format does not support.
+    """
+    numeric_features, numeric_mean, numeric_scale = [], [], []
+    categorical_features, categories, drop_idx = [], [], []
+    for name, transformer, columns in column_transformer.transformers_:
+        if name == "remainder":
+            continue
+        # Fitted "passthrough" steps are stored as identity FunctionTransformers
+        if transformer == "passthrough" or (
+            type(transformer).__name__ == "FunctionTransformer"
+            and transformer.func is None
+        ):
+            numeric_features += list(columns)
+            numeric_mean += [0.0] * len(columns)
+            numeric_scale += [1.0] * len(columns)
+        elif type(transformer).__name__ == "StandardScaler":
+            numeric_features += list(columns)
+            numeric_mean += list(transformer.mean_)
+            numeric_scale += list(transformer.scale_)
+        elif type(transformer).__name__ == "OneHotEncoder":
+            dropped = transformer.drop_idx_
+            for i, column in enumerate(columns):
+                categorical_features.append(column)
+                categories.append([str(c) for c in transformer.categories_[i]])
+                drop_idx.append(
+                    -1 if dropped is None or dropped[i] is None else int(dropped[i])
+                )
+        else:
+            raise ValueError(
+                f"Unsupported preprocessing step '{name}' "
+                f"({type(transformer).__name__})"
+            )
+
+    max_categories = max((len(c) for c in categories), default=0)
+    return {
+        "numeric_features": np.array(numeric_features, dtype=str),
+        "numeric_mean": np.array(numeric_mean, dtype=np.float64),
+        "numeric_scale": np.array(numeric_scale, dtype=np.float64),
+        "categorical_features": np.array(categorical_features, dtype=str),
+        # Ragged category lists are padded with empty strings
+        "categories": np.array(
+            [c + [""] * (max_categories - len(c)) for c in categories], dtype=str
+        ).reshape(len(categories), max_categories),
+        "drop_idx": np.array(drop_idx, dtype=np.int64),
+    }
+
+
+def _transform(artifact, X):
+    """
+    Applies the exported preprocessing to a DataFrame.
+
+    Parameters
+    ----------
+    artifact : dict
+        A loaded artifact (see ``load_artifact``).
+    X : pandas.DataFrame or dict
+        Raw features containing every numeric and categorical column. Any
+        mapping from column name to a 1D array works, so callers do not
+        need pandas.
+
+    Returns
+    -------
+    numpy.ndarray
+        The transformed float64 matrix, with the same column order as the
+        fitted ``ColumnTransformer``.
+    """
+    blocks = []
+    if len(artifact["numeric_features"]):
+        numeric = np.column_stack(
+            [np.asarray(X[f], dtype=np.float64) for f in artifact["numeric_features"]]
+        )
+        blocks.append((numeric - artifact["numeric_mean"]) / artifact["numeric_scale"])
+    for i, feature in enumerate(artifact["categorical_features"]):
+        categories = artifact["categories"][i]
+        categories = categories[categories != ""]
+        values = np.asarray(X[feature]).astype(str)
+        onehot = values[:, None] == categories[None, :]
+        unknown = ~onehot.any(axis=1)
+        if unknown.any():
+            raise ValueError(
+                f"Found unknown categories {sorted(set(values[unknown]))} "
+                f"in column '{feature}'"
+            )
+        if artifact["drop_idx"][i] >= 0:
+            onehot = np.delete(onehot, artifact["drop_idx"][i], axis=1)
+        blocks.append(onehot.astype(np.float64))
+    return np.hstack(blocks)
+
+
+def logistic_artifact(pipeline, recalibrator=None):
+    """
+    Builds the in-memory artifact of a logistic pipeline without saving it.
+
+    See ``export_logistic`` for the contents and the parameters.
+
+    Returns
+    -------
+    dict
+        Mapping of array names to NumPy arrays, as returned by
+        ``load_artifact``.
+    """
+    logreg = pipeline.named_steps["logisticregression"]
+    coef = logreg.coef_[0].astype(np.float64)
+    intercept = np.float64(logreg.intercept_[0])
+    version = PLAIN_ARTIFACT_VERSION
+    calibration = {"calibration": np.array("none")}
+    if recalibrator is not None:
+        version = ARTIFACT_FORMAT_VERSION
+    if recalibrator is not None and recalibrator["method"] == "platt":
+        coef = recalibrator["slope"] * coef
+        intercept = recalibrator["slope"] * intercept + recalibrator["intercept"]
+        # Kept so the recalibration can be carried over to a refitted model
+        calibration = {
+            "calibration": np.array("platt"),
+            "calibration_slope": np.float64(recalibrator["slope"]),
+            "calibration_intercept": np.float64(recalibrator["intercept"]),
+        }
+    elif recalibrator is not None:
+        calibration = {
+            "calibration": np.array(recalibrator["method"]),
+            "calibration_x": np.asarray(recalibrator["x"], dtype=np.float64),
+            "calibration_y": np.asarray(recalibrator["y"], dtype=np.float64),
+        }
+    return {
+        "version": np.int64(version),
+        "family": np.array(LOGISTIC_FAMILY),
+        "classes": logreg.classes_,
+        "coef": coef,
+        "intercept": intercept,
+        **calibration,
+        **_export_preprocessor(pipeline.named_steps["columntransformer"]),
+    }
+
+
+def export_logistic(pipeline, path, recalibrator=None):
+    """
+    Saves a fitted logistic regression pipeline as a compact NPZ artifact.
+
+    Only the numbers needed for scoring are stored: scaler means and scales,
+    one-hot categories, coefficients and intercept. Loading the artifact
+    needs NumPy only, which keeps scoring workers from importing
+    scikit-learn and unpickling the pipeline.
+
+    A recalibration of the probabilities is folded into the artifact, so
+    scoring costs the same with or without it: a Platt recalibration is a
+    linear map of the log-odds and is multiplied into the coefficients and
+    intercept, and an isotonic one is stored as the knots of a
+    piecewise-linear map of the log-odds. Recalibrated artifacts are written
+    as format version 2, others as version 1.
+
+    Parameters
+    ----------
+    pipeline : sklearn.pipeline.Pipeline
+        Fitted pipeline with ``columntransformer`` and
+        ``logisticregression`` steps.
+    path : str or pathlib.Path
+        Destination ``.npz`` file.
+    recalibrator : dict, optional
+        Output of ``calibration.fit_recalibrator``.
+
+    Returns
+    -------
+    str or pathlib.Path
+        The path of the written artifact.
+    """
+    np.savez(path, **logistic_artifact(pipeline, recalibrator))
+    return path
+
+
+def artifact_recalibrator(artifact):
+    """
+    The recalibration folded into a logistic artifact.
+
+    Parameters
+    ----------
+    artifact : dict
+        A logistic artifact loaded with ``load_artifact``.
+
+    Returns
+    -------
+    dict or None
+        The recalibrator in the format of ``calibration.fit_recalibrator``,
+        ready to be passed to ``export_logistic`` again, or None if the
+        artifact is not recalibrated.
+    """
+    method = str(artifact["calibration"])
+    if method == "none":
+        return None
+    if method == "platt":
+        return {
+            "method": "platt",
+            "slope": float(artifact["calibration_slope"]),
+            "intercept": float(artifact["calibration_intercept"]),
+        }
+    return {
+        "method": method,
+        "x": artifact["calibration_x"],
+        "y": artifact["calibration_y"],
+    }
+
+
+def export_forest(pipeline, path):
+    """
+    Saves a fitted random forest pipeline as a compact NPZ artifact.
+
+    All trees are flattened into shared node arrays: int32 child indices,
+    int16 split features, float32 thresholds and, for leaves, the float32
+    probability of the positive class. Thresholds are rounded down to the
+    nearest float32, so splits on integer-valued features such as ``age``
+    and ``episode_number`` are reproduced exactly.
+
+    Parameters
+    ----------
+    pipeline : sklearn.pipeline.Pipeline
+        Fitted pipeline with ``columntransformer`` and
+        ``randomforestclassifier`` steps.
+    path : str or pathlib.Path
+        Destination ``.npz`` file.
+
+    Returns
+    -------
+    str or pathlib.Path
+        The path of the written artifact.
+    """
+    forest = pipeline.named_steps["randomforestclassifier"]
+    positive = int(np.flatnonzero(forest.classes_ == forest.classes_.max())[0])
+
+    left, right, feature, threshold, leaf_value, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        thr32 = tree.threshold.astype(np.float32)
+        # Round down so that x <= thr32 never holds where x <= thr did not
+        too_high = thr32.astype(np.float64) > tree.threshold
+        thr32[too_high] = np.nextafter(thr32[too_high], np.float32(-np.inf))
+        threshold.append(thr32)
+        value = tree.value[:, 0, :]
+        leaf_value.append(value[:, positive] / value.sum(axis=1))
+        offset += tree.node_count
+
+    np.savez_compressed(
+        path,
+        version=np.int64(PLAIN_ARTIFACT_VERSION),
+        family=np.array(FOREST_FAMILY),
+        classes=forest.classes_,
+        roots=np.array(roots, dtype=np.int32),
+        children_left=np.concatenate(left).astype(np.int32),
+        children_right=np.concatenate(right).astype(np.int32),
+        feature=np.concatenate(feature).astype(np.int16),
+        threshold=np.concatenate(threshold),
+        leaf_value=np.concatenate(leaf_value).astype(np.float32),
+        **_export_preprocessor(pipeline.named_steps["columntransformer"]),
+    )
+    return path
+
+
+def load_artifact(path):
+    """
+    Loads a compact model artifact into memory.
+
+    Every version in SUPPORTED_ARTIFACT_VERSIONS is loaded; version 1
+    logistic artifacts are read as not recalibrated.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Path of an artifact written by one of the ``export_*`` functions.
+
+    Returns
+    -------
+    dict
+        Mapping of array names to NumPy arrays.
+
+    Raises
+    ------
+    ValueError
+        If the artifact was written with an unsupported format version.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        artifact = {key: data[key] for key in data.files}
+    if int(artifact["version"]) not in SUPPORTED_ARTIFACT_VERSIONS:
+        raise ValueError(
+            f"Unsupported artifact version {int(artifact['version'])} "
+            f"(expected one of {SUPPORTED_ARTIFACT_VERSIONS})"
+        )
+    if str(artifact["family"]) == LOGISTIC_FAMILY:
+        artifact.setdefault("calibration", np.array("none"))
+    return artifact
+
+
+def logistic_decision_function(artifact, X):
+    """
+    Computes the log-odds of the positive class with a logistic artifact.
+
+    Parameters
+    ----------
+    artifact : dict
+        A logistic artifact loaded with ``load_artifact``.
+    X : pandas.DataFrame or dict
+        Raw features.
+
+    Returns
+    -------
+    numpy.ndarray
+        1D array of log-odds, matching ``Pipeline.decision_function``
+        (after a Platt recalibration, the recalibrated log-odds).
+    """
+    return _transform(artifact, X) @ artifact["coef"] + artifact["intercept"]
+
+
+def logistic_predict_proba(artifact, X):
+    """
+    Scores raw features with a logistic artifact.
+
+    Parameters
+    ----------
+    artifact : dict
+        A logistic artifact loaded with ``load_artifact``.
+    X : pandas.DataFrame or dict
+        Raw features.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (n_samples, 2) with the class probabilities, matching
+        ``Pipeline.predict_proba`` unless the artifact was recalibrated.
+    """
+    decision = logistic_decision_function(artifact, X)
+    if "calibration_x" in artifact:
+        # Isotonic recalibration, clipped to the fitted range
+        positive = np.interp(
+            decision, artifact["calibration_x"], artifact["calibration_y"]
+        )
+    else:
+        positive = 1.0 / (1.0 + np.exp(-decision))
+    return np.column_stack([1 - positive, positive])
+
+
+def predict_proba(artifact, X):
+    """
+    Scores raw features with any compact artifact.
+
+    Parameters
+    ----------
+    artifact : dict
+        An artifact loaded with ``load_artifact``.
+    X : pandas.DataFrame or dict
+        Raw features.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (n_samples, 2) with the class probabilities.
+
+    Raises
+    ------
+    ValueError
+        If the artifact belongs to an unknown model family.
+    """
+    family = str(artifact["family"])
+    if family == LOGISTIC_FAMILY:
+        return logistic_predict_proba(artifact, X)
+    if family == FOREST_FAMILY:
+        return forest_predict_proba(artifact, X)
+    raise ValueError(f"Unknown model family '{family}'")
+
+
+def forest_predict_proba(artifact, X):
+    """
+    Scores a DataFrame with a compact random forest artifact.
+
+    All trees are traversed at once: one node index is kept per (tree, row)
+    pair and every step moves all of them one level down, so the loop runs
+    as many times as the deepest tree is deep.
+
+    Parameters
+    ----------
+    artifact : dict
+        A forest artifact loaded with ``load_artifact``.
+    X : pandas.DataFrame or dict
+        Raw features.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (n_samples, 2) with the class probabilities, matching
+        ``Pipeline.predict_proba``.
+    """
+    X_s = _transform(artifact, X)
+    left = artifact["children_left"]
+    right = artifact["children_right"]
+    feature = artifact["feature"]
+    threshold = artifact["threshold"]
+    n_rows = X_s.shape[0]
+
+    nodes = np.repeat(artifact["roots"][:, None], n_rows, axis=1)
+    rows = np.broadcast_to(np.arange(n_rows), nodes.shape)
+    active = left[nodes] != -1
+    while active.any():
+        current = nodes[active]
+        go_left = X_s[rows[active], feature[current]] <= threshold[current]
+        nodes[active] = np.where(go_left, left[current], right[current])
+        active = left[nodes] != -1
+
+    positive = artifact["leaf_value"][nodes].mean(axis=0, dtype=np.float64)
+    return np.column_stack([1 - positive, positive])
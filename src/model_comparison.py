@@ -0,0 +1,438 @@
+import click
+import os
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.compose import make_column_transformer
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from instrumentation import instrumented, profile_option, span
+from count_models import (
+    CATEGORICAL_FEATURES,
+    FEATURES,
+    NUMERIC_FEATURES,
+    RANDOM_STATE,
+    TARGET,
+    deduplicate_training_data,
+)
+from modeling_and_evaluation import MODEL_PATH
+from processed_store import read_dataset
+from resources import resource_limits, resource_options, worker_count
+from save_csv import save_csv
+
+PAR_PATH = os.path.dirname(os.path.dirname(__file__))
+D_TRAIN_FILENAME = os.path.join(PAR_PATH, "data/processed/sepsis_train.csv")
+LEADERBOARD_PATH = os.path.join(PAR_PATH, "results/tables/model_leaderboard.csv")
+COMPARISON_MODELS = ["logistic", "random_forest", "hist_gradient_boosting"]
+# Design matrix each model family is fitted on
+MODEL_DESIGNS = {
+    "logistic": "standardized",
+    "random_forest": "raw",
+    "hist_gradient_boosting": "raw",
+}
+# Families whose fit depends on the number of rows, not only on their weights
+# (bootstrap draws, min_samples_leaf, histogram bins): these are trained on
+# the fold's records instead of its weighted unique rows
+RECORD_LEVEL_MODELS = ["random_forest", "hist_gradient_boosting"]
+CV_FOLDS = 5
+
+
+def candidate_models(logistic_params=None):
+    """
+    Classifiers compared by the harness, keyed by model family.
+
+    They mirror the project's training functions: the logistic regression
+    of ``model_training`` (with the tuned hyperparameters, if given), the
+    random forest of ``forest_training`` and a histogram gradient boosting
+    model with default settings. Each one runs single-threaded; the harness
+    parallelizes over models and folds instead.
+
+    Parameters
+    ----------
+    logistic_params : dict, optional
+        Parameters of the tuned LogisticRegression, e.g. ``C`` and
+        ``class_weight``.
+
+    Returns
+    -------
+    dict
+        Unfitted estimators for every name in COMPARISON_MODELS.
+    """
+    logistic = LogisticRegression(max_iter=5000, random_state=RANDOM_STATE)
+    if logistic_params:
+        logistic.set_params(**logistic_params)
+    return {
+        "logistic": logistic,
+        "random_forest": RandomForestClassifier(
+            n_estimators=300,
+            min_samples_leaf=50,
+            n_jobs=1,
+            random_state=RANDOM_STATE,
+        ),
+        "hist_gradient_boosting": HistGradientBoostingClassifier(
+            random_state=RANDOM_STATE
+        ),
+    }
+
+
+def tuned_logistic_params(path=None):
+    """``C`` and ``class_weight`` of the saved logistic pipeline, or {} if absent."""
+    path = path or MODEL_PATH
+    if not os.path.exists(path):
+        return {}
+    params = joblib.load(path)[-1].get_params()
+    return {"C": float(params["C"]), "class_weight": params["class_weight"]}
+
+
+def _fit_design(kind, X_unique, weights):
+    """
+    Fits the preprocessor of one design on a fold's weighted unique rows.
+
+    As in ``fit_from_counts``, the StandardScaler is refitted with the
+    counts as weights, so its moments are those of the fold's records.
+    """
+    numeric = StandardScaler() if kind == "standardized" else "passthrough"
+    preprocessor = make_column_transformer(
+        (numeric, NUMERIC_FEATURES),
+        (OneHotEncoder(drop="if_binary"), CATEGORICAL_FEATURES),
+    )
+    preprocessor.fit(X_unique)
+    if kind == "standardized":
+        preprocessor.named_transformers_["standardscaler"].fit(
+            X_unique[NUMERIC_FEATURES], sample_weight=weights
+        )
+    return preprocessor
+
+
+def _save_array(cache_dir, name, array):
+    path = os.path.join(cache_dir, f"{name}.npy")
+    np.save(path, np.ascontiguousarray(array))
+    return np.load(path, mmap_mode="r")
+
+
+def build_fold_cache(X, y, cache_dir, designs, n_splits=CV_FOLDS, record_designs=()):
+    """
+    Splits the training set into CV folds and caches their design matrices.
+
+    Every fold is split once (stratified, shuffled with RANDOM_STATE) and
+    both of its parts are collapsed into weighted unique rows (see
+    ``deduplicate_training_data``). Each preprocessor is fitted once per
+    fold and the transformed matrices, targets and weights are saved to
+    `cache_dir` as ``.npy`` files and reopened memory-mapped, so the worker
+    processes share them instead of each receiving or rebuilding a copy.
+    For the designs in `record_designs`, the training part is also cached
+    record by record, in the order of `X`.
+
+    Parameters
+    ----------
+    X : pandas.DataFrame
+        Training features with the FEATURES columns.
+    y : pandas.Series
+        Binary target aligned with `X`.
+    cache_dir : str
+        Directory for the cached arrays.
+    designs : iterable of str
+        Design matrices to build ("standardized" and/or "raw").
+    n_splits : int, optional
+        Number of CV folds.
+    record_designs : iterable of str, optional
+        Designs (among `designs`) to also cache at record level.
+
+    Returns
+    -------
+    list of dict
+        Per fold: ``y_train``, ``w_train``, ``y_val``, ``w_val`` and, per
+        design, ``{design: (X_train, X_val)}`` under ``"X"``. With
+        `record_designs`, also ``y_train_records`` and
+        ``{design: X_train}`` under ``"X_records"``. All arrays are
+        read-only memory maps.
+    """
+    folds = []
+    splitter = StratifiedKFold(n_splits, shuffle=True, random_state=RANDOM_STATE)
+    for i, (train_idx, val_idx) in enumerate(splitter.split(X, y)):
+        X_train, y_train, w_train = deduplicate_training_data(
+            X.iloc[train_idx], y.iloc[train_idx]
+        )
+        X_val, y_val, w_val = deduplicate_training_data(
+            X.iloc[val_idx], y.iloc[val_idx]
+        )
+        fold = {
+            "y_train": _save_array(cache_dir, f"fold{i}_y_train", y_train),
+            "w_train": _save_array(cache_dir, f"fold{i}_w_train", w_train),
+            "y_val": _save_array(cache_dir, f"fold{i}_y_val", y_val),
+            "w_val": _save_array(cache_dir, f"fold{i}_w_val", w_val),
+            "X": {},
+            "X_records": {},
+        }
+        if record_designs:
+            fold["y_train_records"] = _save_array(
+                cache_dir, f"fold{i}_y_train_records", y.iloc[train_idx]
+            )
+        for design in sorted(set(designs)):
+            preprocessor = _fit_design(design, X_train, w_train)
+            fold["X"][design] = tuple(
+                _save_array(
+                    cache_dir,
+                    f"fold{i}_{design}_{part}",
+                    preprocessor.transform(data).astype(np.float64),
+                )
+                for part, data in [("train", X_train), ("val", X_val)]
+            )
+            if design in record_designs:
+                fold["X_records"][design] = _save_array(
+                    cache_dir,
+                    f"fold{i}_{design}_train_records",
+                    preprocessor.transform(X.iloc[train_idx]).astype(np.float64),
+                )
+        folds.append(fold)
+    return folds
+
+
+def _balanced_weights(estimator, y, weights):
+    """
+    Resolves ``class_weight="balanced"`` from the weighted class totals.
+
+    On weighted unique rows, scikit-learn would balance the number of rows
+    per class rather than the number of records.
+    """
+    if weights is None or estimator.get_params().get("class_weight") != "balanced":
+        return estimator
+    totals = np.bincount(np.asarray(y, dtype=np.int64), weights=weights)
+    class_weight = {
+        label: weights.sum() / (len(totals) * total)
+        for label, total in enumerate(totals)
+    }
+    return estimator.set_params(class_weight=class_weight)
+
+
+def _evaluate_fold(name, estimator, design, fold_index, fold):
+    X_train, X_val = fold["X"][design]
+    y_train, w_train = fold["y_train"], np.asarray(fold["w_train"])
+    if name in RECORD_LEVEL_MODELS:
+        X_train, y_train, w_train = (
+            fold["X_records"][design], fold["y_train_records"], None
+        )
+    w_val = np.asarray(fold["w_val"])
+    model = _balanced_weights(clone(estimator), y_train, w_train)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train, sample_weight=w_train)
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    scores = model.predict_proba(X_val)[:, 1]
+    predict_seconds = time.perf_counter() - start
+
+    y_val = fold["y_val"]
+    return {
+        "model": name,
+        "fold": fold_index,
+        "roc_auc": roc_auc_score(y_val, scores, sample_weight=w_val),
+        "log_loss": log_loss(y_val, scores, sample_weight=w_val, labels=[0, 1]),
+        "brier_score": brier_score_loss(y_val, scores, sample_weight=w_val),
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds,
+    }
+
+
+def leaderboard(fold_results, prepare_seconds=0.0):
+    """
+    Ranks models by their mean cross-validated ROC AUC.
+
+    Parameters
+    ----------
+    fold_results : pandas.DataFrame
+        One row per model and fold, as computed by ``compare_models``.
+    prepare_seconds : float, optional
+        Time spent building the shared fold cache.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per model with its ``rank``, the mean (and standard
+        deviation of the) ROC AUC, the mean log loss and Brier score, the
+        total fit and predict seconds over all folds and the shared
+        ``prepare_seconds``.
+    """
+    board = (
+        fold_results.groupby("model", sort=False)
+        .agg(
+            n_folds=("fold", "size"),
+            roc_auc=("roc_auc", "mean"),
+            roc_auc_std=("roc_auc", "std"),
+            log_loss=("log_loss", "mean"),
+            brier_score=("brier_score", "mean"),
+            fit_seconds=("fit_seconds", "sum"),
+            predict_seconds=("predict_seconds", "sum"),
+        )
+        .sort_values("roc_auc", ascending=False, kind="stable")
+        .reset_index()
+    )
+    board.insert(0, "rank", np.arange(1, len(board) + 1))
+    board["prepare_seconds"] = prepare_seconds
+    return board
+
+
+def compare_models(
+    X,
+    y,
+    models=None,
+    n_splits=CV_FOLDS,
+    n_jobs=None,
+    cache_dir=None,
+    logistic_params=None,
+):
+    """
+    Cross-validates several model families on the same cached folds.
+
+    The folds and their design matrices are built once (see
+    ``build_fold_cache``); every (model, fold) pair is then fitted and
+    scored in parallel on those shared arrays. The logistic model is fitted
+    on the weighted unique rows, which gives the same fit as its records.
+    The families in RECORD_LEVEL_MODELS would not: their bootstrap draws,
+    leaf sizes and bins count rows rather than weights, so they are fitted
+    on the fold's records. Metrics are weighted by the record counts, so
+    they equal the metrics on the fold's records.
+
+    Parameters
+    ----------
+    X : pandas.DataFrame
+        Training features with the FEATURES columns.
+    y : pandas.Series
+        Binary target aligned with `X`.
+    models : list of str, optional
+        Families to compare; defaults to COMPARISON_MODELS.
+    n_splits : int, optional
+        Number of CV folds.
+    n_jobs : int, optional
+        Parallel workers; defaults to the active resource plan (see
+        ``resources.worker_count``).
+    cache_dir : str, optional
+        Keep the fold cache in this directory instead of a temporary one.
+    logistic_params : dict, optional
+        Tuned parameters of the logistic model, see ``tuned_logistic_params``.
+
+    Returns
+    -------
+    tuple of pandas.DataFrame
+        ``(board, fold_results)``: the output of ``leaderboard`` and the
+        metrics and timings of every model and fold.
+
+    Raises
+    ------
+    ValueError
+        If a model family is unknown or `n_splits` is below 2.
+    """
+    models = list(models or COMPARISON_MODELS)
+    unknown = sorted(set(models) - set(COMPARISON_MODELS))
+    if unknown:
+        raise ValueError(f"Unknown models {unknown}, expected {COMPARISON_MODELS}")
+    if n_splits < 2:
+        raise ValueError("n_splits must be at least 2")
+    estimators = candidate_models(logistic_params)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_dir = cache_dir or tmp_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        start = time.perf_counter()
+        with span("build_fold_cache", rows=len(X)):
+            folds = build_fold_cache(
+                X[FEATURES],
+                y.rename(TARGET),
+                cache_dir,
+                [MODEL_DESIGNS[name] for name in models],
+                n_splits,
+                [MODEL_DESIGNS[name] for name in models if name in RECORD_LEVEL_MODELS],
+            )
+        prepare_seconds = time.perf_counter() - start
+
+        with span("evaluate_models", rows=len(X) * len(models)):
+            results = Parallel(n_jobs=worker_count() if n_jobs is None else n_jobs)(
+                delayed(_evaluate_fold)(
+                    name, estimators[name], MODEL_DESIGNS[name], i, fold
+                )
+                for name in models
+                for i, fold in enumerate(folds)
+            )
+        # Drop the memory maps before the temporary directory is removed
+        del folds
+    fold_results = pd.DataFrame(results)
+    return leaderboard(fold_results, prepare_seconds), fold_results
+
+
+@click.command()
+@click.option(
+    "--train_filename",
+    type=str,
+    default=D_TRAIN_FILENAME,
+    show_default=True,
+    help="Path to cleaned TRAIN CSV (or processed store)",
+)
+@click.option(
+    "--models",
+    "-m",
+    type=click.Choice(COMPARISON_MODELS),
+    multiple=True,
+    help="Model family to compare; repeat for several [default: all]",
+)
+@click.option(
+    "--n_splits",
+    type=int,
+    default=CV_FOLDS,
+    show_default=True,
+    help="Number of cross-validation folds",
+)
+@click.option(
+    "--output",
+    default=LEADERBOARD_PATH,
+    show_default=True,
+    help="Destination of the leaderboard table",
+)
+@click.option(
+    "--cache_dir",
+    default=None,
+    help="Keep the memory-mapped fold matrices in this directory "
+    "[default: a temporary directory]",
+)
+@resource_options
+@profile_option
+@instrumented("model_comparison")
+def main(
+    train_filename,
+    models,
+    n_splits,
+    output,
+    cache_dir,
+    n_jobs,
+    threads_per_worker,
+    memory_per_worker,
+):
+    """
+    Cross-validates the logistic regression, random forest and histogram
+    gradient boosting models on shared folds and saves a leaderboard.
+    """
+    with span("load_data") as step:
+        train_df = read_dataset(train_filename)
+        step["rows"] = len(train_df)
+    with resource_limits(n_jobs, threads_per_worker, memory_per_worker):
+        board, _ = compare_models(
+            train_df[FEATURES],
+            train_df[TARGET],
+            models=models,
+            n_splits=n_splits,
+            cache_dir=cache_dir,
+            logistic_params=tuned_logistic_params(),
+        )
+    click.echo(board)
+    save_csv(board, output)
+    click.echo(f"Successfully saved model leaderboard to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -5,6 +6,7 @@ from scipy.stats import loguniform
 from sklearn.compose import make_column_transformer
 from sklearn.pipeline import make_pipeline
 from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.metrics import (
     roc_auc_score,
@@ -12,26 +14,106 @@ from sklearn.metrics import (
     recall_score,
     f1_score,
 )
-from sklearn.model_selection import RandomizedSearchCV
+from sklearn.model_selection import (
+    RandomizedSearchCV,
+    ParameterSampler,
+    cross_val_predict,
+    cross_val_score,
+)
+from sklearn.base import BaseEstimator, clone
+from sklearn.utils import check_random_state
+from itertools import combinations, islice
 import click
+import hashlib
 import joblib
+from joblib import Parallel, delayed
 import shap
 import os
+import json
+import sys
+import time
+from utils import (
+    SHAP_CHUNK_SIZE,
+    compute_subgroup_metrics,
+    write_shap_store,
+    shap_importance_from_store,
+    shap_summary_plot_from_store,
+)
+from model_artifacts import (
+    export_forest,
+    export_logistic,
+    load_artifact,
+    predict_proba,
+)
+from drift_monitor import DRIFT_REFERENCE_PATH, build_reference, save_json
+from count_models import (
+    BOOTSTRAP_REPLICATES,
+    CATEGORICAL_FEATURES,
+    FEATURES,
+    NUMERIC_FEATURES,
+    RANDOM_STATE,
+    TARGET,
+    bootstrap_logistic,
+    build_count_table,
+    coefficient_intervals,
+    coefficient_table,
+    data_fingerprint,
+    deduplicate_training_data,
+    prediction_intervals,
+    refit_from_counts,
+    save_count_table,
+)
+from calibration import RECALIBRATION_METHODS, calibration_summary, fit_recalibrator
+from instrumentation import annotate_trace, instrumented, profile_option, span
+from processed_store import read_dataset
+from resources import resource_limits, resource_options, worker_count
+from save_csv import save_csv
 
 
 PAR_PATH = os.path.dirname(os.path.dirname(__file__))
 D_TRAIN_FILENAME = os.path.join(PAR_PATH, "data/processed/sepsis_train.csv")
 D_TEST_FILENAME = os.path.join(PAR_PATH, "data/processed/sepsis_test.csv")
-NUMERIC_FEATURES = ["age", "episode_number"]
-CATEGORICAL_FEATURES = ["sex"]
-FEATURES = NUMERIC_FEATURES + CATEGORICAL_FEATURES
-TARGET = "hospital_outcome"
-RANDOM_STATE = 15
 MODEL_PATH = os.path.join(PAR_PATH, "results/models/logistic_reg.pkl")
+MODEL_ARTIFACT_PATH = os.path.join(PAR_PATH, "results/models/logistic_reg.npz")
+COUNT_TABLE_PATH = os.path.join(PAR_PATH, "results/models/training_counts.csv")
+FOREST_MODEL_PATH = os.path.join(PAR_PATH, "results/models/random_forest.pkl")
+FOREST_ARTIFACT_PATH = os.path.join(PAR_PATH, "results/models/random_forest.npz")
+FOREST_METRICS_PATH = os.path.join(
+    PAR_PATH, "results/tables/classification_metrics_random_forest.csv"
+)
+FOREST_SUBGROUP_METRICS_PATH = os.path.join(
+    PAR_PATH, "results/tables/subgroup_metrics_random_forest.csv"
+)
+MODEL_FAMILIES = ["logistic", "random_forest"]
 CLF_METRICS_PATH = os.path.join(PAR_PATH, "results/tables/classification_metrics.csv")
+CLF_SUBGROUP_METRICS_PATH = os.path.join(
+    PAR_PATH, "results/tables/subgroup_metrics.csv"
+)
+AGE_BAND_EDGES = [0, 40, 60, 80, np.inf]
+AGE_BAND_LABELS = ["0-39", "40-59", "60-79", "80+"]
+SUBGROUP_COLUMNS = ["sex", "age_band", "episode_number"]
+CLF_CALIBRATION_PATH = os.path.join(PAR_PATH, "results/tables/calibration_metrics.csv")
+CLF_RELIABILITY_PATH = os.path.join(PAR_PATH, "results/tables/reliability_curve.csv")
 CLF_TEST_PLOT = os.path.join(PAR_PATH, "results/figures/score_by_target_class.png")
 CLF_COEFS_PATH = os.path.join(PAR_PATH, "results/tables/model_coefficients.csv")
 CLF_SHAP_PLOT = os.path.join(PAR_PATH, "results/figures/shap_values_plot.png")
+CLF_SHAP_VALUES_PATH = os.path.join(PAR_PATH, "results/shap/shap_values_test.shap")
+CLF_SHAP_IMPORTANCE_PATH = os.path.join(PAR_PATH, "results/tables/shap_importance.csv")
+CLF_COEF_INTERVALS_PATH = os.path.join(
+    PAR_PATH, "results/tables/coefficient_intervals.csv"
+)
+CLF_PREDICTION_INTERVALS_PATH = os.path.join(
+    PAR_PATH, "results/tables/prediction_intervals.csv"
+)
+SEARCH_CHECKPOINT_PATH = os.path.join(PAR_PATH, "results/models/search_checkpoint.json")
+BUDGET_TYPES = ["wall", "cpu"]
+LOGISTIC_PARAM_GRID = {
+    "logisticregression__C": loguniform(1e-4, 1e2),
+    "logisticregression__class_weight": [None, "balanced"],
+    "logisticregression__max_iter": [500, 1000, 2000, 3000, 4000, 5000],
+}
+REPORT_DATA_PATH = os.path.join(PAR_PATH, "results/report_data.json")
+REPORT_DECIMALS = 3
 
 
 def load_data(train_filename, test_filename):
@@ -45,9 +127,10 @@ def load_data(train_filename, test_filename):
     Parameters
     ----------
     train_filename : str or pathlib.Path
-        Path to the training dataset CSV file.
+        Path to the training dataset CSV file, or to a processed store
+        directory (see `processed_store`).
     test_filename : str or pathlib.Path
-        Path to the testing dataset CSV file.
+        Path to the testing dataset CSV file or processed store.
 
     Returns
     -------
@@ -74,8 +157,33 @@ def load_data(train_filename, test_filename):
 
     # Read and split the data
     click.echo("[DATA COLLECTION] Reading train and test datasets...")
-    train_df = pd.read_csv(train_filename)
-    test_df = pd.read_csv(test_filename)
+    train_df = read_dataset(train_filename)
+    test_df = read_dataset(test_filename)
+    return split_features_target(train_df, test_df)
+
+
+def split_features_target(train_df, test_df):
+    """
+    Split in-memory training and testing datasets into features and target.
+
+    Parameters
+    ----------
+    train_df : pandas.DataFrame
+        Cleaned training dataset.
+    test_df : pandas.DataFrame
+        Cleaned testing dataset.
+
+    Returns
+    -------
+    tuple
+        ``(X_train, X_test, y_train, y_test)`` as returned by `load_data`.
+
+    Raises
+    ------
+    KeyError
+        If any column specified in `FEATURES` or `TARGET` is missing from
+        either dataset.
+    """
     click.echo("[DATA COLLECTION] Split features and target...")
     X_train, y_train = (
         train_df[FEATURES],
@@ -89,7 +197,7 @@ def load_data(train_filename, test_filename):
     return X_train, X_test, y_train, y_test
 
 
-def model_training(X, y):
+def model_training(X, y, time_budget=None, budget_type="wall", checkpoint_path=None):
     """
     Trains a logistic regression classification pipeline and persists the best model.
 
@@ -98,8 +206,14 @@ def model_training(X, y):
       categorical features.
     - A LogisticRegression classifier.
 
-    Hyperparameters are optimized using RandomizedSearchCV with cross-validation.
-    The best-performing pipeline is saved to disk and returned.
+    Hyperparameters are optimized using RandomizedSearchCV with cross-validation
+    or, if `time_budget` is given, by ``time_budgeted_search``, which samples
+    from the same space until the budget runs out. The best-performing
+    pipeline is saved to disk, both as a joblib pickle and as a compact NumPy
+    artifact (see ``model_artifacts.export_logistic``), and returned. The
+    training set's count table (see ``build_count_table``) is saved as well,
+    so the model can later be refitted from counts alone (see
+    ``refit_from_counts``).
 
     Args:
         X (pd.DataFrame): Training feature matrix containing numeric and categorical
@@ -107,6 +221,11 @@ def model_training(X, y):
             Must not contain missing values.
         y (pd.Series): Target variable corresponding to `X`.
             Must be aligned with `X` and contain no missing values.
+        time_budget (float, optional): Seconds available for tuning; None runs
+            the fixed 150-candidate RandomizedSearchCV.
+        budget_type (str): "wall" or "cpu" seconds, see ``time_budgeted_search``.
+        checkpoint_path (str, optional): Checkpoint of the budgeted search;
+            defaults to SEARCH_CHECKPOINT_PATH.
 
     Returns:
         sklearn.pipeline.Pipeline: The fitted pipeline with the best hyperparameters
@@ -131,34 +250,416 @@ def model_training(X, y):
     )
 
     # Tune the model
-    click.echo("[MODEL TUNING] RandomizedSearchCV starting...")
-    param_grid = {
-        "logisticregression__C": loguniform(1e-4, 1e2),
-        "logisticregression__class_weight": [None, "balanced"],
-        "logisticregression__max_iter": [500, 1000, 2000, 3000, 4000, 5000],
+    if time_budget is not None:
+        click.echo(
+            "[MODEL TUNING] Time-budgeted search starting "
+            f"({time_budget}s {budget_type})..."
+        )
+        lr_best_model, _ = time_budgeted_search(
+            logistic_pipe,
+            X,
+            y,
+            time_budget,
+            budget_type=budget_type,
+            checkpoint_path=checkpoint_path,
+        )
+    else:
+        click.echo("[MODEL TUNING] RandomizedSearchCV starting...")
+        lr_random_search = RandomizedSearchCV(
+            logistic_pipe,
+            LOGISTIC_PARAM_GRID,
+            n_iter=150,
+            verbose=1,
+            n_jobs=worker_count(),
+            random_state=RANDOM_STATE,
+            return_train_score=True,
+            cv=5,
+        )
+        lr_random_search.fit(X, y)
+        lr_best_model = lr_random_search.best_estimator_
+    click.echo("[MODEL TUNING] Search finished successfully -> saving optimal model")
+
+    joblib.dump(lr_best_model, MODEL_PATH)
+    click.echo(f"Successfully saved model as: {MODEL_PATH}")
+    export_logistic(lr_best_model, MODEL_ARTIFACT_PATH)
+    click.echo(f"Successfully saved compact model as: {MODEL_ARTIFACT_PATH}")
+    save_count_table(
+        build_count_table(X, y), [data_fingerprint(X, y)], COUNT_TABLE_PATH
+    )
+    return lr_best_model
+
+
+def _json_param(value):
+    # Sampled parameters are NumPy scalars; JSON needs Python ones
+    return value.item() if hasattr(value, "item") else value
+
+
+def _evaluate_candidate(estimator, params, X, y, cv):
+    start, start_cpu = time.perf_counter(), time.process_time()
+    scores = cross_val_score(clone(estimator).set_params(**params), X, y, cv=cv)
+    return {
+        "params": {k: _json_param(v) for k, v in params.items()},
+        "mean_test_score": float(scores.mean()),
+        "std_test_score": float(scores.std()),
+        "seconds": time.perf_counter() - start,
+        "cpu_seconds": time.process_time() - start_cpu,
     }
-    lr_random_search = RandomizedSearchCV(
-        logistic_pipe,
-        param_grid,
-        n_iter=150,
-        verbose=1,
-        n_jobs=-1,
-        random_state=RANDOM_STATE,
-        return_train_score=True,
-        cv=5,
+
+
+def _describe(value):
+    # A stable text form of search settings: the repr of a frozen scipy
+    # distribution holds its memory address, and nested estimators are
+    # described by their own entries in get_params(deep=True)
+    if isinstance(value, BaseEstimator):
+        return type(value).__name__
+    if hasattr(value, "dist") and hasattr(value, "args"):
+        return [value.dist.name, _describe(value.args), _describe(value.kwds)]
+    if isinstance(value, dict):
+        return {str(k): _describe(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_describe(v) for v in value]
+    return repr(value)
+
+
+def _search_fingerprint(estimator, X, y, param_distributions, cv):
+    # Results can only be reused by a search over the same data, space and
+    # cross-validation, with the same fixed estimator parameters
+    settings = {
+        "data": data_fingerprint(X, y),
+        "estimator": _describe(estimator.get_params(deep=True)),
+        "param_distributions": _describe(param_distributions),
+        "cv": _describe(cv),
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+def _write_checkpoint(path, checkpoint):
+    dir_ = os.path.dirname(path)
+    if dir_:
+        os.makedirs(dir_, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def time_budgeted_search(
+    estimator,
+    X,
+    y,
+    time_budget,
+    budget_type="wall",
+    checkpoint_path=None,
+    param_distributions=None,
+    cv=5,
+    max_candidates=10_000,
+    n_jobs=None,
+):
+    """
+    Random hyperparameter search bounded by a time budget instead of a count.
+
+    Candidates are drawn from `param_distributions` (LOGISTIC_PARAM_GRID by
+    default) in the same order as ``RandomizedSearchCV`` with RANDOM_STATE,
+    and cross-validated in parallel batches of one candidate per worker.
+    Before each batch the search estimates its cost from the batches so far
+    and stops if it would overrun the budget, so it ends inside the window
+    rather than after it; the first batch always runs. After every batch the
+    results are written to a checkpoint; a later run with the same data,
+    search space, cross-validation and estimator parameters resumes from it
+    instead of re-evaluating those candidates. Interrupting
+    the search (Ctrl-C) also stops it cleanly with the best model so far.
+
+    Args:
+        estimator (sklearn.base.BaseEstimator): Unfitted pipeline to tune.
+        X (pd.DataFrame): Training feature matrix.
+        y (pd.Series): Target variable aligned with `X`.
+        time_budget (float): Budget in seconds for this run.
+        budget_type (str): "wall" for elapsed seconds or "cpu" for the CPU
+            seconds spent fitting, summed over all workers.
+        checkpoint_path (str, optional): Defaults to SEARCH_CHECKPOINT_PATH.
+        param_distributions (dict, optional): Search space.
+        cv (int): Number of cross-validation folds.
+        max_candidates (int): Upper bound on the candidates drawn.
+        n_jobs (int, optional): Parallel workers; defaults to the active
+            resource plan (see ``resources.worker_count``).
+
+    Returns:
+        tuple: ``(best_model, report)`` where ``best_model`` is refitted on
+        all of `X` and ``report`` holds ``n_evaluated`` (this run),
+        ``n_resumed``, ``spent_seconds``, ``stop_reason`` ("budget",
+        "exhausted" or "interrupted"), ``best_params`` and ``best_score``.
+
+    Raises:
+        ValueError: If `budget_type` is unknown or `time_budget` is not positive.
+    """
+    if budget_type not in BUDGET_TYPES:
+        raise ValueError(f"budget_type must be one of {BUDGET_TYPES}")
+    if time_budget <= 0:
+        raise ValueError("time_budget must be positive")
+    checkpoint_path = checkpoint_path or SEARCH_CHECKPOINT_PATH
+    param_distributions = param_distributions or LOGISTIC_PARAM_GRID
+
+    fingerprint = _search_fingerprint(estimator, X, y, param_distributions, cv)
+    results = []
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("search_fingerprint") == fingerprint:
+            results = checkpoint["results"]
+    n_resumed = len(results)
+    if n_resumed:
+        click.echo(f"[MODEL TUNING] Resuming after {n_resumed} checkpointed candidates")
+
+    candidates = islice(
+        ParameterSampler(
+            param_distributions, n_iter=max_candidates, random_state=RANDOM_STATE
+        ),
+        n_resumed,
+        None,
     )
-    lr_random_search.fit(X, y)
+    n_workers = joblib.effective_n_jobs(worker_count() if n_jobs is None else n_jobs)
+    spent, batch_costs, stop_reason = 0.0, [], "exhausted"
+    try:
+        with joblib.Parallel(n_jobs=n_workers) as parallel:
+            while True:
+                if batch_costs and spent + max(batch_costs) > time_budget:
+                    stop_reason = "budget"
+                    break
+                batch = list(islice(candidates, n_workers))
+                if not batch:
+                    break
+                start = time.perf_counter()
+                batch_results = parallel(
+                    joblib.delayed(_evaluate_candidate)(estimator, params, X, y, cv)
+                    for params in batch
+                )
+                if budget_type == "wall":
+                    batch_costs.append(time.perf_counter() - start)
+                else:
+                    batch_costs.append(sum(r["cpu_seconds"] for r in batch_results))
+                spent += batch_costs[-1]
+                results.extend(batch_results)
+                _write_checkpoint(
+                    checkpoint_path,
+                    {"search_fingerprint": fingerprint, "results": results},
+                )
+                click.echo(
+                    f"[MODEL TUNING] {len(results)} candidates, "
+                    f"{spent:.1f}/{time_budget}s {budget_type} budget used"
+                )
+    except KeyboardInterrupt:
+        stop_reason = "interrupted"
+        if not results:
+            raise
+
+    best = max(results, key=lambda r: r["mean_test_score"])
+    best_model = clone(estimator).set_params(**best["params"]).fit(X, y)
+    report = {
+        "n_evaluated": len(results) - n_resumed,
+        "n_resumed": n_resumed,
+        "spent_seconds": spent,
+        "budget_seconds": time_budget,
+        "budget_type": budget_type,
+        "stop_reason": stop_reason,
+        "best_params": best["params"],
+        "best_score": best["mean_test_score"],
+    }
     click.echo(
-        "[MODEL TUNING] RandomizedSearchCV finished successfully -> saving optimal model"
+        f"[MODEL TUNING] Stopped ({stop_reason}) after {report['n_evaluated']} new "
+        f"and {n_resumed} resumed candidates; "
+        f"best CV score {best['mean_test_score']:.4f}"
     )
-    lr_best_model = lr_random_search.best_estimator_
+    annotate_trace("search", report)
+    return best_model, report
 
-    joblib.dump(lr_best_model, MODEL_PATH)
-    click.echo(f"Successfully saved model as: {MODEL_PATH}")
-    return lr_best_model
 
+def model_uncertainty(model, counts, X_test, n_replicates=BOOTSTRAP_REPLICATES):
+    """
+    Saves bootstrap intervals for the coefficients and test-set predictions.
+
+    Predictions are reported once per unique patient profile of `X_test`.
+
+    Args:
+        model (sklearn.pipeline.Pipeline): The fitted logistic pipeline.
+        counts (pd.DataFrame): Count table of its training data.
+        X_test (pd.DataFrame): Test feature matrix.
+        n_replicates (int): Number of bootstrap replicates.
+
+    Returns:
+        pd.DataFrame: The coefficient intervals.
+    """
+    click.echo(f"[Model Interpretation] Bootstrapping {n_replicates} replicates")
+    replicates = bootstrap_logistic(model, counts, n_replicates)
+    df_intervals = coefficient_intervals(model, replicates)
+    click.echo(df_intervals)
+    save_csv(df_intervals, CLF_COEF_INTERVALS_PATH)
+    click.echo(
+        f"Successfully saved coefficient intervals to: {CLF_COEF_INTERVALS_PATH}"
+    )
+    profiles = X_test[FEATURES].drop_duplicates().sort_values(FEATURES)
+    save_csv(
+        prediction_intervals(model, replicates, profiles),
+        CLF_PREDICTION_INTERVALS_PATH,
+    )
+    click.echo(
+        f"Successfully saved prediction intervals to: {CLF_PREDICTION_INTERVALS_PATH}"
+    )
+    return df_intervals
+
+
+def _bootstrap_draws(n_records, max_samples):
+    """Number of records drawn per tree for a ``max_samples`` setting."""
+    if max_samples is None:
+        return n_records
+    if isinstance(max_samples, (int, np.integer)):
+        if not 1 <= max_samples <= n_records:
+            raise ValueError(f"max_samples must be in [1, {n_records}] records")
+        return int(max_samples)
+    if not 0 < max_samples <= 1:
+        raise ValueError("A fractional max_samples must be in (0, 1]")
+    return max(1, round(max_samples * n_records))
+
+
+def _fit_tree(tree, X, y, weights):
+    drawn = weights > 0
+    return tree.fit(X[drawn], y[drawn], sample_weight=weights[drawn])
+
+
+def record_bootstrap_forest(forest, X, y, counts, max_samples=None):
+    """
+    Fits a random forest on weighted unique rows as if it saw every record.
+
+    A forest fitted with ``sample_weight=counts`` bootstraps the unique rows
+    uniformly, so a cell shared by a thousand records is drawn as often as
+    one behind a single record. Here every tree instead gets a multinomial
+    draw of records over the unique rows (the distribution of a
+    record-level bootstrap) as its weights. ``min_samples_leaf`` is applied
+    to the drawn records through ``min_weight_fraction_leaf``, so a leaf
+    holds at least that many records rather than that many unique rows.
+    The difference to a forest fitted on the records themselves is that
+    scikit-learn counts distinct in-bag records per leaf, while this counts
+    drawn records (including repeats).
+
+    Args:
+        forest (RandomForestClassifier): Unfitted forest; its
+            ``n_estimators``, ``min_samples_leaf``, ``n_jobs`` and
+            ``random_state`` are used, ``bootstrap`` and ``max_samples`` are
+            replaced by the record-level draws.
+        X (array-like): Transformed unique rows.
+        y (array-like): Target of the unique rows.
+        counts (np.ndarray): Number of records behind each unique row.
+        max_samples (int or float, optional): Records drawn per tree, as a
+            number or a fraction of all records; None draws as many records
+            as there are.
+
+    Returns:
+        RandomForestClassifier: The fitted forest.
+
+    Raises:
+        ValueError: If `max_samples` is out of range.
+    """
+    X, y = np.asarray(X), np.asarray(y)
+    counts = np.asarray(counts, dtype=np.int64)
+    n_draws = _bootstrap_draws(int(counts.sum()), max_samples)
+    params = forest.get_params()
+    forest = clone(forest).set_params(
+        bootstrap=False,
+        max_samples=None,
+        min_samples_leaf=1,
+        min_weight_fraction_leaf=min(0.5, params["min_samples_leaf"] / n_draws),
+        n_estimators=1,
+    )
+    # A one-tree fit sets up classes_, n_features_in_ and the tree template
+    forest.fit(X, y, sample_weight=counts)
+    template = forest.estimators_[0]
+
+    rng = check_random_state(params["random_state"])
+    seeds = rng.randint(np.iinfo(np.int32).max, size=params["n_estimators"])
+    draws = rng.multinomial(n_draws, counts / counts.sum(), size=params["n_estimators"])
+    trees = Parallel(n_jobs=params["n_jobs"], prefer="threads")(
+        delayed(_fit_tree)(clone(template).set_params(random_state=seed), X, y, w)
+        for seed, w in zip(seeds, draws.astype(np.float64))
+    )
+    forest.estimators_ = trees
+    forest.set_params(n_estimators=len(trees))
+    return forest
+
+
+def forest_training(
+    X,
+    y,
+    n_estimators=300,
+    max_depth=None,
+    min_samples_leaf=50,
+    max_samples=None,
+    ccp_alpha=0.0,
+    n_jobs=None,
+):
+    """
+    Trains a random forest pipeline on the deduplicated, weighted training set.
+
+    Trees are grown in parallel on the unique (age, sex, episode_number,
+    outcome) rows, each with a record-level bootstrap drawn by count (see
+    ``record_bootstrap_forest``). The fitted pipeline is pickled for
+    scikit-learn users and also exported as a compact NPZ artifact (see
+    ``model_artifacts.export_forest``).
 
-def classification_metrics(model, X_train, X_test, y_train, y_test):
+    Args:
+        X (pd.DataFrame): Training feature matrix containing the columns in
+            NUMERIC_FEATURES and CATEGORICAL_FEATURES.
+        y (pd.Series): Target variable aligned with `X`.
+        n_estimators (int): Number of trees.
+        max_depth (int, optional): Maximum tree depth.
+        min_samples_leaf (int): Minimum number of drawn records per leaf.
+        max_samples (int or float, optional): Number (or fraction) of
+            records drawn for each tree's bootstrap sample.
+        ccp_alpha (float): Cost-complexity pruning strength; larger values
+            prune more and give smaller artifacts.
+        n_jobs (int, optional): Number of parallel jobs used to build the
+            trees; defaults to the active resource plan (all CPUs outside
+            of one, see ``resources.worker_count``).
+
+    Returns:
+        sklearn.pipeline.Pipeline: The fitted random forest pipeline.
+
+    Raises:
+        ValueError: If `X` or `y` contain missing values or incompatible data
+            types, or `max_samples` is out of range.
+    """
+    click.echo("[FEATURE ENGINEERING] Deduplicating training rows...")
+    X_unique, y_unique, counts = deduplicate_training_data(X, y)
+    click.echo(
+        f"[FEATURE ENGINEERING] {len(X)} records -> {len(X_unique)} weighted unique rows"
+    )
+    forest_preprocessor = make_column_transformer(
+        ("passthrough", NUMERIC_FEATURES),
+        (OneHotEncoder(drop="if_binary"), CATEGORICAL_FEATURES),
+    )
+    forest = RandomForestClassifier(
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        min_samples_leaf=min_samples_leaf,
+        ccp_alpha=ccp_alpha,
+        n_jobs=worker_count() if n_jobs is None else n_jobs,
+        random_state=RANDOM_STATE,
+    )
+    click.echo("[MODEL TRAINING] Fitting random forest...")
+    X_unique_s = forest_preprocessor.fit_transform(X_unique)
+    forest = record_bootstrap_forest(
+        forest, X_unique_s, y_unique, counts, max_samples=max_samples
+    )
+    forest_pipe = make_pipeline(forest_preprocessor, forest)
+
+    joblib.dump(forest_pipe, FOREST_MODEL_PATH, compress=3)
+    click.echo(f"Successfully saved model as: {FOREST_MODEL_PATH}")
+    export_forest(forest_pipe, FOREST_ARTIFACT_PATH)
+    click.echo(f"Successfully saved compact model as: {FOREST_ARTIFACT_PATH}")
+    return forest_pipe
+
+
+def classification_metrics(
+    model, X_train, X_test, y_train, y_test, metrics_path=None
+):
     # Classification Metrics(adapted from DSCI 573 lecture 1)
     y_pred_train = model.predict(X_train)
     y_pred_test = model.predict(X_test)
@@ -181,19 +682,159 @@ def classification_metrics(model, X_train, X_test, y_train, y_test):
         }
     )
     click.echo(classification_metrics)
-    dir_ = os.path.dirname(CLF_METRICS_PATH)
+    if metrics_path is None:
+        metrics_path = CLF_METRICS_PATH
+    dir_ = os.path.dirname(metrics_path)
     if dir_:
         os.makedirs(dir_, exist_ok=True)
-    classification_metrics.to_csv(CLF_METRICS_PATH, index=False)
-    click.echo(f"Successfully saved classification metrics to: {CLF_METRICS_PATH}")
+    classification_metrics.to_csv(metrics_path, index=False)
+    click.echo(f"Successfully saved classification metrics to: {metrics_path}")
+    return classification_metrics
+
+
+def subgroup_metrics(model, X_train, X_test, y_train, y_test, metrics_path=None):
+    """
+    Evaluates the model on every demographic subgroup of both datasets.
+
+    Subgroups are all slices by sex, age band (AGE_BAND_EDGES) and episode
+    number and all of their crossings, plus the overall population. Every
+    slice is computed in one vectorized pass per dataset (see
+    ``utils.compute_subgroup_metrics``).
+
+    Args:
+        model (sklearn.pipeline.Pipeline): A fitted classification pipeline.
+        X_train, X_test (pd.DataFrame): Feature matrices.
+        y_train, y_test (pd.Series): Targets aligned with the feature matrices.
+        metrics_path (str, optional): Output CSV; defaults to
+            CLF_SUBGROUP_METRICS_PATH.
+
+    Returns:
+        pd.DataFrame: One row per dataset and subgroup with its size, AUC,
+        precision, recall and calibration (observed rate vs mean predicted).
+    """
+    slices = [
+        columns
+        for r in range(len(SUBGROUP_COLUMNS) + 1)
+        for columns in combinations(SUBGROUP_COLUMNS, r)
+    ]
+    frames = []
+    for dataset, X, y in [("train", X_train, y_train), ("test", X_test, y_test)]:
+        df = pd.DataFrame(
+            {
+                "sex": X["sex"],
+                "age_band": pd.cut(
+                    X["age"], AGE_BAND_EDGES, right=False, labels=AGE_BAND_LABELS
+                ),
+                "episode_number": X["episode_number"],
+                TARGET: y,
+                "score": model.predict_proba(X)[:, 1],
+            }
+        )
+        metrics = compute_subgroup_metrics(df, slices, TARGET, "score")
+        metrics.insert(0, "dataset", dataset)
+        frames.append(metrics)
+    subgroups = pd.concat(frames, ignore_index=True)
+
+    metrics_path = metrics_path or CLF_SUBGROUP_METRICS_PATH
+    save_csv(subgroups, metrics_path)
+    click.echo(
+        f"Successfully saved metrics of {len(subgroups)} subgroups to: {metrics_path}"
+    )
+    return subgroups
+
+
+def save_drift_reference(X, artifact_path=None, path=None, weights=None):
+    """
+    Saves the training population's histograms for drift monitoring.
+
+    The scores are those of the compact artifact the drift monitor scores
+    live batches with, so call this after any recalibration has been folded
+    into it.
+
+    Args:
+        X (pd.DataFrame): Training feature matrix, or the cells of a count
+            table together with `weights`.
+        artifact_path (str, optional): Defaults to ``MODEL_ARTIFACT_PATH``.
+        path (str, optional): Defaults to ``drift_monitor.DRIFT_REFERENCE_PATH``.
+        weights (array-like, optional): Number of records of every row of `X`.
+    """
+    artifact = load_artifact(artifact_path or MODEL_ARTIFACT_PATH)
+    path = path or DRIFT_REFERENCE_PATH
+    scores = predict_proba(artifact, X)[:, 1]
+    save_json(build_reference(X, scores, weights=weights), path)
+    click.echo(f"Successfully saved drift reference histograms to: {path}")
+
+
+def recalibrate(model, X, y, method="platt", artifact_path=None):
+    """
+    Fits a recalibration of the logistic model and folds it into its artifact.
+
+    The recalibrator is fitted on out-of-fold log-odds of the training set
+    (5-fold ``cross_val_predict``), so it corrects the model's calibration
+    on unseen data rather than on the rows it was fitted on. The compact
+    artifact is re-exported with the recalibration folded in (see
+    ``model_artifacts.export_logistic``); the pickled pipeline is unchanged.
+
+    Args:
+        model (sklearn.pipeline.Pipeline): The fitted logistic pipeline.
+        X (pd.DataFrame): Training feature matrix.
+        y (pd.Series): Target variable aligned with `X`.
+        method (str): "platt" or "isotonic".
+        artifact_path (str, optional): Defaults to MODEL_ARTIFACT_PATH.
+
+    Returns:
+        dict: The recalibrator, see ``calibration.fit_recalibrator``.
+    """
+    click.echo(f"[CALIBRATION] Fitting {method} recalibration on out-of-fold scores")
+    decision = cross_val_predict(
+        clone(model), X, y, cv=5, method="decision_function", n_jobs=worker_count()
+    )
+    recalibrator = fit_recalibrator(decision, y, method)
+    artifact_path = artifact_path or MODEL_ARTIFACT_PATH
+    export_logistic(model, artifact_path, recalibrator)
+    click.echo(f"Successfully saved recalibrated compact model as: {artifact_path}")
+    return recalibrator
+
+
+def calibration_analysis(model, X_test, y_test, artifact_path=None):
+    """
+    Reports the calibration of the model and of its served artifact.
+
+    The test set is scored once by the pipeline and, if the artifact was
+    recalibrated, once by the artifact. Brier score and expected
+    calibration error of each are saved to CLF_CALIBRATION_PATH and their
+    reliability curves to CLF_RELIABILITY_PATH.
+
+    Args:
+        model (sklearn.pipeline.Pipeline): The fitted logistic pipeline.
+        X_test (pd.DataFrame): Test feature matrix.
+        y_test (pd.Series): Test target.
+        artifact_path (str, optional): Defaults to MODEL_ARTIFACT_PATH.
+
+    Returns:
+        pd.DataFrame: One row per scored model with ``brier_score`` and ``ece``.
+    """
+    click.echo("[CALIBRATION] Computing reliability curves...")
+    probabilities = {"uncalibrated": model.predict_proba(X_test)[:, 1]}
+    artifact = load_artifact(artifact_path or MODEL_ARTIFACT_PATH)
+    method = str(artifact.get("calibration", "none"))
+    if method != "none":
+        probabilities[method] = predict_proba(artifact, X_test)[:, 1]
+    summary, curves = calibration_summary(y_test, probabilities)
+    click.echo(summary)
+    save_csv(summary, CLF_CALIBRATION_PATH)
+    click.echo(f"Successfully saved calibration metrics to: {CLF_CALIBRATION_PATH}")
+    save_csv(curves, CLF_RELIABILITY_PATH)
+    click.echo(f"Successfully saved reliability curves to: {CLF_RELIABILITY_PATH}")
+    return summary
 
 
 def classification_plot(clf, X, y, features):
     click.echo("[MODELING] creating classification histogram...")
-    died = X.loc[y == 0]
-    y_hat_died = clf.predict_proba(died[features])[:, 1]
-    survived = X.loc[y == 1]
-    y_hat_survived = clf.predict_proba(survived[features])[:, 1]
+    # Score once and split by outcome afterwards
+    y_hat = clf.predict_proba(X[features])[:, 1]
+    y_hat_died = y_hat[(y == 0).to_numpy()]
+    y_hat_survived = y_hat[(y == 1).to_numpy()]
 
     plt.figure(figsize=(7, 4))
     sns.histplot(
@@ -228,23 +869,11 @@ def classification_plot(clf, X, y, features):
 
 def model_interpretation(model, X_train, X_test):
     click.echo("[Model Interpretation] Coefficients")
-    feature_names = model.named_steps["columntransformer"].get_feature_names_out()
-    clean_feature_names = []
-    for f in feature_names:
-        clean = f.replace("onehotencoder__", "").replace("standardscaler__", "")
-        # renaming sex_1
-        if clean == "sex_male":
-            clean_feature_names.append("is_male")
-        elif clean == "sex_female":
-            clean_feature_names.append("is_female")
-        else:
-            clean_feature_names.append(clean)
-
     intercept = model.named_steps["logisticregression"].intercept_
-    coeffs = model.named_steps["logisticregression"].coef_
     click.echo(f"Model intercept: {intercept}")
     click.echo(f"Model coefficents:")
-    df_coefs = pd.DataFrame(dict(zip(clean_feature_names, coeffs[0])), index=[0])
+    df_coefs = coefficient_table(model)
+    clean_feature_names = list(df_coefs.columns)
     click.echo(df_coefs)
     df_coefs.to_csv(CLF_COEFS_PATH, index=False)
     click.echo(f"Successfully saved model coefficients to: {CLF_COEFS_PATH}")
@@ -254,11 +883,22 @@ def model_interpretation(model, X_train, X_test):
     X_test_s = model.named_steps["columntransformer"].transform(X_test)
     # Extract the trained LogisticRegression model
     logreg = model.named_steps["logisticregression"]
-    # SHAP explainer
+    # SHAP explainer; values are written chunk by chunk to an on-disk store
     explainer = shap.LinearExplainer(logreg, X_train_s)
-    shap_values = explainer.shap_values(X_test_s)
+    chunks = (
+        explainer.shap_values(X_test_s[start : start + SHAP_CHUNK_SIZE])
+        for start in range(0, X_test_s.shape[0], SHAP_CHUNK_SIZE)
+    )
+    write_shap_store(
+        CLF_SHAP_VALUES_PATH, chunks, X_test_s.shape[0], clean_feature_names
+    )
+    click.echo(f"Successfully saved SHAP values to: {CLF_SHAP_VALUES_PATH}")
+    shap_importance = shap_importance_from_store(CLF_SHAP_VALUES_PATH)
+    click.echo(shap_importance)
+    shap_importance.to_csv(CLF_SHAP_IMPORTANCE_PATH, index=False)
+    click.echo(f"Successfully saved SHAP importance to: {CLF_SHAP_IMPORTANCE_PATH}")
     plt.figure(figsize=(7, 4))
-    shap.summary_plot(shap_values, X_test_s, feature_names=clean_feature_names, show=False)
+    shap_summary_plot_from_store(CLF_SHAP_VALUES_PATH, X_test_s, show=False)
     plt.title("Logistic Classifier Shap values")
     plt.tight_layout()
     plt.savefig(
@@ -269,6 +909,205 @@ def model_interpretation(model, X_train, X_test):
     )
     click.echo(f"Successfully saved visualization as: {CLF_SHAP_PLOT}")
     plt.show()
+    return shap_importance
+
+
+def _display(value, fmt=f".{REPORT_DECIMALS}f"):
+    return format(float(value), fmt)
+
+
+def build_report_data(metrics, model, y_train, shap_importance=None):
+    """
+    Collects every number the report needs into one JSON-serializable dict.
+
+    Values are stored both raw and as display strings rounded to
+    REPORT_DECIMALS, so the report can print them without running Python.
+
+    Args:
+        metrics (pd.DataFrame): Output of ``classification_metrics``.
+        model (sklearn.pipeline.Pipeline): The fitted logistic pipeline.
+        y_train (pd.Series): Training target, used for the class balance.
+        shap_importance (pd.DataFrame, optional): Output of
+            ``model_interpretation``.
+
+    Returns:
+        dict: ``{"report_data": {...}}``, ready to be written as JSON and
+        loaded by Quarto as a metadata file.
+    """
+    metric_columns = [c for c in metrics.columns if c != "dataset"]
+    metric_values = {
+        row["dataset"]: {
+            col.lower().replace(" ", "_"): float(row[col]) for col in metric_columns
+        }
+        for _, row in metrics.iterrows()
+    }
+    coefficients = {k: float(v) for k, v in coefficient_table(model).iloc[0].items()}
+    intercept = float(model.named_steps["logisticregression"].intercept_[0])
+    class_balance = {
+        ("Survived" if k == 1 else "Died"): float(v)
+        for k, v in y_train.value_counts(normalize=True).items()
+    }
+    equation = f"logit(p) = {intercept:.{REPORT_DECIMALS}f}" + "".join(
+        f" {coefficients[name]:+.{REPORT_DECIMALS}f}·{label}"
+        for name, label in [
+            ("age", "Age"),
+            ("episode_number", "Episode Number"),
+            ("is_male", "Is Male"),
+        ]
+        if name in coefficients
+    )
+
+    report_data = {
+        "metrics": metric_values,
+        "metrics_display": {
+            dataset: {k: _display(v) for k, v in values.items()}
+            for dataset, values in metric_values.items()
+        },
+        "coefficients": coefficients,
+        "coefficients_display": {k: _display(v) for k, v in coefficients.items()},
+        "intercept": intercept,
+        "intercept_display": _display(intercept),
+        "logit_equation": equation,
+        "class_balance": class_balance,
+        "class_balance_display": {k: _display(v, ".0%") for k, v in class_balance.items()},
+        "n_train": int(len(y_train)),
+    }
+    if shap_importance is not None:
+        report_data["shap_importance"] = {
+            row["feature"]: float(row["mean_abs_shap"])
+            for _, row in shap_importance.iterrows()
+        }
+        report_data["shap_importance_display"] = {
+            k: _display(v) for k, v in report_data["shap_importance"].items()
+        }
+    return {"report_data": report_data}
+
+
+def write_report_data(report_data, path=None):
+    """Saves the report-data bundle as JSON (REPORT_DATA_PATH by default).
+
+    The file is written under a temporary name and renamed into place, so an
+    interrupted run never leaves truncated JSON for Quarto to read.
+    """
+    path = path or REPORT_DATA_PATH
+    dir_ = os.path.dirname(path)
+    if dir_:
+        os.makedirs(dir_, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(report_data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    click.echo(f"Successfully saved report data to: {path}")
+
+
+def _parse_max_samples(ctx, param, value):
+    """Reads --max_samples as an int (a number of records) or a float (a fraction)."""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        raise click.BadParameter(f"'{value}' is neither an integer nor a number")
+
+
+def search_options(func):
+    """Adds the --time_budget, --budget_type and --search_checkpoint options."""
+    options = [
+        click.option(
+            "--time_budget",
+            type=float,
+            default=None,
+            help="Tune the logistic model for this many seconds instead of "
+            "a fixed 150 candidates (see time_budgeted_search)",
+        ),
+        click.option(
+            "--budget_type",
+            type=click.Choice(BUDGET_TYPES),
+            default="wall",
+            show_default=True,
+            help="Count --time_budget in wall-clock or CPU seconds",
+        ),
+        click.option(
+            "--search_checkpoint",
+            type=str,
+            default=SEARCH_CHECKPOINT_PATH,
+            show_default=True,
+            help="Checkpoint of the time-budgeted search, resumed on the next run",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def modeling_options(func):
+    """Adds the options choosing, refitting, recalibrating and bootstrapping
+    the model (see ``run_modeling``)."""
+    options = [
+        click.option(
+            "--model",
+            type=click.Choice(MODEL_FAMILIES),
+            default="logistic",
+            show_default=True,
+            help="Model family to train",
+        ),
+        click.option(
+            "--n_estimators",
+            type=int,
+            default=300,
+            show_default=True,
+            help="Number of trees (random_forest only)",
+        ),
+        click.option(
+            "--max_samples",
+            type=str,
+            default=None,
+            callback=_parse_max_samples,
+            help="Records drawn per tree: a count (e.g. 20000) or a fraction "
+            "(e.g. 0.2) of the training records (random_forest only)",
+        ),
+        click.option(
+            "--ccp_alpha",
+            type=float,
+            default=0.0,
+            show_default=True,
+            help="Cost-complexity pruning strength (random_forest only)",
+        ),
+        click.option(
+            "--refit_from_counts",
+            "refit_batch",
+            type=click.Path(exists=True),
+            default=None,
+            help="Processed CSV (or store) of a new batch to add to the stored "
+            "count table; the logistic model is then refitted from the counts, "
+            "reusing the tuned hyperparameters. Batches already in the table "
+            "are refused",
+        ),
+        click.option(
+            "--recalibrate",
+            "recalibration",
+            type=click.Choice(["none"] + RECALIBRATION_METHODS),
+            default="none",
+            show_default=True,
+            help="Recalibrate the logistic model's probabilities and fold the "
+            "recalibration into the compact artifact",
+        ),
+        click.option(
+            "--bootstrap_replicates",
+            type=int,
+            default=BOOTSTRAP_REPLICATES,
+            show_default=True,
+            help="Bootstrap replicates for the coefficient and prediction "
+            "intervals of the logistic model (0 to skip)",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
 
 
 @click.command()
@@ -288,15 +1127,140 @@ def model_interpretation(model, X_train, X_test):
     required=False,
     help="Path to cleaned TEST CSV",
 )
-def main(train_filename, test_filename):
+@modeling_options
+@search_options
+@resource_options
+@profile_option
+@instrumented("modeling_and_evaluation")
+def main(
+    train_filename,
+    test_filename,
+    n_jobs,
+    threads_per_worker,
+    memory_per_worker,
+    **options,
+):
     """Reads and splits the cleaned data, fits a sepsis prediction model,
-    and outputs a table summarizing the classification metrics."""
+    and outputs a table summarizing the classification metrics.
+
+    Tuning, tree building, evaluation and SHAP all run under the same
+    worker/thread plan (see ``resources.resource_limits``)."""
+    with resource_limits(n_jobs, threads_per_worker, memory_per_worker):
+        with span("load_data") as step:
+            X_train, X_test, y_train, y_test = load_data(
+                train_filename, test_filename
+            )
+            step["rows"] = len(X_train) + len(X_test)
+        run_modeling(X_train, X_test, y_train, y_test, **options)
+
+
+def run_modeling(
+    X_train,
+    X_test,
+    y_train,
+    y_test,
+    model="logistic",
+    n_estimators=300,
+    max_samples=None,
+    ccp_alpha=0.0,
+    refit_batch=None,
+    recalibration="none",
+    bootstrap_replicates=BOOTSTRAP_REPLICATES,
+    time_budget=None,
+    budget_type="wall",
+    search_checkpoint=SEARCH_CHECKPOINT_PATH,
+):
+    """Fits, evaluates and explains the model chosen by the CLI options.
+
+    Shared by this script and ``pipeline.py``, so both accept the same
+    options and write the same files. The bootstrap and the drift reference
+    both read the stored count table (COUNT_TABLE_PATH), which holds every
+    record the logistic model was fitted on.
+
+    Args:
+        X_train, X_test (pd.DataFrame): Feature matrices.
+        y_train, y_test (pd.Series): Targets aligned with the feature matrices.
+        model (str): One of MODEL_FAMILIES.
+        n_estimators, max_samples, ccp_alpha: Forest settings, see
+            ``forest_training``.
+        refit_batch (str, optional): Processed CSV or store of a new batch to
+            refit the logistic model on (see ``refit_from_counts``) instead of
+            tuning it.
+        recalibration (str): "none" or one of RECALIBRATION_METHODS.
+        bootstrap_replicates (int): Replicates of ``model_uncertainty``, 0 to
+            skip it.
+        time_budget, budget_type, search_checkpoint: Search settings, see
+            ``model_training``.
+
+    Returns:
+        sklearn.pipeline.Pipeline: The fitted model.
+    """
+    n_rows = len(X_train) + len(X_test)
+    if model == "random_forest":
+        with span("forest_training", rows=len(X_train)):
+            clf = forest_training(
+                X_train,
+                y_train,
+                n_estimators=n_estimators,
+                max_samples=max_samples,
+                ccp_alpha=ccp_alpha,
+            )
+        with span("classification_metrics", rows=n_rows):
+            classification_metrics(
+                clf, X_train, X_test, y_train, y_test, metrics_path=FOREST_METRICS_PATH
+            )
+        with span("subgroup_metrics", rows=n_rows):
+            subgroup_metrics(
+                clf,
+                X_train,
+                X_test,
+                y_train,
+                y_test,
+                metrics_path=FOREST_SUBGROUP_METRICS_PATH,
+            )
+        return clf
 
-    X_train, X_test, y_train, y_test = load_data(train_filename, test_filename)
-    clf = model_training(X_train, y_train)
-    classification_metrics(clf, X_train, X_test, y_train, y_test)
-    classification_plot(clf, X_test, y_test, FEATURES)
-    model_interpretation(clf, X_train, X_test)
+    if refit_batch:
+        batch = read_dataset(refit_batch)
+        with span("refit_from_counts", rows=len(batch)):
+            try:
+                clf = refit_from_counts(
+                    batch[FEATURES],
+                    batch[TARGET],
+                    COUNT_TABLE_PATH,
+                    MODEL_PATH,
+                    MODEL_ARTIFACT_PATH,
+                )
+            except ValueError as e:
+                click.echo(f"ERROR: {e}")
+                sys.exit(1)
+    else:
+        with span("model_training", rows=len(X_train)):
+            clf = model_training(
+                X_train, y_train, time_budget, budget_type, search_checkpoint
+            )
+    if recalibration != "none":
+        with span("recalibrate", rows=len(X_train)):
+            recalibrate(clf, X_train, y_train, method=recalibration)
+    # The count table holds every record the model was fitted on
+    counts = pd.read_csv(COUNT_TABLE_PATH)
+    with span("save_drift_reference", rows=int(counts["count"].sum())):
+        save_drift_reference(counts[FEATURES], weights=counts["count"])
+    with span("classification_metrics", rows=n_rows):
+        metrics = classification_metrics(clf, X_train, X_test, y_train, y_test)
+    with span("subgroup_metrics", rows=n_rows):
+        subgroup_metrics(clf, X_train, X_test, y_train, y_test)
+    with span("calibration_analysis", rows=len(X_test)):
+        calibration_analysis(clf, X_test, y_test)
+    with span("classification_plot", rows=len(X_test)):
+        classification_plot(clf, X_test, y_test, FEATURES)
+    with span("model_interpretation", rows=n_rows):
+        shap_importance = model_interpretation(clf, X_train, X_test)
+    if bootstrap_replicates:
+        with span("model_uncertainty", rows=len(X_test)):
+            model_uncertainty(clf, counts, X_test, bootstrap_replicates)
+    write_report_data(build_report_data(metrics, clf, y_train, shap_importance))
+    return clf
 
 
 if __name__ == "__main__":
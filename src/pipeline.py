@@ -0,0 +1,163 @@
+import click
+import pandas as pd
+import os
+from instrumentation import instrumented, profile_option, span
+from resources import resource_limits, resource_options
+from utils import UCI_SEPSIS_URL
+from data_loading import fetch_cohorts, DEFAULT_OUTPUT as DEFAULT_RAW_DATA_PATH
+from data_transformation import (
+    D_PROCESSED_TRAIN_FILENAME,
+    D_PROCESSED_TEST_FILENAME,
+    _clean_survival_df,
+    report_missing_values,
+    save_processed_data,
+)
+import run_eda
+import modeling_and_evaluation as me
+
+RAW_TRAIN_NAME = "s41598-020-73558-3_sepsis_survival_primary_cohort.csv"
+RAW_TEST_NAME = "s41598-020-73558-3_sepsis_survival_study_cohort.csv"
+
+
+def acquire_raw_data(raw_dir, download):
+    """Download (or read already downloaded) raw train and test cohorts.
+
+    Args:
+        raw_dir (str): Directory holding the raw cohort CSV files.
+        download (bool): If True, fetch both cohorts from the UCI archive
+            (downloaded once) and save them to `raw_dir` first; otherwise read
+            the existing files.
+
+    Returns:
+        tuple: ``(train_raw, test_raw)`` DataFrames.
+    """
+    if download:
+        train_raw, test_raw = fetch_cohorts(
+            [(UCI_SEPSIS_URL, RAW_TRAIN_NAME), (UCI_SEPSIS_URL, RAW_TEST_NAME)], raw_dir
+        )
+        return train_raw, test_raw
+    click.echo(f"[Loading data] Reading raw cohorts from {raw_dir}")
+    return (
+        pd.read_csv(os.path.join(raw_dir, RAW_TRAIN_NAME)),
+        pd.read_csv(os.path.join(raw_dir, RAW_TEST_NAME)),
+    )
+
+
+def run_eda_stage(train_df, file_extention, show_visualizations):
+    """Run every EDA step of `run_eda` on an in-memory training set."""
+    click.echo("# EXPLORATORY DATA ANALYSIS\n\n")
+    with span("compute_descriptive_stats", rows=len(train_df)):
+        run_eda.compute_descriptive_stats(train_df)
+    click.echo("\n[Univariate and Bivariate visualizations]\n")
+    with span("univariate_figure", rows=len(train_df)):
+        run_eda.get_univariate_subplots(
+            train_df,
+            run_eda.UNIVARIATE_FILENAME,
+            extension=file_extention,
+            show=show_visualizations,
+        )
+    with span("multivariate_figure", rows=len(train_df)):
+        run_eda.get_multivariate_subplots(
+            train_df,
+            run_eda.MULTIVARIATE_FILENAME,
+            extension=file_extention,
+            show=show_visualizations,
+        )
+    click.echo("\n[Correlation Heatmap]\n\n")
+    with span("corr_heatmap", rows=len(train_df)):
+        run_eda.get_corr_heatmap(
+            train_df,
+            run_eda.CORR_COLS,
+            run_eda.CORR_HEATMAP_FILENAME,
+            extension=file_extention,
+            show=show_visualizations,
+        )
+
+
+def run_modeling_stage(train_df, test_df, **options):
+    """Run training, evaluation and interpretation on in-memory datasets.
+
+    The options are those of ``modeling_and_evaluation.run_modeling``.
+    """
+    X_train, X_test, y_train, y_test = me.split_features_target(train_df, test_df)
+    return me.run_modeling(X_train, X_test, y_train, y_test, **options)
+
+
+@click.command()
+@click.option(
+    "--download/--no-download",
+    default=True,
+    show_default=True,
+    help="Fetch the raw cohorts from UCI, or reuse the files in --raw_dir",
+)
+@click.option(
+    "--raw_dir",
+    default=DEFAULT_RAW_DATA_PATH,
+    show_default=True,
+    help="Directory of the raw cohort CSV files",
+)
+@click.option(
+    "--output_train",
+    default=D_PROCESSED_TRAIN_FILENAME,
+    show_default=True,
+    help="Path to cleaned TRAIN CSV",
+)
+@click.option(
+    "--output_test",
+    default=D_PROCESSED_TEST_FILENAME,
+    show_default=True,
+    help="Path to cleaned TEST CSV",
+)
+@click.option(
+    "--file_extention",
+    default=run_eda.DEFAULT_EXTENTION,
+    show_default=True,
+    help="File format/extension of the EDA images (e.g., png, jpg, pdf).",
+)
+@click.option(
+    "--show_visualizations",
+    default=False,
+    show_default=True,
+    type=bool,
+    help="Show the generated EDA plots. If false, plots are only saved.",
+)
+@me.modeling_options
+@me.search_options
+@resource_options
+@profile_option
+@instrumented("pipeline")
+def main(
+    download,
+    raw_dir,
+    output_train,
+    output_test,
+    file_extention,
+    show_visualizations,
+    n_jobs,
+    threads_per_worker,
+    memory_per_worker,
+    **options,
+):
+    """Runs data loading, cleaning, EDA and modeling in a single process.
+
+    DataFrames are passed between stages in memory instead of being re-read
+    from CSV, and heavy libraries are imported once. Every stage still
+    writes the same files as its standalone script.
+    """
+    with span("acquire_raw_data") as step:
+        train_raw, test_raw = acquire_raw_data(raw_dir, download)
+        step["rows"] = len(train_raw) + len(test_raw)
+
+    with span("transform", rows=len(train_raw) + len(test_raw)):
+        train_df = _clean_survival_df(train_raw)
+        test_df = _clean_survival_df(test_raw, verbose=False)
+    report_missing_values(train_df, test_df)
+    save_processed_data(train_df, test_df, output_train, output_test)
+
+    run_eda_stage(train_df, file_extention, show_visualizations)
+    with resource_limits(n_jobs, threads_per_worker, memory_per_worker):
+        run_modeling_stage(train_df, test_df, **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import click
+import datetime
+import hashlib
+import json
+import os
+import sys
+import pandas as pd
+from data_transformation import _clean_survival_df, DEFAULT_PROCESSED_DATA_PATH
+from instrumentation import instrumented, profile_option, span
+from save_csv import save_csv
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_STORE_PATH = os.path.join(DEFAULT_PROCESSED_DATA_PATH, "sepsis_train_store")
+PARTITION_EXTENSIONS = {"none": ".csv", "gzip": ".csv.gz", "zstd": ".csv.zst"}
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_store(path):
+    """Returns True if `path` is a processed store directory."""
+    return os.path.isfile(os.path.join(path, MANIFEST_FILENAME))
+
+
+def read_manifest(store_dir):
+    """
+    Reads the manifest of a processed store.
+
+    Parameters
+    ----------
+    store_dir : str
+        Store directory. A directory without a manifest is an empty store.
+
+    Returns
+    -------
+    dict
+        ``{"version": int, "partitions": [...]}``, where every partition
+        records its ``file``, ``rows``, ``sha256``, the ``source`` batch it was
+        cleaned from, the ``source_sha256`` of that batch and ``created_at``.
+
+    Raises
+    ------
+    ValueError
+        If the manifest was written by an unsupported version.
+    """
+    if not is_store(store_dir):
+        return {"version": MANIFEST_VERSION, "partitions": []}
+    with open(os.path.join(store_dir, MANIFEST_FILENAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(
+            f"Unsupported manifest version {manifest.get('version')}, "
+            f"expected {MANIFEST_VERSION}"
+        )
+    return manifest
+
+
+def _write_manifest(store_dir, manifest):
+    # Renaming a complete file into place keeps the manifest consistent even
+    # if the run is interrupted
+    path = os.path.join(store_dir, MANIFEST_FILENAME)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def ingest_batch(raw_filename, store_dir, compression="none"):
+    """
+    Cleans one raw batch and appends it to the store as a new partition.
+
+    Only the new batch is read and cleaned; existing partitions are left
+    untouched. The partition file is written first and the manifest updated
+    last, so an interrupted ingest leaves at most an unlisted file that
+    readers ignore and the next ingest overwrites. A batch whose checksum is
+    already in the manifest is skipped, so re-running an ingest is safe.
+
+    Parameters
+    ----------
+    raw_filename : str
+        Raw cohort CSV in the UCI format, e.g. one monthly export.
+    store_dir : str
+        Store directory; created if it does not exist.
+    compression : str, optional
+        One of PARTITION_EXTENSIONS. Default is "none".
+
+    Returns
+    -------
+    dict or None
+        The new partition entry, or None if the batch was already ingested.
+    """
+    if compression not in PARTITION_EXTENSIONS:
+        raise ValueError(f"Compression must be one of {list(PARTITION_EXTENSIONS)}")
+    manifest = read_manifest(store_dir)
+    source_sha256 = file_sha256(raw_filename)
+    for partition in manifest["partitions"]:
+        if partition["source_sha256"] == source_sha256:
+            return None
+
+    df = _clean_survival_df(pd.read_csv(raw_filename), verbose=False)
+    part_file = f"part-{len(manifest['partitions']):05d}{PARTITION_EXTENSIONS[compression]}"
+    part_path = os.path.join(store_dir, part_file)
+    save_csv(df, part_path)
+
+    partition = {
+        "file": part_file,
+        "rows": len(df),
+        "sha256": file_sha256(part_path),
+        "source": os.path.basename(raw_filename),
+        "source_sha256": source_sha256,
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    manifest["partitions"].append(partition)
+    _write_manifest(store_dir, manifest)
+    return partition
+
+
+def _verified_path(store_dir, partition):
+    path = os.path.join(store_dir, partition["file"])
+    if file_sha256(path) != partition["sha256"]:
+        raise ValueError(f"Checksum mismatch for partition {partition['file']}")
+    return path
+
+
+def _check_rows(partition, rows):
+    if rows != partition["rows"]:
+        raise ValueError(
+            f"Partition {partition['file']} has {rows} rows, "
+            f"manifest lists {partition['rows']}"
+        )
+
+
+def verify_store(store_dir):
+    """
+    Checks every partition of a store against its manifest entry.
+
+    Checksums are recorded on ingest and only re-computed when asked: the
+    cost grows with the whole history of the store.
+
+    Parameters
+    ----------
+    store_dir : str
+        Store directory.
+
+    Returns
+    -------
+    int
+        Number of rows in the store.
+
+    Raises
+    ------
+    ValueError
+        If a partition does not match its manifest entry.
+    """
+    n_rows = 0
+    for partition in read_manifest(store_dir)["partitions"]:
+        path = _verified_path(store_dir, partition)
+        chunks = pd.read_csv(path, usecols=[0], chunksize=1 << 16)
+        rows = sum(len(chunk) for chunk in chunks)
+        _check_rows(partition, rows)
+        n_rows += rows
+    return n_rows
+
+
+def iter_partitions(store_dir, verify=False, **read_csv_kwargs):
+    """
+    Lazily reads the partitions of a store, one DataFrame at a time.
+
+    Parameters
+    ----------
+    store_dir : str
+        Store directory.
+    verify : bool, optional
+        Check every partition's checksum and row count against the manifest
+        before using it. Default is False; see ``verify_store``.
+    **read_csv_kwargs
+        Passed to ``pandas.read_csv``, e.g. ``usecols``.
+
+    Yields
+    ------
+    pandas.DataFrame
+        Partitions in ingestion order.
+
+    Raises
+    ------
+    ValueError
+        If `verify` and a partition does not match its manifest entry.
+    """
+    for partition in read_manifest(store_dir)["partitions"]:
+        if verify:
+            path = _verified_path(store_dir, partition)
+        else:
+            path = os.path.join(store_dir, partition["file"])
+        df = pd.read_csv(path, **read_csv_kwargs)
+        if verify:
+            _check_rows(partition, len(df))
+        yield df
+
+
+def iter_dataset(path, verify=False, **read_csv_kwargs):
+    """
+    Lazily reads a processed dataset from a CSV file or a processed store.
+
+    Consumers that work batch by batch should use this rather than
+    ``read_dataset``, so only one partition is in memory at a time.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        A CSV file, read in one piece, or a store directory.
+    verify : bool, optional
+        Verify store partitions, see ``iter_partitions``. Default is False.
+    **read_csv_kwargs
+        Passed to ``pandas.read_csv``.
+
+    Yields
+    ------
+    pandas.DataFrame
+        The CSV file, or the store's partitions in ingestion order.
+    """
+    if is_store(path):
+        yield from iter_partitions(path, verify=verify, **read_csv_kwargs)
+    else:
+        yield pd.read_csv(path, **read_csv_kwargs)
+
+
+def read_dataset(path, verify=False, **read_csv_kwargs):
+    """
+    Reads a whole processed dataset from a CSV file or a processed store.
+
+    The partitions of a store are concatenated in memory; use
+    ``iter_dataset`` where the data can be processed one partition at a
+    time.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        A CSV file, or a store directory whose partitions are concatenated.
+    verify : bool, optional
+        Verify store partitions, see ``iter_partitions``. Default is False.
+    **read_csv_kwargs
+        Passed to ``pandas.read_csv``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The dataset.
+    """
+    if not is_store(path):
+        return pd.read_csv(path, **read_csv_kwargs)
+    partitions = list(iter_partitions(path, verify=verify, **read_csv_kwargs))
+    if not partitions:
+        raise ValueError(f"Processed store {path} has no partitions")
+    return pd.concat(partitions, ignore_index=True)
+
+
+@click.command()
+@click.option(
+    "--input",
+    "-i",
+    "inputs",
+    multiple=True,
+    required=True,
+    help="Raw batch CSV(s) to clean and append, in order",
+)
+@click.option(
+    "--store",
+    "-s",
+    default=DEFAULT_STORE_PATH,
+    show_default=True,
+    help="Directory of the processed store",
+)
+@click.option(
+    "--compression",
+    type=click.Choice(list(PARTITION_EXTENSIONS)),
+    default="none",
+    show_default=True,
+    help="Compression of new partition files",
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    help="Check every partition's checksum and row count after ingesting",
+)
+@profile_option
+@instrumented("ingest")
+def ingest(inputs, store, compression, verify):
+    """
+    Cleans new raw batches and appends them as partitions of a processed
+    store, without reprocessing the batches already ingested.
+    """
+    for raw_filename in inputs:
+        click.echo(f"[Ingest] {raw_filename}")
+        try:
+            with span("ingest_batch") as step:
+                partition = ingest_batch(raw_filename, store, compression)
+                step["rows"] = partition["rows"] if partition else 0
+        except Exception as e:
+            click.echo(f"ERROR: Could not ingest {raw_filename}: {e}")
+            sys.exit(1)
+        if partition is None:
+            click.echo("Batch already ingested, skipping.")
+        else:
+            click.echo(f"Added {partition['file']} ({partition['rows']} rows)")
+
+    if verify:
+        try:
+            with span("verify_store") as step:
+                step["rows"] = verify_store(store)
+        except ValueError as e:
+            click.echo(f"ERROR: {e}")
+            sys.exit(1)
+        click.echo("Every partition matches the manifest.")
+    manifest = read_manifest(store)
+    n_rows = sum(p["rows"] for p in manifest["partitions"])
+    click.echo(
+        f"Store {store} holds {len(manifest['partitions'])} partitions, {n_rows} rows"
+    )
+
+
+if __name__ == "__main__":
+    ingest()
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+AGE_MAX = 130
+EPISODE_MAX = 15
+SEX_CATEGORIES = ["male", "female"]
+FEATURES = ["age", "sex", "episode_number"]
+TARGET = "hospital_outcome"
+DERIVED_COLUMNS = ["hospital_outcome_cat"]
+# One level per valid value plus a last level for missing values
+KEY_SHAPE = (AGE_MAX + 2, len(SEX_CATEGORIES) + 1, EPISODE_MAX + 2, 2)
+N_FEATURE_KEYS = int(np.prod(KEY_SHAPE[:-1]))
+N_RECORD_KEYS = int(np.prod(KEY_SHAPE))
+KEY_DTYPE = np.uint16
+
+
+def _integer_codes(values, max_value, name):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.integer):
+        # No missing values possible, so a range check is all that is needed
+        if len(values) and (values.min() < 0 or values.max() > max_value):
+            raise ValueError(f"Column '{name}' has values outside 0-{max_value}")
+        return values.astype(np.int64, copy=False)
+    values = values.astype(np.float64)
+    missing = np.isnan(values)
+    valid = (values >= 0) & (values <= max_value) & (values == np.floor(values))
+    if not (valid | missing).all():
+        raise ValueError(f"Column '{name}' has values outside 0-{max_value}")
+    return np.where(missing, max_value + 1, values).astype(np.int64)
+
+
+def _sex_codes(values):
+    # Factorizing and mapping the few distinct values is much cheaper than
+    # comparing every string against each category
+    codes, uniques = pd.factorize(values)
+    known = pd.Index(SEX_CATEGORIES).get_indexer(uniques)
+    if (known < 0).any():
+        raise ValueError(f"Column 'sex' has values outside {SEX_CATEGORIES}")
+    # Missing values have code -1, which picks the last entry: the missing level
+    lookup = np.append(known, len(SEX_CATEGORIES))
+    return lookup[codes]
+
+
+def pack(df, outcome=None):
+    """
+    Packs every record into one small integer key.
+
+    The key is the flat index of ``(age, sex, episode_number[, outcome])``
+    in KEY_SHAPE, so it fits in a uint16 and can be counted, deduplicated or
+    looked up with ``np.bincount``/``np.unique``/indexing instead of
+    multi-column pandas operations on object columns. Missing feature values
+    get their own code.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Records with the FEATURES columns.
+    outcome : array-like, optional
+        Binary outcome of every record (e.g. ``df[TARGET]``), to include in
+        the key.
+
+    Returns
+    -------
+    numpy.ndarray
+        uint16 keys, below N_RECORD_KEYS with the outcome and below
+        N_FEATURE_KEYS without it.
+
+    Raises
+    ------
+    ValueError
+        If a value cannot be encoded: age above AGE_MAX, episode above
+        EPISODE_MAX, negative or fractional numbers, an unknown sex or a
+        missing or non-binary outcome.
+    """
+    age = _integer_codes(df["age"], AGE_MAX, "age")
+    episode = _integer_codes(df["episode_number"], EPISODE_MAX, "episode_number")
+    sex = _sex_codes(df["sex"])
+
+    keys = (age * KEY_SHAPE[1] + sex) * KEY_SHAPE[2] + episode
+    if outcome is not None:
+        outcome = np.asarray(outcome)
+        if not ((outcome == 0) | (outcome == 1)).all():
+            raise ValueError(f"Column '{TARGET}' must be 0 or 1")
+        keys = keys * KEY_SHAPE[3] + outcome.astype(np.int64)
+    return keys.astype(KEY_DTYPE)
+
+
+def packable(df):
+    """
+    Rows of `df` whose features are all present and encodable.
+
+    These are the rows ``pack`` gives a complete key, i.e. the ones a
+    ``lookup_table`` scores.
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean mask, False for rows with a missing, unknown or out-of-range
+        feature value.
+    """
+    valid = df["sex"].isin(SEX_CATEGORIES).to_numpy()
+    for column, max_value in [("age", AGE_MAX), ("episode_number", EPISODE_MAX)]:
+        values = pd.to_numeric(df[column], errors="coerce").to_numpy(np.float64)
+        with np.errstate(invalid="ignore"):
+            valid &= (values >= 0) & (values <= max_value)
+        valid &= values == np.floor(values)
+    return valid
+
+
+def unpack(keys, outcome=False):
+    """
+    Turns keys back into records; the inverse of ``pack``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The FEATURES columns (and TARGET if `outcome`). Missing ages or
+        episode numbers make those columns float with NaN.
+    """
+    shape = KEY_SHAPE if outcome else KEY_SHAPE[:-1]
+    codes = np.unravel_index(np.asarray(keys, dtype=np.int64), shape)
+    age, sex, episode = codes[:3]
+    records = pd.DataFrame(
+        {
+            "age": np.where(age > AGE_MAX, np.nan, age),
+            "sex": np.array(SEX_CATEGORIES + [None], dtype=object)[sex],
+            "episode_number": np.where(episode > EPISODE_MAX, np.nan, episode),
+        }
+    )
+    for column in ["age", "episode_number"]:
+        if records[column].notna().all():
+            records[column] = records[column].astype(np.int64)
+    if outcome:
+        records[TARGET] = codes[3]
+    return records
+
+
+def record_histogram(keys, outcome=False):
+    """
+    Counts keys into a dense array indexed by the record's codes.
+
+    Any contingency table of the record columns is a sum of this array over
+    the other axes, e.g. ``hist.sum(axis=(0, 2))`` is sex by outcome.
+
+    Returns
+    -------
+    numpy.ndarray
+        Counts of shape KEY_SHAPE (without its last axis if not `outcome`).
+    """
+    shape = KEY_SHAPE if outcome else KEY_SHAPE[:-1]
+    return np.bincount(keys, minlength=int(np.prod(shape))).reshape(shape)
+
+
+def unique_keys(keys):
+    """
+    Distinct keys in ascending order, with their counts.
+
+    This is ``value_counts`` of the records, computed with one
+    ``np.bincount`` over the key space instead of a multi-column groupby.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        ``(keys, counts)``.
+    """
+    counts = np.bincount(keys)
+    present = np.flatnonzero(counts)
+    return present.astype(KEY_DTYPE), counts[present]
+
+
+def duplicate_count(df):
+    """
+    Number of rows that repeat an earlier row, like ``df.duplicated().sum()``.
+
+    Frames that only hold the record columns (plus columns derived from
+    them) are counted on packed keys; anything else falls back to pandas.
+    """
+    columns = set(df.columns) - set(DERIVED_COLUMNS)
+    if columns in (set(FEATURES), set(FEATURES) | {TARGET}):
+        try:
+            keys = pack(df, df[TARGET] if TARGET in columns else None)
+        except (ValueError, TypeError):
+            pass
+        else:
+            return len(keys) - int(np.count_nonzero(np.bincount(keys)))
+    return int(df.duplicated().sum())
+
+
+def lookup_table(score):
+    """
+    Scores every possible feature combination once.
+
+    Parameters
+    ----------
+    score : callable
+        Maps a DataFrame of records to one value per row, e.g.
+        ``lambda X: predict_proba(artifact, X)[:, 1]``.
+
+    Returns
+    -------
+    numpy.ndarray
+        Float array of length N_FEATURE_KEYS, NaN for combinations with a
+        missing value. Records are then scored by indexing it with
+        ``pack(X)``.
+    """
+    keys = np.arange(N_FEATURE_KEYS)
+    records = unpack(keys)
+    complete = records.notna().all(axis=1).to_numpy()
+    table = np.full(N_FEATURE_KEYS, np.nan)
+    table[complete] = score(records[complete].reset_index(drop=True))
+    return table
@@ -0,0 +1,216 @@
+import click
+import contextlib
+import math
+import os
+from collections import deque
+
+import joblib
+from threadpoolctl import threadpool_limits
+from instrumentation import annotate_trace
+
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_MEMORY_MAX = "/sys/fs/cgroup/memory.max"
+MEMINFO = "/proc/meminfo"
+
+# The limits of the command currently running in this process, if any
+_ACTIVE_LIMITS = None
+
+
+def available_cpus():
+    """
+    Returns the number of CPUs this process may use.
+
+    Takes the CPU affinity mask and, inside a container, the cgroup v2 CPU
+    quota into account, so ``-1`` never means more workers than the
+    container is allowed to run.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS, Windows
+        cpus = os.cpu_count() or 1
+    try:
+        with open(CGROUP_CPU_MAX) as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.floor(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def available_memory_mb():
+    """
+    Returns the memory this process may use in MB, or None if unknown.
+
+    This is the cgroup v2 memory limit of the container (e.g. the 5G of
+    ``docker-compose.yml``) or, without one, the total system memory.
+    """
+    limits = []
+    try:
+        with open(CGROUP_MEMORY_MAX) as f:
+            value = f.read().strip()
+        if value != "max":
+            limits.append(int(value) / 1024**2)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(MEMINFO) as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    limits.append(int(line.split()[1]) / 1024)
+                    break
+    except (OSError, ValueError):
+        pass
+    return min(limits) if limits else None
+
+
+def plan_resources(n_jobs=-1, threads_per_worker=None, memory_per_worker_mb=None):
+    """
+    Resolves the requested worker, thread and memory settings.
+
+    Parameters
+    ----------
+    n_jobs : int, optional
+        Number of worker processes; -1 uses all available CPUs.
+    threads_per_worker : int, optional
+        OpenMP/BLAS threads per worker. Defaults to the available CPUs
+        divided by the number of workers, so workers never oversubscribe.
+    memory_per_worker_mb : float, optional
+        Memory budget per worker. The worker count is capped so that all
+        workers fit in the available memory.
+
+    Returns
+    -------
+    dict
+        ``n_jobs``, ``threads_per_worker``, ``memory_per_worker_mb``,
+        ``available_cpus`` and ``available_memory_mb``.
+
+    Raises
+    ------
+    ValueError
+        If any setting is not positive (other than ``n_jobs=-1``).
+    """
+    if n_jobs == 0 or n_jobs < -1:
+        raise ValueError("n_jobs must be a positive integer or -1")
+    if threads_per_worker is not None and threads_per_worker < 1:
+        raise ValueError("threads_per_worker must be a positive integer")
+    if memory_per_worker_mb is not None and memory_per_worker_mb <= 0:
+        raise ValueError("memory_per_worker_mb must be positive")
+
+    cpus = available_cpus()
+    memory_mb = available_memory_mb()
+    workers = cpus if n_jobs == -1 else n_jobs
+    if memory_per_worker_mb is not None and memory_mb is not None:
+        workers = min(workers, max(1, math.floor(memory_mb / memory_per_worker_mb)))
+    if threads_per_worker is None:
+        threads_per_worker = max(1, cpus // workers)
+    return {
+        "n_jobs": workers,
+        "threads_per_worker": threads_per_worker,
+        "memory_per_worker_mb": memory_per_worker_mb,
+        "available_cpus": cpus,
+        "available_memory_mb": None if memory_mb is None else round(memory_mb),
+    }
+
+
+@contextlib.contextmanager
+def resource_limits(n_jobs=-1, threads_per_worker=None, memory_per_worker_mb=None):
+    """
+    Applies one worker/thread plan to everything run inside the block.
+
+    The plan from ``plan_resources`` is logged, stored in the active trace
+    and made available through ``worker_count``. Native thread pools
+    (OpenMP, BLAS) of this process are limited to ``threads_per_worker``,
+    and joblib workers, as used by scikit-learn for tuning and tree
+    building, are started with the same thread limit.
+
+    Yields
+    ------
+    dict
+        The effective plan.
+    """
+    global _ACTIVE_LIMITS
+    plan = plan_resources(n_jobs, threads_per_worker, memory_per_worker_mb)
+    click.echo(
+        "[Resources] "
+        + ", ".join(f"{k}={v}" for k, v in plan.items() if v is not None)
+    )
+    annotate_trace("resources", plan)
+    previous, _ACTIVE_LIMITS = _ACTIVE_LIMITS, plan
+    try:
+        with threadpool_limits(limits=plan["threads_per_worker"]), joblib.parallel_config(
+            backend="loky",
+            n_jobs=plan["n_jobs"],
+            inner_max_num_threads=plan["threads_per_worker"],
+        ):
+            yield plan
+    finally:
+        _ACTIVE_LIMITS = previous
+
+
+def worker_count(default=-1):
+    """Returns the planned number of workers, or `default` outside of a plan."""
+    return default if _ACTIVE_LIMITS is None else _ACTIVE_LIMITS["n_jobs"]
+
+
+def worker_threads(default=None):
+    """Returns the planned threads per worker, or `default` outside of a plan."""
+    return default if _ACTIVE_LIMITS is None else _ACTIVE_LIMITS["threads_per_worker"]
+
+
+def bounded_map(pool, fn, *iterables, max_in_flight):
+    """
+    Like ``pool.map(fn, *iterables)``, with at most `max_in_flight` tasks
+    submitted ahead of the consumer.
+
+    ``Executor.map`` submits every task up front and keeps each result
+    until it is consumed; here the next task is only submitted once a
+    result has been taken, so memory stays bounded when the consumer is
+    slower than the workers. Results are yielded in order.
+    """
+    pending = deque()
+    for args in zip(*iterables):
+        pending.append(pool.submit(fn, *args))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def limit_worker_threads(threads):
+    """
+    Limits the native thread pools of the calling process for its lifetime.
+
+    Meant as (part of) a process pool initializer, so workers that are not
+    started by joblib follow the plan too. Does nothing if `threads` is None.
+    """
+    if threads is not None:
+        threadpool_limits(limits=threads)
+
+
+def resource_options(func):
+    """Adds the --n_jobs, --threads_per_worker and --memory_per_worker options."""
+    options = [
+        click.option(
+            "--n_jobs",
+            type=int,
+            default=-1,
+            show_default=True,
+            help="Worker processes for tuning, tree building and SHAP (-1 for all CPUs)",
+        ),
+        click.option(
+            "--threads_per_worker",
+            type=int,
+            default=None,
+            help="OpenMP/BLAS threads per worker [default: CPUs / workers]",
+        ),
+        click.option(
+            "--memory_per_worker",
+            type=float,
+            default=None,
+            help="Memory budget per worker in MB; caps the number of workers",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
@@ -1,8 +1,14 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import click
 import os
+from save_fig import save_fig
+from save_csv import save_csv
+from processed_store import read_dataset
+from instrumentation import instrumented, profile_option, span
+from record_keys import EPISODE_MAX, SEX_CATEGORIES, pack, record_histogram
 
 
 PAR_PATH = os.path.dirname(os.path.dirname(__file__))
@@ -15,6 +21,8 @@ SUMMARY_PATH = "results/tables/train_summary.csv"
 SEX_VALCOUNTS_PATH = "results/tables/sex_valcounts.csv"
 TARGET_VALCOUNTS_PATH = "results/tables/target_valcounts.csv"
 DF_MISSINGVALS_PATH = "results/tables/missing_vals_ratio.csv"
+# Labels of the 0/1 hospital_outcome codes, as mapped in data_transformation
+OUTCOME_LABELS = ["Died", "Survived"]
 DEFAULT_SHOW = True
 CORR_COLS = ["age", "sex", "episode_number", "hospital_outcome"]
 
@@ -22,11 +30,11 @@ CORR_COLS = ["age", "sex", "episode_number", "hospital_outcome"]
 def load_train_df(filename):
     """Load a training dataset from a CSV file.
 
-    This function reads the specified CSV file
-    into a pandas DataFrame.
+    This function reads the specified CSV file, or the partitions of a
+    processed store directory, into a pandas DataFrame.
 
     Args:
-        filename (str): Path to the CSV file to load.
+        filename (str): Path to the CSV file or processed store to load.
 
     Returns:
         pandas.DataFrame: The loaded dataset.
@@ -35,7 +43,7 @@ def load_train_df(filename):
         FileNotFoundError: If the specified file does not exist.
     """
     click.echo(f"\n[Loading Data] {filename}...\n")
-    return pd.read_csv(filename)
+    return read_dataset(filename)
 
 
 def compute_descriptive_stats(df):
@@ -53,24 +61,65 @@ def compute_descriptive_stats(df):
     """
     click.echo("\n[Descriptive statistics] summary:\n\n")
     click.echo(df.describe())
-    summary_dir = os.path.dirname(SUMMARY_PATH)
-    if summary_dir:
-        os.makedirs(summary_dir, exist_ok=True)
-    df.describe().to_csv(SUMMARY_PATH)
+    save_csv(df.describe(), SUMMARY_PATH, index=True)
     click.echo(f"Successfully saved training summary stats to: {SUMMARY_PATH}")
     click.echo("\n[Descriptive statistics] Counts by category:\n\n")
     click.echo("\nNumber of observations of each Sex\n")
     sex_vc = df["sex"].value_counts(True, dropna=False)
     click.echo(sex_vc)
-    sex_vc.to_csv(SEX_VALCOUNTS_PATH, index=False)
+    save_csv(sex_vc, SEX_VALCOUNTS_PATH)
     click.echo("\nNumber of observations of each Hospital Outcome (target)\n")
     target_vc = df["hospital_outcome_cat"].value_counts(True, dropna=False)
     click.echo(target_vc)
-    target_vc.to_csv(TARGET_VALCOUNTS_PATH, index=False)
+    save_csv(target_vc, TARGET_VALCOUNTS_PATH)
     click.echo("\n[Descriptive statistics] Missing values ratio per column:\n")
     missing_vals = df.isna().mean()
     click.echo(missing_vals)
-    missing_vals.to_csv(DF_MISSINGVALS_PATH, index=False)
+    save_csv(missing_vals, DF_MISSINGVALS_PATH)
+
+
+def count_tables(df):
+    """Episode counts and the sex by outcome contingency table.
+
+    Both come from one ``np.bincount`` over the packed record keys (see
+    record_keys); frames with values that cannot be packed are counted
+    with pandas instead. Missing values are left out, like in
+    ``pd.crosstab``.
+
+    Args:
+        df (pandas.DataFrame): Cleaned data with the ``age``, ``sex``,
+            ``episode_number``, ``hospital_outcome`` and
+            ``hospital_outcome_cat`` columns.
+
+    Returns:
+        tuple: ``(episode_counts, sex_outcome)``, a Series of record counts
+        per observed episode number and a DataFrame of counts with one row
+        per sex and one column per outcome label.
+    """
+    outcome = df["hospital_outcome_cat"]
+    try:
+        keys = pack(df, outcome=df["hospital_outcome"])
+    except ValueError:
+        return (
+            df["episode_number"].value_counts().sort_index(),
+            pd.crosstab(df["sex"], outcome),
+        )
+    hist = record_histogram(keys, outcome=True)
+    episodes = hist.sum(axis=(0, 1, 3))[: EPISODE_MAX + 1]
+    observed = np.flatnonzero(episodes)
+    episode_counts = pd.Series(
+        episodes[observed],
+        index=pd.Index(observed, name="episode_number"),
+        name="count",
+    )
+    sex_outcome = pd.DataFrame(
+        hist.sum(axis=(0, 2))[: len(SEX_CATEGORIES)],
+        index=pd.Index(SEX_CATEGORIES, name="sex"),
+        columns=pd.Index(OUTCOME_LABELS, name=outcome.name),
+    )
+    observed = sex_outcome.index[sex_outcome.sum(axis=1) > 0]
+    sex_outcome = sex_outcome.loc[observed, sex_outcome.sum(axis=0) > 0]
+    return episode_counts, sex_outcome.sort_index().sort_index(axis=1)
 
 
 def get_univariate_subplots(df, save_filename, extension, show):
@@ -98,26 +147,25 @@ def get_univariate_subplots(df, save_filename, extension, show):
         does not return any value.
     """
     fig, axes = plt.subplots(1, 3, figsize=(25, 7))
+    # Plots receive column views instead of the frame, so nothing is copied
+    age = df["age"]
+    outcome = df["hospital_outcome_cat"]
 
     # Histogram of Age grouped by target
-    sns.histplot(data=df, x="age", hue="hospital_outcome_cat", bins=30, ax=axes[0])
+    sns.histplot(x=age, hue=outcome, bins=30, ax=axes[0])
     axes[0].set_title("Histogram of Age grouped by Hospital Outcome")
     axes[0].set_xlabel("Age")
     axes[0].set_ylabel("Count")
     axes[0].legend(title="Outcome", labels=["Died", "Survived"])
 
     # Barplot of Number of Episodes
-    df["episode_number"].value_counts().sort_index().plot(
-        kind="bar", color="#49759c", ax=axes[1]
-    )
+    episode_counts, pivot_sex_target = count_tables(df)
+    episode_counts.plot(kind="bar", color="#49759c", ax=axes[1])
     axes[1].set_title("Number of Episodes Distribution")
     axes[1].set_xlabel("Episode Number")
     axes[1].set_ylabel("Count")
 
     # Heatmap: Hospital Outcome vs Sex
-    pivot_sex_target = df.pivot_table(
-        index="sex", columns="hospital_outcome_cat", aggfunc="size", fill_value=0
-    )
     sns.heatmap(pivot_sex_target, annot=True, fmt=".0f", cmap="Blues", ax=axes[2])
     axes[2].set_title("Count of Cases by Sex and Hospital Outcome")
     axes[2].set_xlabel("Hospital Outcome")
@@ -156,29 +204,24 @@ def get_multivariate_subplots(df, save_filename, extension, show):
         return any value.
     """
     fig, axes = plt.subplots(1, 3, figsize=(25, 7))
+    # Plots receive column views instead of the frame, so nothing is copied
+    age = df["age"]
+    outcome = df["hospital_outcome_cat"]
 
     # Boxplot of Age by Hospital Outcome
-    sns.boxplot(
-        data=df,
-        x="hospital_outcome_cat",
-        y="age",
-        hue="hospital_outcome_cat",
-        ax=axes[0],
-    )
+    sns.boxplot(x=outcome, y=age, hue=outcome, ax=axes[0])
     axes[0].set_title("Boxplot of Age by Hospital Outcome")
     axes[0].set_xlabel("Outcome")
     axes[0].set_ylabel("Age")
 
     # Boxplot of Age by Hospital Outcome and Episode Number
-    sns.boxplot(
-        data=df, x="episode_number", y="age", hue="hospital_outcome_cat", ax=axes[1]
-    )
+    sns.boxplot(x=df["episode_number"], y=age, hue=outcome, ax=axes[1])
     axes[1].set_xlabel("Episode Number")
     axes[1].set_ylabel("Age")
     axes[1].set_title("Boxplot of Age by Hospital Outcome")
     axes[1].legend_.remove()
     # Boxplot of Age by Sex and Hospital Outcome
-    sns.boxplot(data=df, x="sex", y="age", hue="hospital_outcome_cat")
+    sns.boxplot(x=df["sex"], y=age, hue=outcome)
     axes[2].set_xlabel("Sex")
     axes[2].set_ylabel("Age")
     axes[2].set_title("Boxplot of Age by Sex and Hospital Outcome")
@@ -201,12 +244,72 @@ def get_multivariate_subplots(df, save_filename, extension, show):
         plt.show()
 
 
+def encode_columns(df, use_cols):
+    """Project the selected columns into a single numeric array.
+
+    Only the requested columns are read. Numeric columns are converted to
+    float and categorical columns are replaced by the codes of their sorted
+    categories (as ``astype("category").cat.codes``, e.g. female=0, male=1);
+    missing values become NaN.
+
+    Args:
+        df (pandas.DataFrame): The input DataFrame.
+        use_cols (list[str]): Columns to encode.
+
+    Returns:
+        numpy.ndarray: A float array of shape ``(len(df), len(use_cols))``.
+    """
+    encoded = np.empty((len(df), len(use_cols)))
+    for j, col in enumerate(use_cols):
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values):
+            encoded[:, j] = values.to_numpy(dtype=float, na_value=np.nan)
+        else:
+            codes, _ = pd.factorize(values, sort=True)
+            encoded[:, j] = np.where(codes == -1, np.nan, codes)
+    return encoded
+
+
+def correlation_matrix(encoded):
+    """Compute the Pearson correlation matrix of the columns of an array.
+
+    The array is centered in place. As in ``DataFrame.corr``, rows with
+    missing values are only dropped for the pairs of columns they affect,
+    and constant columns have NaN correlations.
+
+    Args:
+        encoded (numpy.ndarray): A 2-D float array, e.g. from ``encode_columns``.
+
+    Returns:
+        numpy.ndarray: The ``(k, k)`` correlation matrix.
+    """
+    observed = ~np.isnan(encoded)
+    if not observed.all():
+        k = encoded.shape[1]
+        corr = np.empty((k, k))
+        for i in range(k):
+            for j in range(i, k):
+                both = observed[:, i] & observed[:, j]
+                corr[i, j] = corr[j, i] = correlation_matrix(
+                    encoded[both][:, [i, j]]
+                )[0, 1]
+        return corr
+    encoded -= encoded.mean(axis=0)
+    cov = encoded.T @ encoded
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(std, std)
+    return np.clip(corr, -1, 1)
+
+
 def get_corr_heatmap(df, use_cols, save_filename, extension, show):
     """Generate and save a correlation heatmap for selected columns.
 
     This function computes a correlation matrix using only the columns
-    specified in ``use_cols``. It then generates a heatmap visualization
-    of the correlations, saves the resulting figure, and optionally displays it.
+    specified in ``use_cols``, which are encoded into a single array (see
+    ``encode_columns``) without copying the rest of the frame. It then
+    generates a heatmap visualization of the correlations, saves the
+    resulting figure, and optionally displays it.
 
     Args:
         df (pandas.DataFrame): The input DataFrame containing the data.
@@ -224,13 +327,15 @@ def get_corr_heatmap(df, use_cols, save_filename, extension, show):
         but does not return any value.
     """
     # Convert categories to 0/1
-    df_ = df.copy()
-    df_["sex"] = df_["sex"].astype("category").cat.codes
-    correlation_matrix = df_[use_cols].corr()
+    corr = pd.DataFrame(
+        correlation_matrix(encode_columns(df, use_cols)),
+        index=use_cols,
+        columns=use_cols,
+    )
 
     plt.figure(figsize=(5, 4))
     sns.heatmap(
-        correlation_matrix,
+        corr,
         annot=True,
         cmap="coolwarm",
         vmin=-1,
@@ -277,6 +382,8 @@ def get_corr_heatmap(df, use_cols, save_filename, extension, show):
     type=bool,
     help="Show the generated plots. If false, plots are saved but not displayed.",
 )
+@profile_option
+@instrumented("run_eda")
 def main(filename, file_extention, use_corr_cols, show_visualizations):
     """Runs the EDA steps.
 
@@ -303,24 +410,33 @@ def main(filename, file_extention, use_corr_cols, show_visualizations):
         but does not return any value.
     """
     click.echo("# EXPLORATORY DATA ANALYSIS\n\n")
-    df = load_train_df(filename)
-    compute_descriptive_stats(df)
+    with span("load_train_df") as step:
+        df = load_train_df(filename)
+        step["rows"] = len(df)
+    with span("compute_descriptive_stats", rows=len(df)):
+        compute_descriptive_stats(df)
     click.echo("\n[Univariate and Bivariate visualizations]\n")
-    get_univariate_subplots(
-        df, UNIVARIATE_FILENAME, extension=file_extention, show=show_visualizations
-    )
+    with span("univariate_figure", rows=len(df)):
+        get_univariate_subplots(
+            df, UNIVARIATE_FILENAME, extension=file_extention, show=show_visualizations
+        )
     click.echo("\n[Univariate and Bivariate visualizations]\n")
-    get_multivariate_subplots(
-        df, MULTIVARIATE_FILENAME, extension=file_extention, show=show_visualizations
-    )
+    with span("multivariate_figure", rows=len(df)):
+        get_multivariate_subplots(
+            df,
+            MULTIVARIATE_FILENAME,
+            extension=file_extention,
+            show=show_visualizations,
+        )
     click.echo("\n[Correlation Heatmap]\n\n")
-    get_corr_heatmap(
-        df,
-        use_corr_cols,
-        CORR_HEATMAP_FILENAME,
-        extension=file_extention,
-        show=show_visualizations,
-    )
+    with span("corr_heatmap", rows=len(df)):
+        get_corr_heatmap(
+            df,
+            use_corr_cols,
+            CORR_HEATMAP_FILENAME,
+            extension=file_extention,
+            show=show_visualizations,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+import gzip
+import os
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 100_000
+COMPRESSIONS = (None, "gzip", "zstd")
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def infer_compression(path):
+    """
+    Returns the compression implied by a file extension.
+
+    Parameters
+    ----------
+    path : str
+        Destination path, e.g. ``sepsis_train.csv.gz``.
+
+    Returns
+    -------
+    str or None
+        ``"gzip"`` for ``.gz``, ``"zstd"`` for ``.zst``, None otherwise.
+    """
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(str(path))[1].lower())
+
+
+def _open_text(path, mode, compression):
+    if compression is None:
+        return open(path, mode + "t", newline="")
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", newline="")
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "zstd compression requires the optional 'zstandard' package; "
+            "install it or use gzip"
+        )
+    return zstandard.open(path, mode + "t", newline="")
+
+
+def _iter_chunks(data, chunk_size):
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, max(len(data), 1), chunk_size):
+            yield data.iloc[start : start + chunk_size]
+        return
+    yield from data
+
+
+def save_csv(
+    data,
+    path,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    compression="infer",
+    append=False,
+    index=False,
+):
+    """
+    Writes a DataFrame, or a stream of DataFrame chunks, to a CSV file.
+
+    Rows are formatted and written ``chunk_size`` at a time, so memory does
+    not grow with the size of the output, and an iterator of chunks (e.g.
+    ``synthetic_cohort.iter_cohort_chunks``) is never materialized.
+
+    The file is first written next to ``path`` under a temporary name and
+    renamed into place once complete, so an interrupted run never leaves a
+    partial CSV behind for later stages to read. With ``append=True`` the
+    new rows are added to an existing file (the header is only written if
+    the file is new or empty); if writing fails the file is truncated back
+    to its previous size. Compressed files are appended as new gzip members
+    or zstd frames, which readers decode as one stream.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame, pandas.Series or iterable of pandas.DataFrame
+        Rows to write. Chunks must all have the same columns.
+    path : str
+        Destination CSV file. Missing parent directories are created.
+    chunk_size : int, optional
+        Rows per write when ``data`` is a DataFrame. Default is 100,000.
+    compression : str or None, optional
+        One of ``None``, ``"gzip"``, ``"zstd"``, or ``"infer"`` to pick it
+        from the ``.gz``/``.zst`` extension of ``path``. Default is "infer".
+    append : bool, optional
+        Add the rows to an existing file instead of replacing it.
+    index : bool, optional
+        Whether to write the DataFrame index. Default is False.
+
+    Returns
+    -------
+    int
+        Number of data rows written.
+
+    Raises
+    ------
+    ValueError
+        If ``compression`` or ``chunk_size`` is not valid.
+    ImportError
+        If zstd compression is requested and ``zstandard`` is not installed.
+    """
+    if compression == "infer":
+        compression = infer_compression(path)
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compression must be one of {COMPRESSIONS} or 'infer'")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if append and os.path.exists(path):
+        return _append_csv(data, path, chunk_size, compression, index)
+
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.tmp-{os.getpid()}")
+    try:
+        with _open_text(tmp_path, "w", compression) as f:
+            n_rows = _write_chunks(f, data, chunk_size, index, header=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return n_rows
+
+
+def _append_csv(data, path, chunk_size, compression, index):
+    original_size = os.path.getsize(path)
+    try:
+        with _open_text(path, "a", compression) as f:
+            return _write_chunks(f, data, chunk_size, index, header=original_size == 0)
+    except BaseException:
+        with open(path, "r+b") as f:
+            f.truncate(original_size)
+        raise
+
+
+def _write_chunks(f, data, chunk_size, index, header):
+    n_rows = 0
+    for chunk in _iter_chunks(data, chunk_size):
+        chunk.to_csv(f, header=header, index=index)
+        header = False
+        n_rows += len(chunk)
+    return n_rows
@@ -0,0 +1,284 @@
+import click
+import os
+import sqlite3
+import sys
+import joblib
+import numpy as np
+import pandas as pd
+from instrumentation import instrumented, profile_option, span
+from model_artifacts import (
+    LOGISTIC_FAMILY,
+    load_artifact,
+    logistic_artifact,
+    predict_proba,
+)
+from processed_store import iter_dataset
+
+PAR_PATH = os.path.dirname(os.path.dirname(__file__))
+MODEL_PATH = os.path.join(PAR_PATH, "results/models/logistic_reg.pkl")
+SQL_PATH = os.path.join(PAR_PATH, "results/models/logistic_reg.sql")
+D_TEST_FILENAME = os.path.join(PAR_PATH, "data/processed/sepsis_test.csv")
+DEFAULT_TABLE = "sepsis_cohort"
+PROBABILITY_COLUMN = "survival_probability"
+LOG_ODDS_COLUMN = "log_odds"
+PARITY_TOLERANCE = 1e-9
+
+
+def quote_identifier(name):
+    """Quotes a table or column name for SQL."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _literal(value):
+    """A float or string as an SQL literal, floats at full precision."""
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    value = float(value)
+    if not np.isfinite(value):
+        raise ValueError(f"Cannot express {value} in SQL")
+    return f"({value!r})" if value < 0 else repr(value)
+
+
+def log_odds_sql(artifact, source="src"):
+    """
+    SQL expression for the log-odds of survival of one row.
+
+    Every term of the pipeline is written out: ``(x - mean) / scale`` for
+    the standardized columns and one ``CASE`` per one-hot encoded category.
+    Unknown or missing categories, like missing numbers, give NULL instead
+    of an error.
+
+    Parameters
+    ----------
+    artifact : dict
+        A logistic artifact (see ``model_artifacts.logistic_artifact``).
+    source : str, optional
+        Alias of the table the feature columns are read from.
+
+    Returns
+    -------
+    str
+        The expression.
+    """
+    terms = [_literal(artifact["intercept"])]
+    coef = iter(artifact["coef"])
+    for feature, mean, scale in zip(
+        artifact["numeric_features"],
+        artifact["numeric_mean"],
+        artifact["numeric_scale"],
+    ):
+        column = f"{source}.{quote_identifier(feature)}"
+        standardized = f"({column} - {_literal(mean)}) / {_literal(scale)}"
+        terms.append(f"{_literal(next(coef))} * ({standardized})")
+    for i, feature in enumerate(artifact["categorical_features"]):
+        categories = [str(c) for c in artifact["categories"][i] if c != ""]
+        known = ", ".join(_literal(c) for c in categories)
+        column = f"{source}.{quote_identifier(feature)}"
+        for j, category in enumerate(categories):
+            if j == artifact["drop_idx"][i]:
+                continue
+            terms.append(
+                f"{_literal(next(coef))} * (CASE WHEN {column} = {_literal(category)} "
+                f"THEN 1.0 WHEN {column} IN ({known}) THEN 0.0 END)"
+            )
+    return "\n    + ".join(terms)
+
+
+def probability_sql(artifact, log_odds=LOG_ODDS_COLUMN):
+    """
+    SQL expression for the survival probability given the log-odds column.
+
+    This is the logistic link or, for an isotonic recalibrated artifact,
+    its piecewise-linear map of the log-odds (clipped at both ends).
+
+    Parameters
+    ----------
+    artifact : dict
+        A logistic artifact.
+    log_odds : str, optional
+        Column or expression holding the log-odds.
+
+    Returns
+    -------
+    str
+        The expression.
+    """
+    if "calibration_x" not in artifact:
+        return f"1.0 / (1.0 + EXP(-{log_odds}))"
+    x, y = artifact["calibration_x"], artifact["calibration_y"]
+    branches = [f"WHEN {log_odds} <= {_literal(x[0])} THEN {_literal(y[0])}"]
+    for x0, x1, y0, y1 in zip(x[:-1], x[1:], y[:-1], y[1:]):
+        slope = (y1 - y0) / (x1 - x0)
+        branches.append(
+            f"WHEN {log_odds} <= {_literal(x1)} THEN "
+            f"{_literal(y0)} + ({log_odds} - {_literal(x0)}) * {_literal(slope)}"
+        )
+    branches.append(f"ELSE {_literal(y[-1])}")
+    return "CASE\n        " + "\n        ".join(branches) + "\n    END"
+
+
+def scoring_query(artifact, table=DEFAULT_TABLE):
+    """
+    SELECT statement scoring every row of `table` inside the database.
+
+    Parameters
+    ----------
+    artifact : dict
+        A logistic artifact.
+    table : str, optional
+        Table (or view) with the ``age``, ``sex`` and ``episode_number``
+        columns, optionally schema-qualified (``schema.table``).
+
+    Returns
+    -------
+    str
+        A query returning all columns of `table` plus ``log_odds`` and
+        ``survival_probability``.
+
+    Raises
+    ------
+    ValueError
+        If the artifact is not a logistic model.
+    """
+    if str(artifact["family"]) != LOGISTIC_FAMILY:
+        raise ValueError(f"Only {LOGISTIC_FAMILY} artifacts can be exported to SQL")
+    probability = probability_sql(artifact, f"scored.{LOG_ODDS_COLUMN}")
+    table = ".".join(quote_identifier(part) for part in table.split("."))
+    return (
+        f"SELECT scored.*,\n    {probability} AS {PROBABILITY_COLUMN}\n"
+        f"FROM (\n  SELECT src.*,\n    {log_odds_sql(artifact)}"
+        f" AS {LOG_ODDS_COLUMN}\n  FROM {table} AS src\n) AS scored"
+    )
+
+
+def sqlite_parity(artifact, X, expected, tolerance=PARITY_TOLERANCE):
+    """
+    Scores `X` with the exported SQL on an in-memory SQLite database and
+    compares the result with `expected`.
+
+    Parameters
+    ----------
+    artifact : dict
+        A logistic artifact.
+    X : pandas.DataFrame
+        Raw features.
+    expected : array-like
+        Survival probabilities of the reference implementation, e.g.
+        ``pipeline.predict_proba(X)[:, 1]``.
+    tolerance : float, optional
+        Largest accepted absolute difference.
+
+    Returns
+    -------
+    dict
+        ``rows``, ``max_abs_diff`` and whether the check ``passed``.
+    """
+    with sqlite3.connect(":memory:") as conn:
+        X.assign(_row=np.arange(len(X))).to_sql(DEFAULT_TABLE, conn, index=False)
+        scored = pd.read_sql_query(
+            f"SELECT _row, {PROBABILITY_COLUMN} "
+            f"FROM ({scoring_query(artifact, DEFAULT_TABLE)}) ORDER BY _row",
+            conn,
+        )
+    diff = np.abs(scored[PROBABILITY_COLUMN].to_numpy(dtype=np.float64) - expected)
+    max_abs_diff = float(np.max(diff)) if len(diff) else 0.0
+    return {
+        "rows": len(scored),
+        "max_abs_diff": max_abs_diff,
+        "passed": bool(max_abs_diff <= tolerance),
+    }
+
+
+def load_model(path):
+    """
+    Loads a pickled pipeline or a compact artifact for export.
+
+    Returns
+    -------
+    tuple
+        ``(artifact, score)``, where ``score(X)`` gives the survival
+        probabilities of the loaded model itself.
+    """
+    if str(path).endswith(".npz"):
+        artifact = load_artifact(path)
+        return artifact, lambda X: predict_proba(artifact, X)[:, 1]
+    pipeline = joblib.load(path)
+    return logistic_artifact(pipeline), lambda X: pipeline.predict_proba(X)[:, 1]
+
+
+@click.command()
+@click.option(
+    "--model",
+    default=MODEL_PATH,
+    show_default=True,
+    help="Pickled logistic pipeline (.pkl) or compact artifact (.npz) to export",
+)
+@click.option(
+    "--table",
+    default=DEFAULT_TABLE,
+    show_default=True,
+    help="Warehouse table with the age, sex and episode_number columns",
+)
+@click.option(
+    "--output",
+    default=SQL_PATH,
+    show_default=True,
+    help="Destination of the scoring query",
+)
+@click.option(
+    "--validation_data",
+    default=D_TEST_FILENAME,
+    show_default=True,
+    help="Processed CSV (or store) scored in SQLite to check parity",
+)
+@click.option(
+    "--tolerance",
+    type=float,
+    default=PARITY_TOLERANCE,
+    show_default=True,
+    help="Largest accepted absolute difference to predict_proba",
+)
+@profile_option
+@instrumented("sql_export")
+def main(model, table, output, validation_data, tolerance):
+    """
+    Exports the logistic model as an SQL scoring query and checks that it
+    reproduces predict_proba on a local SQLite database.
+    """
+    artifact, score = load_model(model)
+    query = scoring_query(artifact, table)
+
+    with span("sqlite_parity") as step:
+        # A processed store is checked one partition at a time
+        checks = [
+            sqlite_parity(artifact, X, score(X), tolerance)
+            for X in iter_dataset(validation_data)
+        ]
+        parity = {
+            "rows": sum(check["rows"] for check in checks),
+            "max_abs_diff": max(
+                (check["max_abs_diff"] for check in checks), default=0.0
+            ),
+            "passed": all(check["passed"] for check in checks),
+        }
+        step["rows"] = parity["rows"]
+    click.echo(
+        f"[SQL Export] SQLite parity on {parity['rows']} rows: "
+        f"max abs difference {parity['max_abs_diff']:.3g}"
+    )
+    if not parity["passed"]:
+        click.echo(
+            f"ERROR: SQL scoring differs from predict_proba by more than {tolerance}"
+        )
+        sys.exit(1)
+
+    dir_ = os.path.dirname(output)
+    if dir_:
+        os.makedirs(dir_, exist_ok=True)
+    with open(output, "w") as f:
+        f.write(query + ";\n")
+    click.echo(f"Successfully saved scoring query to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+import click
+import numpy as np
+import pandas as pd
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from instrumentation import instrumented, profile_option, span
+from record_keys import AGE_MAX, EPISODE_MAX
+from resources import bounded_map
+from save_csv import save_csv
+
+PAR_PATH = os.path.dirname(os.path.dirname(__file__))
+DEFAULT_RAW_DATA_PATH = os.path.join(PAR_PATH, "data/raw")
+D_REFERENCE_FILENAMES = [
+    os.path.join(
+        DEFAULT_RAW_DATA_PATH, "s41598-020-73558-3_sepsis_survival_primary_cohort.csv"
+    ),
+    os.path.join(
+        DEFAULT_RAW_DATA_PATH, "s41598-020-73558-3_sepsis_survival_study_cohort.csv"
+    ),
+]
+RAW_COLUMNS = [
+    "age_years",
+    "sex_0male_1female",
+    "episode_number",
+    "hospital_outcome_1alive_0dead",
+]
+OUTPUT_FORMATS = ["csv", "parquet"]
+DEFAULT_CHUNK_SIZE = 1_000_000
+DEFAULT_SEED = 15
+# Chunks generated ahead of the consumer per worker process
+CHUNKS_PER_WORKER = 2
+# Disclosure controls of the fitted distribution, see fit_cohort_distribution
+AGE_BAND_WIDTH = 5
+MIN_CELL_COUNT = 10
+SMOOTHING = 0.01
+DISTRIBUTION_COLUMNS = ["age_band_start"] + RAW_COLUMNS[1:]
+
+
+def _cell_grid():
+    """Every (age band, sex, episode, outcome) cell of the validation ranges."""
+    grid = pd.MultiIndex.from_product(
+        [
+            np.arange(0, AGE_MAX + 1, AGE_BAND_WIDTH),
+            [0, 1],
+            np.arange(EPISODE_MAX + 1),
+            [0, 1],
+        ],
+        names=DISTRIBUTION_COLUMNS,
+    )
+    return grid
+
+
+def fit_cohort_distribution(filenames):
+    """
+    Fits a smoothed, coarsened joint distribution of the raw cohort columns.
+
+    Records are counted per (age band, sex, episode, outcome) cell on a
+    fixed grid that covers the validation ranges (ages 0-AGE_MAX in bands
+    of AGE_BAND_WIDTH years, episodes 0-EPISODE_MAX). Cells with fewer than
+    MIN_CELL_COUNT records are suppressed, and a SMOOTHING share of the
+    probability mass is spread evenly over the whole grid. This guarantees:
+
+    - exact ages never leave this function; synthetic ages are drawn
+      uniformly within their band;
+    - a patient in a cell with fewer than MIN_CELL_COUNT records, e.g. a
+      single 97-year-old on their 9th episode, has no influence on the
+      distribution beyond the total record count;
+    - every cell of the grid has a probability of at least
+      ``SMOOTHING / n_cells``, so the presence of a cell in a synthetic
+      cohort says nothing about its presence in the real data.
+
+    It is a disclosure-control measure, not a differential privacy
+    guarantee: the frequencies of well-populated cells are kept.
+
+    Parameters
+    ----------
+    filenames : list of str
+        Raw cohort CSV files in the UCI format.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per cell of the grid with the DISTRIBUTION_COLUMNS and a
+        ``probability`` column that sums to 1.
+    """
+    grid = _cell_grid()
+    counts = pd.Series(0.0, index=grid)
+    for filename in filenames:
+        df = pd.read_csv(filename, usecols=RAW_COLUMNS).dropna()
+        df["age_years"] = df["age_years"] // AGE_BAND_WIDTH * AGE_BAND_WIDTH
+        file_counts = df.value_counts(sort=False)
+        file_counts.index = file_counts.index.set_names(DISTRIBUTION_COLUMNS)
+        # Values outside the validation ranges have no cell and are dropped
+        counts = counts.add(file_counts.reindex(grid, fill_value=0), fill_value=0)
+    counts[counts < MIN_CELL_COUNT] = 0
+    total = counts.sum()
+    empirical = counts / total if total > 0 else counts
+    weight = SMOOTHING if total > 0 else 1.0
+    probability = (1 - weight) * empirical + weight / len(grid)
+    return probability.rename("probability").reset_index()
+
+
+def sample_cohort_chunk(distribution, n_rows, seed_sequence):
+    """
+    Samples ``n_rows`` raw-format records from a fitted distribution.
+
+    A cell is drawn for every record, then its age uniformly within the
+    cell's age band.
+
+    Parameters
+    ----------
+    distribution : pandas.DataFrame
+        Output of ``fit_cohort_distribution``.
+    n_rows : int
+        Number of records to draw.
+    seed_sequence : numpy.random.SeedSequence
+        Seed of this chunk's random stream.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Synthetic records with the columns in RAW_COLUMNS.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    cells = rng.choice(
+        len(distribution), size=n_rows, p=distribution["probability"].to_numpy()
+    )
+    band_start = distribution["age_band_start"].to_numpy()[cells]
+    band_width = np.minimum(AGE_BAND_WIDTH, AGE_MAX + 1 - band_start)
+    records = {"age_years": band_start + rng.integers(0, band_width)}
+    for column in RAW_COLUMNS[1:]:
+        records[column] = distribution[column].to_numpy()[cells]
+    return pd.DataFrame(records)
+
+
+def _chunk_plan(n_rows, chunk_size, seed):
+    # One independent child seed per chunk makes the output identical no
+    # matter how many workers generate it
+    sizes = [min(chunk_size, n_rows - start) for start in range(0, n_rows, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return sizes, seeds
+
+
+def iter_cohort_chunks(
+    distribution, n_rows, chunk_size=DEFAULT_CHUNK_SIZE, seed=DEFAULT_SEED, n_jobs=1
+):
+    """
+    Generates a synthetic cohort as a sequence of chunks, optionally in parallel.
+
+    Every chunk gets its own child seed spawned from ``seed``, so the
+    generated records depend only on ``seed``, ``n_rows`` and ``chunk_size``,
+    never on ``n_jobs``. At most CHUNKS_PER_WORKER chunks per worker are
+    generated ahead of the consumer, so a slow writer does not make the
+    whole cohort pile up in memory.
+
+    Parameters
+    ----------
+    distribution : pandas.DataFrame
+        Output of ``fit_cohort_distribution``.
+    n_rows : int
+        Total number of records.
+    chunk_size : int, optional
+        Number of records per chunk.
+    seed : int, optional
+        Root seed of the cohort.
+    n_jobs : int, optional
+        Number of worker processes; -1 uses all cores, 1 runs in the current
+        process.
+
+    Yields
+    ------
+    pandas.DataFrame
+        Chunks of raw-format records, in order.
+    """
+    sizes, seeds = _chunk_plan(n_rows, chunk_size, seed)
+    n_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+    if n_workers == 1:
+        for size, seed_sequence in zip(sizes, seeds):
+            yield sample_cohort_chunk(distribution, size, seed_sequence)
+        return
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        yield from bounded_map(
+            pool,
+            sample_cohort_chunk,
+            repeat(distribution),
+            sizes,
+            seeds,
+            max_in_flight=n_workers * CHUNKS_PER_WORKER,
+        )
+
+
+def _write_parquet_part(distribution, size, seed_sequence, path):
+    sample_cohort_chunk(distribution, size, seed_sequence).to_parquet(path, index=False)
+    return path
+
+
+def write_cohort(
+    distribution,
+    n_rows,
+    output,
+    output_format="csv",
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    seed=DEFAULT_SEED,
+    n_jobs=1,
+):
+    """
+    Writes a synthetic cohort to disk.
+
+    CSV output is a single file in the raw UCI format that can be passed
+    directly to ``data_transformation.clean_data``; chunks are generated in
+    parallel and streamed in order through ``save_csv.save_csv``, so a
+    ``.gz`` or ``.zst`` output path is compressed. Parquet output is a directory of
+    ``part-NNNNN.parquet`` files, each generated and written by a worker.
+
+    Parameters
+    ----------
+    distribution : pandas.DataFrame
+        Output of ``fit_cohort_distribution``.
+    n_rows : int
+        Total number of records.
+    output : str
+        Destination CSV file, or destination directory for parquet.
+    output_format : str, optional
+        One of OUTPUT_FORMATS.
+    chunk_size, seed, n_jobs
+        See ``iter_cohort_chunks``.
+
+    Returns
+    -------
+    str
+        The path written to.
+
+    Raises
+    ------
+    ValueError
+        If ``output_format`` is not supported.
+    ImportError
+        If parquet output is requested and ``pyarrow`` is not installed.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Output format must be one of {OUTPUT_FORMATS}")
+
+    if output_format == "csv":
+        chunks = iter_cohort_chunks(distribution, n_rows, chunk_size, seed, n_jobs)
+        save_csv(chunks, output)
+        return output
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            "Parquet output requires the optional 'pyarrow' package; "
+            "install it or use the csv format"
+        )
+    os.makedirs(output, exist_ok=True)
+    sizes, seeds = _chunk_plan(n_rows, chunk_size, seed)
+    paths = [os.path.join(output, f"part-{i:05d}.parquet") for i in range(len(sizes))]
+    n_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+    if n_workers == 1:
+        list(map(_write_parquet_part, [distribution] * len(sizes), sizes, seeds, paths))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            for _ in bounded_map(
+                pool,
+                _write_parquet_part,
+                repeat(distribution),
+                sizes,
+                seeds,
+                paths,
+                max_in_flight=n_workers * CHUNKS_PER_WORKER,
+            ):
+                pass
+    return output
+
+
+@click.command()
+@click.option(
+    "--n_rows",
+    "-n",
+    type=int,
+    required=True,
+    help="Number of synthetic records to generate",
+)
+@click.option(
+    "--output",
+    "-o",
+    required=True,
+    help="Output CSV file (csv) or directory of part files (parquet)",
+)
+@click.option(
+    "--reference",
+    "-r",
+    multiple=True,
+    default=D_REFERENCE_FILENAMES,
+    show_default=True,
+    help="Raw cohort CSV(s) to fit the joint distribution on",
+)
+@click.option(
+    "--output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="csv",
+    show_default=True,
+    help="Output format",
+)
+@click.option(
+    "--chunk_size",
+    type=int,
+    default=DEFAULT_CHUNK_SIZE,
+    show_default=True,
+    help="Number of records generated per chunk",
+)
+@click.option("--seed", type=int, default=DEFAULT_SEED, show_default=True)
+@click.option(
+    "--n_jobs",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of worker processes (-1 for all cores)",
+)
+@profile_option
+@instrumented("generate_cohort")
+def generate_cohort(n_rows, output, reference, output_format, chunk_size, seed, n_jobs):
+    """
+    Fits a smoothed, coarsened joint distribution of age, sex, episode
+    number and outcome on the raw cohorts and writes a synthetic cohort of
+    any size.
+    """
+    click.echo(
+        f"[Synthetic cohort] Fitting joint distribution on {len(reference)} file(s)"
+    )
+    try:
+        with span("fit_cohort_distribution"):
+            distribution = fit_cohort_distribution(reference)
+    except Exception as e:
+        click.echo(f"ERROR: Could not read reference cohorts: {e}")
+        sys.exit(1)
+    click.echo(
+        f"[Synthetic cohort] {len(distribution)} cells, smoothed and with cells "
+        f"under {MIN_CELL_COUNT} records suppressed"
+    )
+
+    click.echo(f"[Synthetic cohort] Generating {n_rows} records...")
+    with span("write_cohort", rows=n_rows):
+        write_cohort(
+            distribution,
+            n_rows,
+            output,
+            output_format=output_format,
+            chunk_size=chunk_size,
+            seed=seed,
+            n_jobs=n_jobs,
+        )
+    click.echo(f"Successfully saved synthetic cohort to: {output}")
+
+
+if __name__ == "__main__":
+    generate_cohort()
@@ -27,33 +27,71 @@ from sklearn.model_selection import (
 )
 import shap
 import io
+import json
+import os
+import struct
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from resources import (
+    bounded_map,
+    limit_worker_threads,
+    worker_count,
+    worker_threads,
+)
+
+UCI_SEPSIS_URL = (
+    "https://archive.ics.uci.edu/static/public/827/"
+    "sepsis%2Bsurvival%2Bminimal%2Bclinical%2Brecords.zip"
+)
+RANDOM_PREFIX = "RANDOM_"
+SHAP_CHUNK_SIZE = 10_000
+SHAP_STORE_MAGIC = b"SHAPMMAP"
+SHAP_STORE_VERSION = 1
+SHAP_STORE_ALIGNMENT = 64
+SHAP_PLOT_MAX_ROWS = 20_000
+SHAP_BACKGROUND_SIZE = 100
+# Chunks queued per SHAP worker process, bounding memory of the parallel runner
+SHAP_CHUNKS_PER_WORKER = 2
+# Label of the subgroup of rows with a missing value in compute_subgroup_metrics
+MISSING_GROUP = "missing"
 
 # Importing Data
-def load_ucisepsis(inner_filename):
+def fetch_archive(url=UCI_SEPSIS_URL):
     """
-    Downloads and extracts the Sepsis Survival Minimal Clinical Records dataset
-    from the UCI Machine Learning Repository.
+    Downloads a UCI dataset archive and returns its inner ZIP.
+
+    UCI archives are a ZIP holding a single inner ZIP with the data files.
 
     Parameters:
-        inner_filename (str): The CSV file to load from inside the inner ZIP.
+        url (str): URL of the outer ZIP archive. Defaults to the UCI sepsis
+            archive; point it at a local server to load a fixture archive.
 
     Returns:
-        pandas.DataFrame: The loaded dataset.
-    """
-    
-    # URL of the outer zip
-    url = (
-        "https://archive.ics.uci.edu/static/public/827/"
-        "sepsis%2Bsurvival%2Bminimal%2Bclinical%2Brecords.zip"
-    )
+        bytes: The inner ZIP archive.
 
-    # Download outer zip
+    Raises:
+        requests.HTTPError: If the download fails.
+    """
     r = requests.get(url)
+    r.raise_for_status()
     outer_zip = zipfile.ZipFile(io.BytesIO(r.content))
-
-    # Extract inner zip
     inner_zip_name = outer_zip.namelist()[0]
-    inner_zip_bytes = outer_zip.read(inner_zip_name)
+    return outer_zip.read(inner_zip_name)
+
+
+def read_cohort(inner_zip_bytes, inner_filename):
+    """
+    Reads one CSV file from an inner ZIP returned by ``fetch_archive``.
+
+    Parameters:
+        inner_zip_bytes (bytes): The inner ZIP archive.
+        inner_filename (str): The CSV file to load from inside the inner ZIP.
+
+    Returns:
+        pandas.DataFrame: The loaded dataset.
+    """
     inner_zip = zipfile.ZipFile(io.BytesIO(inner_zip_bytes))
 
     # Safety check: ensure the requested file exists
@@ -66,34 +104,130 @@ def load_ucisepsis(inner_filename):
     # Load CSV
     with inner_zip.open(inner_filename) as f:
         return pd.read_csv(f)
-    
+
+
+def load_ucisepsis(inner_filename, url=UCI_SEPSIS_URL):
+    """
+    Downloads and extracts the Sepsis Survival Minimal Clinical Records dataset
+    from the UCI Machine Learning Repository.
+
+    Parameters:
+        inner_filename (str): The CSV file to load from inside the inner ZIP.
+        url (str): URL of the outer ZIP archive. Defaults to the UCI archive;
+            point it at a local server to load a fixture archive.
+
+    Returns:
+        pandas.DataFrame: The loaded dataset.
+    """
+    return read_cohort(fetch_archive(url), inner_filename)
+
 # EDA
-def plot_bivariates(df, var, y, figsize=(10, 5)):
+def compute_bivariates(df, features, y, q=5):
+    """
+    Computes quantile bins, volume and event rate for many features at once.
+
+    Each requested column is binned in one vectorized pass: quantile edges
+    are computed with NumPy, each value is mapped to its bin with
+    ``searchsorted`` and the volumes and events of every bin are aggregated
+    with one ``np.bincount`` each. Columns are read one at a time, so the
+    input frame is never copied and memory stays at a few arrays of
+    ``len(df)``. Bins follow ``pd.qcut(..., duplicates="drop")`` semantics
+    (right-closed intervals, repeated edges collapsed) and missing values
+    are left out, as in ``groupby``.
+
+    Parameters:
+    df: DataFrame containing the input data
+    features: List of numeric feature columns to analyze
+    y: Name of the binary target variable
+    q: Number of quantile bins per feature. Default is 5
+
+    Output:
+    A tidy DataFrame with one row per (feature, bin) and the columns
+    ``feature``, ``bin``, ``lower``, ``upper``, ``label``, ``volume``,
+    ``events`` and ``event_rate``.
+    """
+    features = list(features)
+    is_event = df[y].to_numpy(dtype=float) == 1
+    probs = np.linspace(0, 1, q + 1)
+
+    offsets = np.zeros(len(features) + 1, dtype=np.int64)
+    lower, upper, volume, events = [], [], [], []
+    for j, feature in enumerate(features):
+        col = df[feature].to_numpy(dtype=float)
+        present = ~np.isnan(col)
+        edges = np.unique(np.nanquantile(col, probs)) if present.any() else []
+        edges = np.asarray(edges, dtype=float)
+        edges = edges[~np.isnan(edges)]
+        if len(edges) < 2:
+            # Constant (or fully missing) feature collapses into a single bin
+            edges = np.repeat(edges[:1] if len(edges) else np.nan, 2)
+        n_col_bins = len(edges) - 1
+        # Missing values are left out of both counts
+        col_codes = np.searchsorted(edges[1:-1], col[present], side="left")
+        volume.append(np.bincount(col_codes, minlength=n_col_bins))
+        events.append(
+            np.bincount(col_codes[is_event[present]], minlength=n_col_bins)
+        )
+        lower.append(edges[:-1])
+        upper.append(edges[1:])
+        offsets[j + 1] = offsets[j] + n_col_bins
+
+    n_cells = int(offsets[-1])
+    volume = np.concatenate(volume) if volume else np.array([], dtype=np.int64)
+    events = np.concatenate(events) if events else np.array([], dtype=np.int64)
+    n_bins = np.diff(offsets)
+    bivariates = pd.DataFrame(
+        {
+            "feature": np.repeat(features, n_bins),
+            "bin": np.arange(n_cells) - np.repeat(offsets[:-1], n_bins),
+            "lower": np.concatenate(lower) if lower else np.array([]),
+            "upper": np.concatenate(upper) if upper else np.array([]),
+            "volume": volume,
+            "events": events,
+        }
+    )
+    # The lowest bin is closed on the left, as with qcut's include_lowest
+    bivariates["label"] = [
+        f"{'[' if b == 0 else '('}{lo:.3g}, {hi:.3g}]"
+        for b, lo, hi in zip(bivariates["bin"], bivariates["lower"], bivariates["upper"])
+    ]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bivariates["event_rate"] = events / volume
+    # A feature that is entirely missing has no bins to report
+    bivariates = bivariates.loc[bivariates["lower"].notna()].reset_index(drop=True)
+    return bivariates[
+        ["feature", "bin", "lower", "upper", "label", "volume", "events", "event_rate"]
+    ]
+
+
+def plot_bivariates(df, var, y, figsize=(10, 5), bivariates=None):
     """
     Plots the relationship between a feature and a binary target variable.
-    Handles both continuous and categorical variables. For continuous
-    features, it applies quantile binning. For high cardinality categorical
-    variables, it normalizes categories. Displays application counts as bars
-    and event rate as a line.
+    Continuous features are split into quantile bins. Displays application
+    counts as bars and event rate as a line.
 
     Parameters:
     df: DataFrame containing the input data
     var: Name of the feature column to analyze
     y: Name of the binary target variable
     figsize: Tuple that defines the size of the plot. Default is (10, 5)
+    bivariates: Optional tidy table from ``compute_bivariates``. When many
+    features are plotted, compute it once and pass it here to avoid
+    re-binning the data for every feature.
 
     Output:
     A matplotlib plot displaying volume (bar) and event rate (line) per bin
     or category of the feature.
     """
-    df_ = df.copy()
-    df_[var] = pd.qcut(df[var], 5, duplicates="drop")
-    by_var = df_.groupby(var).agg({y: [np.size, np.mean]})[y]
+    if bivariates is None:
+        bivariates = compute_bivariates(df, [var], y)
+    by_var = bivariates.loc[bivariates["feature"] == var]
 
-    Y1 = by_var["size"]
-    Y2 = by_var["mean"]
-    Y_mean = np.ones(shape=(len(Y1.index))) * df_[y].mean()
-    index = np.arange(len(Y1.index))
+    Y1 = by_var["volume"].to_numpy()
+    Y2 = by_var["event_rate"].to_numpy()
+    labels = by_var["label"].tolist()
+    Y_mean = np.ones(shape=(len(Y1))) * df[y].mean()
+    index = np.arange(len(Y1))
     pcts = np.arange(0.0, 1.1, 0.1)
     fig = plt.figure(figsize=figsize)
     plt.bar(index, Y1, alpha=0.3, color="gray")
@@ -101,7 +235,7 @@ def plot_bivariates(df, var, y, figsize=(10, 5)):
     plt.ylabel("# applications")
     plt.twinx()
     plt.gca().set_xticks(index)
-    plt.gca().set_xticklabels([Y1.index[i] for i in index], rotation=40)
+    plt.gca().set_xticklabels(labels, rotation=40)
     plt.plot(index, Y_mean, label=f"overall avg {y} rate", color="#1F75FE")
     plt.plot(index, Y2, marker="o", label=f"{y} rate", color="#E62020")
     plt.gca().set_yticks(pcts)
@@ -114,15 +248,163 @@ def plot_bivariates(df, var, y, figsize=(10, 5)):
     plt.show()
 
 
+# MODEL EVALUATION
+def _grouped_auc(groups, scores, y_true, n_groups):
+    """
+    ROC AUC of every group; all arrays must already be sorted by score.
+
+    The rows are regrouped with a stable sort of the group codes, which
+    keeps them sorted by score within each group. AUC is then the
+    Mann-Whitney statistic: for every positive, the negatives of its group
+    with a lower score plus half of those with the same score, taken from
+    grouped cumulative sums over (group, score) blocks.
+    """
+    # Small unsigned codes are sorted with a linear-time radix sort
+    code_dtype = np.uint16 if n_groups < 2**16 else np.int64
+    grouped = np.argsort(groups.astype(code_dtype), kind="stable")
+    g, s, y_ = groups[grouped], scores[grouped], y_true[grouped]
+
+    new_block = np.ones(len(g), dtype=bool)
+    new_block[1:] = (g[1:] != g[:-1]) | (s[1:] != s[:-1])
+    block = np.cumsum(new_block) - 1
+    block_group = g[new_block]
+    block_pos = np.bincount(block, weights=y_)
+    block_neg = np.bincount(block, weights=1 - y_)
+
+    # Negatives ranked below each block within its own group
+    group_neg = np.bincount(block_group, weights=block_neg, minlength=n_groups)
+    group_offset = np.concatenate([[0], np.cumsum(group_neg)[:-1]])
+    neg_below = np.cumsum(block_neg) - block_neg - group_offset[block_group]
+    wins = np.bincount(
+        block_group, weights=block_pos * (neg_below + block_neg / 2), minlength=n_groups
+    )
+    group_pos = np.bincount(block_group, weights=block_pos, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return wins / (group_pos * group_neg)
+
+
+def compute_subgroup_metrics(df, slices, y, score, threshold=0.5):
+    """
+    Computes discrimination, classification and calibration metrics for
+    every subgroup of every slice at once.
+
+    The rows are sorted by score a single time. Each slice (a tuple of
+    group columns, ``()`` for all rows) is then evaluated with grouped
+    cumulative sums and ``np.bincount`` over integer group codes, instead of
+    filtering the frame and calling scikit-learn once per subgroup. AUC
+    matches ``roc_auc_score`` (ties count one half); precision and recall
+    use ``score > threshold`` as the predicted class, like
+    ``LogisticRegression.predict``. Metrics that are undefined for a
+    subgroup (e.g. AUC with a single class) are NaN. Rows with a missing
+    group value form their own subgroup, labelled MISSING_GROUP.
+
+    Parameters:
+    df: DataFrame with the group columns, the target and the scores
+    slices: List of tuples of group columns, e.g. [(), ("sex",), ("sex", "age_band")]
+    y: Name of the binary target variable
+    score: Name of the predicted probability column
+    threshold: Probability above which the positive class is predicted
+
+    Output:
+    A tidy DataFrame with one row per non-empty subgroup and the columns
+    ``slice``, the group columns (missing where not part of the slice),
+    ``n``, ``n_positive``, ``auc``, ``precision``, ``recall``,
+    ``observed_rate``, ``mean_predicted`` and ``calibration_error``
+    (mean predicted minus observed rate).
+    """
+    group_columns = list(dict.fromkeys(c for cols in slices for c in cols))
+    y_true = df[y].to_numpy(dtype=float)
+    scores = df[score].to_numpy(dtype=float)
+    predicted = (scores > threshold).astype(float)
+
+    # The one comparison sort, shared by every slice
+    order = np.argsort(scores, kind="stable")
+    sorted_scores, sorted_y = scores[order], y_true[order]
+    codes, levels = {}, {}
+    for column in group_columns:
+        codes[column], levels[column] = pd.factorize(df[column], sort=True)
+        missing = codes[column] < 0
+        if missing.any():
+            # factorize codes missing values as -1; give them a level of their own
+            codes[column][missing] = len(levels[column])
+            levels[column] = levels[column].astype(object).append(
+                pd.Index([MISSING_GROUP], dtype=object)
+            )
+
+    frames = []
+    for columns in slices:
+        shape = tuple(len(levels[c]) for c in columns)
+        n_groups = int(np.prod(shape))
+        groups = (
+            np.ravel_multi_index(tuple(codes[c] for c in columns), shape)
+            if columns
+            else np.zeros(len(df), dtype=np.int64)
+        )
+        n = np.bincount(groups, minlength=n_groups)
+        positives = np.bincount(groups, weights=y_true, minlength=n_groups)
+        predicted_pos = np.bincount(groups, weights=predicted, minlength=n_groups)
+        true_pos = np.bincount(groups, weights=y_true * predicted, minlength=n_groups)
+        score_sum = np.bincount(groups, weights=scores, minlength=n_groups)
+        auc = _grouped_auc(groups[order], sorted_scores, sorted_y, n_groups)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frame = pd.DataFrame(
+                {
+                    "slice": " x ".join(columns) if columns else "overall",
+                    "n": n,
+                    "n_positive": positives.astype(np.int64),
+                    "auc": auc,
+                    "precision": true_pos / predicted_pos,
+                    "recall": true_pos / positives,
+                    "observed_rate": positives / n,
+                    "mean_predicted": score_sum / n,
+                }
+            )
+        if columns:
+            cells = np.unravel_index(np.arange(n_groups), shape)
+            for column, cell in zip(columns, cells):
+                frame[column] = levels[column][cell]
+        frames.append(frame[n > 0])
+
+    metrics = pd.concat(frames, ignore_index=True)
+    metrics["calibration_error"] = metrics["mean_predicted"] - metrics["observed_rate"]
+    return metrics[
+        ["slice"]
+        + group_columns
+        + [
+            "n",
+            "n_positive",
+            "auc",
+            "precision",
+            "recall",
+            "observed_rate",
+            "mean_predicted",
+            "calibration_error",
+        ]
+    ]
+
+
 # MODEL EXPLAINABILITY
 
 
-def get_shaps(model, x_s, x_features, model_tag, max_display=100):
+def get_shaps(
+    model, x_s, x_features, model_tag, max_display=100, store_path=None,
+    chunk_size=SHAP_CHUNK_SIZE, n_jobs=1, approximate=False,
+    feature_perturbation="tree_path_dependent", max_samples=None,
+    random_state=None,
+):
     """
     Computes and visualizes SHAP values for a tree-based model using the
     SHAP library. Prints a summary plot of feature importances and returns
     the raw SHAP values.
 
+    With the defaults the whole input is explained in a single call. When
+    ``store_path`` is given or ``n_jobs`` is not 1, the input is explained in
+    chunks by ``iter_tree_shap_chunks`` (in a process pool when ``n_jobs``
+    is not 1); with a ``store_path`` the chunks are written to a
+    memory-mapped SHAP store (see ``write_shap_store``) and the summary plot
+    is drawn from it.
+
     Parameters:
     model: Trained tree-based model compatible with SHAP (e.g., XGBoost,
     LightGBM)
@@ -131,45 +413,549 @@ def get_shaps(model, x_s, x_features, model_tag, max_display=100):
     model_tag: String label to identify the model in the printed output
     max_display: Maximum number of features to display in the summary plot
     (default is 100)
+    store_path: Optional path of the on-disk SHAP store to write
+    chunk_size: Number of rows explained at a time in the batched path
+    (default is SHAP_CHUNK_SIZE)
+    n_jobs: Number of worker processes, at least 1; -1 uses all cores
+    (default is 1)
+    approximate: Use the fast Saabas approximation instead of exact Tree
+    SHAP (default is False)
+    feature_perturbation: "tree_path_dependent" (default) or
+    "interventional"; the latter uses a background sample of ``x_s``
+    max_samples: Optional cap on the number of explained rows; a random
+    subset of that size is explained instead of the full input
+    random_state: Seed used for the row and background samples
 
     Output:
-    shap_values: Array of SHAP values for each sample and feature
+    shap_values: 2D array of positive-class SHAP values (see
+    ``positive_class_shap``) for each (explained) sample and feature, the
+    same on every path; a read-only memory map when ``store_path`` is given
     """
+    shap_workers(n_jobs)
     print("\n", f"SHAP values for {model_tag}".center(40))
-    explainer = shap.TreeExplainer(model)
-    shap_values = explainer.shap_values(x_s)
-    shap.summary_plot(
-        shap_values, x_s, feature_names=x_features, max_display=max_display
+    rows = sample_rows(x_s.shape[0], max_samples, random_state)
+    if rows is not None:
+        x_s = _take_rows(x_s, rows)
+
+    if store_path is None and n_jobs == 1:
+        explainer = make_tree_explainer(
+            model, x_s, feature_perturbation, random_state=random_state
+        )
+        shap_values = positive_class_shap(
+            explainer.shap_values(x_s, approximate=approximate)
+        )
+        shap.summary_plot(
+            shap_values, x_s, feature_names=x_features, max_display=max_display
+        )
+        return shap_values
+
+    chunks = iter_tree_shap_chunks(
+        model,
+        x_s,
+        chunk_size=chunk_size,
+        n_jobs=n_jobs,
+        approximate=approximate,
+        feature_perturbation=feature_perturbation,
+        random_state=random_state,
     )
+    if store_path is None:
+        shap_values = np.concatenate(list(chunks))
+        shap.summary_plot(
+            shap_values, x_s, feature_names=x_features, max_display=max_display
+        )
+        return shap_values
+
+    write_shap_store(store_path, chunks, x_s.shape[0], x_features)
+    shap_summary_plot_from_store(store_path, x_s, max_display=max_display)
+    shap_values, _ = open_shap_store(store_path)
     return shap_values
 
 
-def get_important_features_important_than(shap_values, features):
-    # Compute mean absolute SHAP values for each feature
-    shap_importances = np.mean(np.abs(shap_values), axis=0)
+def sample_rows(n_rows, max_samples, random_state=None):
+    """
+    Picks a sorted random subset of row positions, or None when no cap applies.
 
-    # Create a list of tuples (feature name, importance)
-    feature_importance = list(zip(features, shap_importances))
+    Parameters:
+    n_rows: Number of rows available
+    max_samples: Maximum number of rows to keep (None keeps all rows)
+    random_state: Seed for the random generator
 
-    # Sort the list by importance
-    sorted_feature_importance = sorted(
-        feature_importance, key=lambda x: x[1], reverse=True
+    Output:
+    rows: Sorted 1D integer array of row positions, or None
+    """
+    if max_samples is None or max_samples >= n_rows:
+        return None
+    rng = np.random.default_rng(random_state)
+    return np.sort(rng.choice(n_rows, size=max_samples, replace=False))
+
+
+def _take_rows(x, rows):
+    return x.iloc[rows] if hasattr(x, "iloc") else x[rows]
+
+
+def make_tree_explainer(
+    model, x_s, feature_perturbation="tree_path_dependent",
+    n_background=SHAP_BACKGROUND_SIZE, random_state=None,
+):
+    """
+    Builds a ``shap.TreeExplainer`` in the requested perturbation mode.
+
+    Parameters:
+    model: Trained tree-based model
+    x_s: Transformed input features; a sample of at most ``n_background``
+    rows is used as background data in "interventional" mode
+    feature_perturbation: "tree_path_dependent" or "interventional"
+    n_background: Size of the interventional background sample (default is
+    SHAP_BACKGROUND_SIZE)
+    random_state: Seed for the background sample
+
+    Output:
+    explainer: shap.TreeExplainer
+
+    Raises:
+    ValueError: If ``feature_perturbation`` is not a supported mode
+    """
+    if feature_perturbation == "tree_path_dependent":
+        return shap.TreeExplainer(model, feature_perturbation=feature_perturbation)
+    if feature_perturbation == "interventional":
+        rows = sample_rows(x_s.shape[0], n_background, random_state)
+        background = x_s if rows is None else _take_rows(x_s, rows)
+        return shap.TreeExplainer(
+            model, data=background, feature_perturbation=feature_perturbation
+        )
+    raise ValueError(
+        "feature_perturbation must be 'tree_path_dependent' or 'interventional', "
+        f"got '{feature_perturbation}'"
     )
 
-    # Print sorted feature importance
-    feature_importance_dict = {}
-    i = 1
-    for feature, importance in sorted_feature_importance:
-        feature_importance_dict[f"{feature}"] = i
-        i += 1
-    rand_min_importance = np.min(
-        [feature_importance_dict["RANDOM_1"], feature_importance_dict["RANDOM_2"]]
+
+# Explainer shared by every chunk a worker process evaluates
+_WORKER_EXPLAINER = None
+
+
+def _init_shap_worker(explainer, threads=None):
+    global _WORKER_EXPLAINER
+    _WORKER_EXPLAINER = explainer
+    limit_worker_threads(threads)
+
+
+def _explain_chunk(chunk, approximate):
+    return positive_class_shap(
+        _WORKER_EXPLAINER.shap_values(chunk, approximate=approximate)
     )
-    important_enough_features = sorted(
-        [
-            v[0]
-            for v in list(feature_importance_dict.items())
-            if v[1] < rand_min_importance
-        ]
+
+
+def shap_workers(n_jobs):
+    """
+    Number of SHAP worker processes for `n_jobs`.
+
+    -1 means the workers of the active ``resources.resource_limits`` plan,
+    or all cores outside of one.
+
+    Raises:
+    ValueError: If `n_jobs` is neither -1 nor a positive integer
+    """
+    if n_jobs == -1:
+        return worker_count(os.cpu_count())
+    if not isinstance(n_jobs, (int, np.integer)) or n_jobs < 1:
+        raise ValueError(f"n_jobs must be -1 or a positive integer, got {n_jobs}")
+    return int(n_jobs)
+
+
+def iter_tree_shap_chunks(
+    model, x_s, chunk_size=SHAP_CHUNK_SIZE, n_jobs=1, approximate=False,
+    feature_perturbation="tree_path_dependent", random_state=None, verbose=True,
+):
+    """
+    Explains ``x_s`` chunk by chunk with a TreeExplainer, optionally in parallel.
+
+    The explainer is built once and handed to each worker process when the
+    pool starts, so it is not re-sent with every chunk. At most
+    ``SHAP_CHUNKS_PER_WORKER`` chunks per worker are in flight at a time;
+    the next one is only submitted once a finished chunk has been consumed,
+    so memory stays bounded however large ``x_s`` is. Chunks are yielded in
+    row order as positive-class 2D arrays, ready for ``write_shap_store``.
+
+    Parameters:
+    model: Trained tree-based model
+    x_s: Transformed input features
+    chunk_size: Number of rows per chunk (default is SHAP_CHUNK_SIZE)
+    n_jobs: Number of worker processes, at least 1; -1 uses all cores (or
+    the workers of the active ``resources.resource_limits`` plan, whose
+    thread limit the workers also apply), 1 runs in the current process
+    (default is 1)
+    approximate: Use the Saabas approximation (default is False)
+    feature_perturbation: "tree_path_dependent" or "interventional"
+    random_state: Seed for the interventional background sample
+    verbose: Print progress after every chunk (default is True)
+
+    Output:
+    Generator of 2D SHAP arrays, one per chunk, in row order
+
+    Raises:
+    ValueError: If `n_jobs` is invalid (raised immediately, not on first use)
+    """
+    n_workers = shap_workers(n_jobs)
+    explainer = make_tree_explainer(
+        model, x_s, feature_perturbation, random_state=random_state
+    )
+    return _iter_shap_chunks(
+        explainer, x_s, chunk_size, n_workers, approximate, verbose
+    )
+
+
+def _iter_shap_chunks(explainer, x_s, chunk_size, n_workers, approximate, verbose):
+    n_rows = x_s.shape[0]
+    chunks = (
+        _take_rows(x_s, slice(start, start + chunk_size))
+        for start in range(0, n_rows, chunk_size)
+    )
+    n_chunks = -(-n_rows // chunk_size)
+
+    if n_workers == 1:
+        _init_shap_worker(explainer)
+        results = (_explain_chunk(chunk, approximate) for chunk in chunks)
+        yield from _report_shap_progress(results, n_chunks, n_rows, verbose)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_init_shap_worker,
+        initargs=(explainer, worker_threads()),
+    ) as pool:
+        max_in_flight = n_workers * SHAP_CHUNKS_PER_WORKER
+        results = bounded_map(
+            pool,
+            _explain_chunk,
+            chunks,
+            repeat(approximate),
+            max_in_flight=max_in_flight,
+        )
+        yield from _report_shap_progress(results, n_chunks, n_rows, verbose)
+
+
+def _report_shap_progress(results, n_chunks, n_rows, verbose):
+    start_time = time.perf_counter()
+    done = 0
+    for i, values in enumerate(results, start=1):
+        done += values.shape[0]
+        if verbose:
+            elapsed = time.perf_counter() - start_time
+            print(
+                f"[SHAP] chunk {i}/{n_chunks}: {done}/{n_rows} rows "
+                f"({done / max(elapsed, 1e-9):,.0f} rows/s)",
+                flush=True,
+            )
+        yield values
+
+
+def positive_class_shap(shap_values):
+    """
+    Reduces classifier SHAP output to a 2D matrix for the positive class.
+
+    Depending on the model and SHAP version, classifiers return a list with
+    one array per class or a 3D array of shape (n_samples, n_features,
+    n_classes). Regressors and linear explainers already return 2D arrays.
+
+    Parameters:
+    shap_values: SHAP output as returned by ``explainer.shap_values``
+
+    Output:
+    shap_values: 2D array of shape (n_samples, n_features)
+    """
+    if isinstance(shap_values, list):
+        return np.asarray(shap_values[-1])
+    shap_values = np.asarray(shap_values)
+    if shap_values.ndim == 3:
+        return shap_values[..., -1]
+    return shap_values
+
+
+def mean_abs_shap(shap_values, chunk_size=SHAP_CHUNK_SIZE):
+    """
+    Computes the mean absolute SHAP value of each feature in bounded memory.
+
+    The matrix is consumed in row chunks and only a per-feature running sum
+    is kept, so a full float64 copy of ``|shap_values|`` is never built. This
+    also works on memory-mapped arrays and on iterables of chunks, e.g. the
+    generator of a batched explanation run or a list of its outputs.
+
+    Parameters:
+    shap_values: A 2D array-like of shape (n_samples, n_features), or an
+    iterator (e.g. a generator), list or tuple of 2D chunks that share the
+    same number of columns (their row counts may differ)
+    chunk_size: Number of rows processed at a time when an array is given
+    (default is SHAP_CHUNK_SIZE)
+
+    Output:
+    importances: 1D float64 array with the mean |SHAP| of each feature
+    """
+    if isinstance(shap_values, Iterator):
+        chunks = shap_values
+    elif isinstance(shap_values, (list, tuple)) and all(
+        np.ndim(chunk) == 2 for chunk in shap_values
+    ):
+        # A sequence of chunks rather than a nested list of rows
+        chunks = iter(shap_values)
+    else:
+        # Arrays, memory maps, DataFrames, nested lists, ...
+        matrix = np.asarray(shap_values)
+        chunks = (
+            matrix[start : start + chunk_size]
+            for start in range(0, matrix.shape[0], chunk_size)
+        )
+
+    total = None
+    n_rows = 0
+    for chunk in chunks:
+        chunk = np.asarray(chunk)
+        chunk_sum = np.abs(chunk).sum(axis=0, dtype=np.float64)
+        total = chunk_sum if total is None else total + chunk_sum
+        n_rows += chunk.shape[0]
+
+    if total is None or n_rows == 0:
+        raise ValueError("No SHAP values were provided")
+    return total / n_rows
+
+
+def get_important_features_important_than(
+    shap_values, features, random_features=None, chunk_size=SHAP_CHUNK_SIZE
+):
+    """
+    Selects the features that rank above every random probe feature.
+
+    Random probe columns (noise features added on purpose before training)
+    give a data-driven importance floor: a real feature is kept only if its
+    mean |SHAP| ranks higher than the best-ranked probe. Importances are
+    computed in chunks with ``mean_abs_shap`` and ranked with ``argsort``.
+
+    Parameters:
+    shap_values: A 2D SHAP array, or an iterator, list or tuple of 2D chunks
+    (see ``mean_abs_shap``)
+    features: List of feature names, aligned with the SHAP columns
+    random_features: List of probe feature names. By default every feature
+    whose name starts with RANDOM_PREFIX is treated as a probe
+    chunk_size: Number of rows processed at a time when an array is given
+    (default is SHAP_CHUNK_SIZE)
+
+    Output:
+    important_enough_features: Alphabetically sorted list of the features
+    ranked above all random probes
+    """
+    features = np.asarray(features, dtype=object)
+    if random_features is None:
+        random_features = [f for f in features if str(f).startswith(RANDOM_PREFIX)]
+    is_probe = np.isin(features, list(random_features))
+    if not is_probe.any():
+        raise ValueError(
+            f"None of the random probe features {list(random_features)} "
+            "were found in features"
+        )
+
+    importances = mean_abs_shap(shap_values, chunk_size=chunk_size)
+    if len(importances) != len(features):
+        raise ValueError(
+            f"SHAP values have {len(importances)} columns but "
+            f"{len(features)} feature names were given"
+        )
+
+    # Rank 1 is the most important feature; ties keep their original order
+    order = np.argsort(-importances, kind="stable")
+    ranks = np.empty(len(features), dtype=np.int64)
+    ranks[order] = np.arange(1, len(features) + 1)
+
+    rand_min_rank = ranks[is_probe].min()
+    return sorted(features[ranks < rand_min_rank].tolist())
+
+
+# SHAP STORAGE
+def create_shap_store(path, n_rows, feature_names):
+    """
+    Creates an on-disk, memory-mapped float32 array for SHAP values.
+
+    The file starts with ``SHAP_STORE_MAGIC``, a little-endian uint32 header
+    length and a JSON header (format version, dtype, shape and feature
+    names), padded so the data block starts on a ``SHAP_STORE_ALIGNMENT``
+    byte boundary. The data block is a C-ordered (n_rows, n_features) float32
+    matrix.
+
+    Parameters:
+    path: Path of the store file to create (overwritten if it exists)
+    n_rows: Number of explained samples
+    feature_names: List of feature names, one per SHAP column
+
+    Output:
+    shap_values: Writable numpy.memmap of shape (n_rows, n_features)
+    """
+    feature_names = [str(f) for f in feature_names]
+    header = json.dumps(
+        {
+            "version": SHAP_STORE_VERSION,
+            "dtype": "<f4",
+            "shape": [int(n_rows), len(feature_names)],
+            "feature_names": feature_names,
+        }
+    ).encode("utf-8")
+    prefix_len = len(SHAP_STORE_MAGIC) + 4
+    padding = -(prefix_len + len(header)) % SHAP_STORE_ALIGNMENT
+    header += b" " * padding
+
+    dir_ = os.path.dirname(path)
+    if dir_:
+        os.makedirs(dir_, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(SHAP_STORE_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        # Reserve the data block so it can be mapped before it is written
+        f.truncate(prefix_len + len(header) + int(n_rows) * len(feature_names) * 4)
+    return np.memmap(
+        path,
+        dtype="<f4",
+        mode="r+",
+        offset=prefix_len + len(header),
+        shape=(int(n_rows), len(feature_names)),
+    )
+
+
+def _read_shap_store_header(path):
+    with open(path, "rb") as f:
+        magic = f.read(len(SHAP_STORE_MAGIC))
+        if magic != SHAP_STORE_MAGIC:
+            raise ValueError(f"'{path}' is not a SHAP store file")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    if header["version"] != SHAP_STORE_VERSION:
+        raise ValueError(
+            f"Unsupported SHAP store version {header['version']} "
+            f"(expected {SHAP_STORE_VERSION})"
+        )
+    header["offset"] = len(SHAP_STORE_MAGIC) + 4 + header_len
+    return header
+
+
+def write_shap_store(path, chunks, n_rows, feature_names):
+    """
+    Streams SHAP value chunks into a new memory-mapped SHAP store.
+
+    Only one chunk is held in memory at a time; values are cast to float32
+    as they are written.
+
+    Parameters:
+    path: Path of the store file to create
+    chunks: Iterable of 2D arrays whose rows add up to ``n_rows``
+    n_rows: Total number of explained samples
+    feature_names: List of feature names, one per SHAP column
+
+    Output:
+    path: The path of the written store
+
+    Raises:
+    ValueError: If the chunks do not add up to (n_rows, len(feature_names))
+    """
+    store = create_shap_store(path, n_rows, feature_names)
+    start = 0
+    for chunk in chunks:
+        chunk = np.asarray(chunk)
+        stop = start + chunk.shape[0]
+        if stop > n_rows or chunk.shape[1:] != store.shape[1:]:
+            raise ValueError(
+                f"SHAP chunk of shape {chunk.shape} does not fit a store of "
+                f"shape {store.shape} at row {start}"
+            )
+        store[start:stop] = chunk
+        start = stop
+    if start != n_rows:
+        raise ValueError(f"Expected {n_rows} rows of SHAP values, got {start}")
+    store.flush()
+    del store
+    return path
+
+
+def open_shap_store(path):
+    """
+    Opens a SHAP store read-only without loading it into memory.
+
+    Parameters:
+    path: Path of the store file
+
+    Output:
+    shap_values: Read-only numpy.memmap of shape (n_rows, n_features)
+    feature_names: List of feature names stored in the header
+    """
+    header = _read_shap_store_header(path)
+    shap_values = np.memmap(
+        path,
+        dtype=header["dtype"],
+        mode="r",
+        offset=header["offset"],
+        shape=tuple(header["shape"]),
+    )
+    return shap_values, header["feature_names"]
+
+
+def iter_shap_store(path, chunk_size=SHAP_CHUNK_SIZE):
+    """
+    Yields consecutive row chunks of a SHAP store.
+
+    Parameters:
+    path: Path of the store file
+    chunk_size: Number of rows per chunk (default is SHAP_CHUNK_SIZE)
+
+    Output:
+    Generator of float32 arrays of shape (<= chunk_size, n_features)
+    """
+    shap_values, _ = open_shap_store(path)
+    for start in range(0, shap_values.shape[0], chunk_size):
+        yield np.asarray(shap_values[start : start + chunk_size])
+
+
+def shap_importance_from_store(path, chunk_size=SHAP_CHUNK_SIZE):
+    """
+    Computes the mean |SHAP| importance table by streaming a SHAP store.
+
+    Parameters:
+    path: Path of the store file
+    chunk_size: Number of rows read at a time (default is SHAP_CHUNK_SIZE)
+
+    Output:
+    pandas.DataFrame with the columns ``feature`` and ``mean_abs_shap``,
+    sorted from most to least important
+    """
+    _, feature_names = open_shap_store(path)
+    importances = mean_abs_shap(iter_shap_store(path, chunk_size))
+    return (
+        pd.DataFrame({"feature": feature_names, "mean_abs_shap": importances})
+        .sort_values("mean_abs_shap", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def shap_summary_plot_from_store(
+    path, x_s, max_rows=SHAP_PLOT_MAX_ROWS, **plot_kwargs
+):
+    """
+    Draws a SHAP summary plot from a SHAP store.
+
+    A beeswarm plot cannot be drawn from a stream, so at most ``max_rows``
+    evenly spaced rows are read from the store (and from ``x_s``) to draw it.
+
+    Parameters:
+    path: Path of the store file
+    x_s: Feature matrix aligned with the stored SHAP rows, used for coloring
+    max_rows: Maximum number of rows drawn (default is SHAP_PLOT_MAX_ROWS)
+    plot_kwargs: Extra keyword arguments passed to ``shap.summary_plot``
+    """
+    shap_values, feature_names = open_shap_store(path)
+    n_rows = shap_values.shape[0]
+    if n_rows > max_rows:
+        rows = np.linspace(0, n_rows - 1, max_rows).astype(np.int64)
+    else:
+        rows = np.arange(n_rows)
+    x_rows = x_s.iloc[rows] if hasattr(x_s, "iloc") else x_s[rows]
+    shap.summary_plot(
+        np.asarray(shap_values[rows]),
+        x_rows,
+        feature_names=feature_names,
+        **plot_kwargs,
     )
-    return important_enough_features
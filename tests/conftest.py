@@ -0,0 +1,54 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import make_column_transformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+# Modules in src/ import each other by name (they are run as scripts), so
+# src/ itself must be importable alongside the repository root.
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+@pytest.fixture
+def make_training_data():
+    """Builds synthetic cohorts ``(X, y)`` of `n` records where survival
+    falls with age; the same seed always gives the same records."""
+
+    def make(n):
+        rng = np.random.default_rng(15)
+        X = pd.DataFrame(
+            {
+                "age": rng.integers(0, 100, size=n),
+                "sex": rng.choice(["male", "female"], size=n),
+                "episode_number": rng.integers(1, 6, size=n),
+            }
+        )
+        y = pd.Series(
+            (rng.random(n) > X["age"] / 150).astype(int), name="hospital_outcome"
+        )
+        return X, y
+
+    return make
+
+
+@pytest.fixture
+def logistic_pipeline():
+    """The unfitted logistic pipeline of the modeling script."""
+    return make_pipeline(
+        make_column_transformer(
+            (StandardScaler(), ["age", "episode_number"]),
+            (OneHotEncoder(drop="if_binary"), ["sex"]),
+        ),
+        LogisticRegression(),
+    )
+
+
+@pytest.fixture
+def fitted_pipeline(make_training_data, logistic_pipeline):
+    """``logistic_pipeline`` fitted on 500 records; returns ``(pipeline, X, y)``."""
+    X, y = make_training_data(500)
+    return logistic_pipeline.fit(X, y), X, y
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.utils import compute_bivariates
+
+
+@pytest.fixture
+def cohort_df():
+    rng = np.random.default_rng(15)
+    return pd.DataFrame(
+        {
+            "age": rng.integers(0, 100, size=500),
+            "episode_number": rng.integers(1, 6, size=500),
+            "hospital_outcome": rng.integers(0, 2, size=500),
+        }
+    )
+
+
+# Expected use cases
+def test_compute_bivariates_matches_qcut(cohort_df):
+    table = compute_bivariates(cohort_df, ["age", "episode_number"], "hospital_outcome")
+
+    for var in ["age", "episode_number"]:
+        bins = pd.qcut(cohort_df[var], 5, duplicates="drop")
+        expected = cohort_df.groupby(bins, observed=False)["hospital_outcome"].agg(
+            ["size", "mean"]
+        )
+        got = table.loc[table["feature"] == var]
+        assert got["volume"].tolist() == expected["size"].tolist()
+        np.testing.assert_allclose(got["event_rate"], expected["mean"])
+
+
+def test_compute_bivariates_does_not_modify_input(cohort_df):
+    before = cohort_df.copy()
+    compute_bivariates(cohort_df, ["age"], "hospital_outcome")
+    pd.testing.assert_frame_equal(cohort_df, before)
+
+
+# Edge cases
+def test_compute_bivariates_constant_feature(cohort_df):
+    cohort_df["constant"] = 1
+    table = compute_bivariates(cohort_df, ["constant"], "hospital_outcome")
+
+    assert len(table) == 1
+    assert table["volume"].iloc[0] == len(cohort_df)
+
+
+def test_compute_bivariates_skips_missing_values(cohort_df):
+    cohort_df["age"] = cohort_df["age"].astype(float)
+    cohort_df.loc[:9, "age"] = np.nan
+    table = compute_bivariates(cohort_df, ["age"], "hospital_outcome")
+
+    assert table["volume"].sum() == len(cohort_df) - 10
+
+
+# Error cases
+def test_compute_bivariates_missing_column_raises(cohort_df):
+    with pytest.raises(KeyError):
+        compute_bivariates(cohort_df, ["bmi"], "hospital_outcome")
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import src.count_models as cm
+
+
+@pytest.fixture
+def counts(make_training_data):
+    return cm.build_count_table(*make_training_data(2000))
+
+
+def _exact_fit(model, counts, class_weight):
+    """Tightly converged scikit-learn fit with the preprocessing of `model`."""
+    weights = counts["count"].to_numpy()
+    if class_weight == "balanced":
+        totals = counts.groupby(cm.TARGET)["count"].sum()
+        class_weight = (weights.sum() / (2 * totals)).to_dict()
+    return LogisticRegression(
+        C=0.3, class_weight=class_weight, solver="newton-cholesky", tol=1e-12
+    ).fit(model[0].transform(counts[cm.FEATURES]), counts[cm.TARGET], weights)
+
+
+# Expected use cases
+@pytest.mark.parametrize("class_weight", [None, "balanced"])
+def test_replicate_with_original_counts_is_the_model(counts, class_weight):
+    model = cm.fit_from_counts(counts, C=0.3, class_weight=class_weight)
+    expected = _exact_fit(model, counts, class_weight)
+
+    fit = cm.fit_replicates(model, counts, counts["count"].to_numpy()[None])
+
+    scaler = model[0].named_transformers_["standardscaler"]
+    np.testing.assert_allclose(fit["mean"][0], scaler.mean_)
+    np.testing.assert_allclose(fit["scale"][0], scaler.scale_)
+    np.testing.assert_allclose(fit["intercept"], expected.intercept_, atol=1e-8)
+    np.testing.assert_allclose(fit["coef"], expected.coef_, atol=1e-8)
+
+
+def test_replicates_are_fitted_independently(counts):
+    model = cm.fit_from_counts(counts, C=0.3)
+    rng = np.random.default_rng(0)
+    weights = rng.multinomial(
+        counts["count"].sum(), counts["count"] / counts["count"].sum(), size=3
+    )
+
+    batch = cm.fit_replicates(model, counts, weights)
+    single = cm.fit_replicates(model, counts, weights[1:2])
+
+    np.testing.assert_allclose(batch["coef"][1], single["coef"][0])
+    assert not np.allclose(batch["coef"][0], batch["coef"][1])
+
+
+def test_intervals_cover_the_estimates(counts):
+    model = cm.fit_from_counts(counts, C=0.3)
+    replicates = cm.bootstrap_logistic(model, counts, n_replicates=200)
+
+    coefs = cm.coefficient_intervals(model, replicates)
+    profiles = counts[cm.FEATURES].drop_duplicates()
+    predictions = cm.prediction_intervals(model, replicates, profiles)
+
+    assert list(coefs["term"]) == ["intercept", "age", "episode_number", "is_male"]
+    assert (coefs["lower"] < coefs["estimate"]).all()
+    assert (coefs["estimate"] < coefs["upper"]).all()
+    assert len(predictions) == len(profiles)
+    assert (predictions["lower"] <= predictions["upper"]).all()
+    inside = predictions["probability"].between(predictions["lower"], predictions["upper"])
+    assert inside.mean() > 0.9
+
+
+# Edge cases
+def test_bootstrap_is_reproducible(counts):
+    model = cm.fit_from_counts(counts, C=0.3)
+
+    first = cm.bootstrap_logistic(model, counts, n_replicates=20, random_state=1)
+    second = cm.bootstrap_logistic(model, counts, n_replicates=20, random_state=1)
+
+    np.testing.assert_array_equal(first["coef"], second["coef"])
+
+
+def test_unconverged_fit_warns(counts):
+    model = cm.fit_from_counts(counts, C=0.3)
+
+    with pytest.warns(ConvergenceWarning, match="max_iter"):
+        cm.fit_replicates(model, counts, counts["count"].to_numpy()[None], max_iter=1)
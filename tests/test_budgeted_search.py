@@ -0,0 +1,143 @@
+import json
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import src.modeling_and_evaluation as me
+
+
+@pytest.fixture
+def training_data(make_training_data):
+    return make_training_data(300)
+
+
+@pytest.fixture
+def pipe(logistic_pipeline):
+    return logistic_pipeline
+
+
+# Expected use cases
+def test_search_exhausts_candidates_within_budget(training_data, pipe, tmp_path):
+    X, y = training_data
+    checkpoint = tmp_path / "search.json"
+
+    model, report = me.time_budgeted_search(
+        pipe, X, y, 600, checkpoint_path=str(checkpoint), max_candidates=4, n_jobs=1
+    )
+
+    assert report["stop_reason"] == "exhausted"
+    assert report["n_evaluated"] == 4
+    assert report["n_resumed"] == 0
+    with open(checkpoint) as f:
+        results = json.load(f)["results"]
+    best = max(results, key=lambda r: r["mean_test_score"])
+    assert report["best_params"] == best["params"]
+    assert model[-1].C == pytest.approx(best["params"]["logisticregression__C"])
+    model.predict_proba(X)
+
+
+def test_search_resumes_from_checkpoint(training_data, pipe, tmp_path):
+    X, y = training_data
+    checkpoint = str(tmp_path / "search.json")
+    me.time_budgeted_search(
+        pipe, X, y, 600, checkpoint_path=checkpoint, max_candidates=2, n_jobs=1
+    )
+
+    _, report = me.time_budgeted_search(
+        pipe, X, y, 600, checkpoint_path=checkpoint, max_candidates=3, n_jobs=1
+    )
+
+    assert report["n_resumed"] == 2
+    assert report["n_evaluated"] == 1
+    with open(checkpoint) as f:
+        params = [r["params"] for r in json.load(f)["results"]]
+    _, fresh = me.time_budgeted_search(
+        pipe,
+        X,
+        y,
+        600,
+        checkpoint_path=str(tmp_path / "fresh.json"),
+        max_candidates=3,
+        n_jobs=1,
+    )
+    with open(tmp_path / "fresh.json") as f:
+        assert params == [r["params"] for r in json.load(f)["results"]]
+
+
+# Edge cases
+@pytest.mark.parametrize("budget_type", me.BUDGET_TYPES)
+def test_tiny_budget_stops_after_first_batch(training_data, pipe, tmp_path, budget_type):
+    X, y = training_data
+
+    _, report = me.time_budgeted_search(
+        pipe,
+        X,
+        y,
+        1e-6,
+        budget_type=budget_type,
+        checkpoint_path=str(tmp_path / "search.json"),
+        n_jobs=1,
+    )
+
+    assert report["stop_reason"] == "budget"
+    assert report["n_evaluated"] == 1
+
+
+def test_checkpoint_of_other_data_is_ignored(training_data, pipe, tmp_path):
+    X, y = training_data
+    checkpoint = str(tmp_path / "search.json")
+    me.time_budgeted_search(
+        pipe, X, y, 600, checkpoint_path=checkpoint, max_candidates=2, n_jobs=1
+    )
+
+    _, report = me.time_budgeted_search(
+        pipe, X[:200], y[:200], 600, checkpoint_path=checkpoint, max_candidates=2, n_jobs=1
+    )
+
+    assert report["n_resumed"] == 0
+    assert report["n_evaluated"] == 2
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"param_distributions": {"logisticregression__C": [0.1, 1.0, 10.0]}},
+        {"cv": 3},
+        {"estimator_params": {"logisticregression__max_iter": 50}},
+    ],
+)
+def test_checkpoint_of_other_search_is_ignored(training_data, pipe, tmp_path, change):
+    X, y = training_data
+    checkpoint = str(tmp_path / "search.json")
+    me.time_budgeted_search(
+        pipe, X, y, 600, checkpoint_path=checkpoint, max_candidates=2, n_jobs=1
+    )
+    change = dict(change)
+    pipe.set_params(**change.pop("estimator_params", {}))
+
+    _, report = me.time_budgeted_search(
+        pipe,
+        X,
+        y,
+        600,
+        checkpoint_path=checkpoint,
+        max_candidates=2,
+        n_jobs=1,
+        **change,
+    )
+
+    assert report["n_resumed"] == 0
+
+
+# Error cases
+@pytest.mark.parametrize(
+    "budget, budget_type", [(0, "wall"), (-1, "cpu"), (10, "gpu")]
+)
+def test_invalid_budget(training_data, pipe, tmp_path, budget, budget_type):
+    X, y = training_data
+
+    with pytest.raises(ValueError):
+        me.time_budgeted_search(
+            pipe, X, y, budget, budget_type, checkpoint_path=str(tmp_path / "s.json")
+        )
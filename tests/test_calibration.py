@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+from sklearn.calibration import calibration_curve
+from sklearn.isotonic import IsotonicRegression
+from sklearn.metrics import brier_score_loss
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.calibration import (
+    apply_recalibration,
+    brier_score,
+    calibration_summary,
+    fit_recalibrator,
+    reliability_curve,
+)
+from src.drift_monitor import DRIFT_BINS, histogram, load_json
+from src.model_artifacts import export_logistic, load_artifact, predict_proba
+from src.modeling_and_evaluation import save_drift_reference
+
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(15)
+    y_prob = rng.random(5000)
+    y_true = (rng.random(5000) < y_prob**2).astype(int)
+    return y_true, y_prob
+
+
+# Expected use cases
+def test_reliability_curve_matches_sklearn(scores):
+    y_true, y_prob = scores
+
+    curve = reliability_curve(y_true, y_prob, n_bins=10)
+    observed, predicted = calibration_curve(y_true, y_prob, n_bins=10)
+
+    filled = curve[curve["n"] > 0]
+    np.testing.assert_allclose(filled["observed_rate"], observed)
+    np.testing.assert_allclose(filled["mean_predicted"], predicted)
+    assert curve["n"].sum() == len(y_true)
+
+
+def test_summary_reports_brier_and_ece(scores):
+    y_true, y_prob = scores
+
+    summary, curves = calibration_summary(
+        y_true, {"raw": y_prob, "perfect": y_true.astype(float)}
+    )
+
+    raw = summary.set_index("model").loc["raw"]
+    assert raw["brier_score"] == pytest.approx(brier_score_loss(y_true, y_prob))
+    assert raw["ece"] > 0.1
+    assert summary.set_index("model").loc["perfect", "ece"] == pytest.approx(0)
+    assert set(curves["model"]) == {"raw", "perfect"}
+
+
+@pytest.mark.parametrize("method", ["platt", "isotonic"])
+def test_recalibration_is_folded_into_artifact(fitted_pipeline, tmp_path, method):
+    pipeline, X, y = fitted_pipeline
+    decision = pipeline.decision_function(X)
+    recalibrator = fit_recalibrator(decision, y, method)
+
+    export_logistic(pipeline, tmp_path / "model.npz", recalibrator)
+    artifact = load_artifact(tmp_path / "model.npz")
+
+    assert str(artifact["calibration"]) == method
+    assert int(artifact["version"]) == 2
+    np.testing.assert_allclose(
+        predict_proba(artifact, X)[:, 1], apply_recalibration(recalibrator, decision)
+    )
+
+
+def test_drift_reference_scores_recalibrated_artifact(fitted_pipeline, tmp_path):
+    pipeline, X, y = fitted_pipeline
+    recalibrator = fit_recalibrator(pipeline.decision_function(X), y, "isotonic")
+    export_logistic(pipeline, tmp_path / "model.npz", recalibrator)
+
+    save_drift_reference(
+        X, artifact_path=tmp_path / "model.npz", path=tmp_path / "reference.json"
+    )
+
+    reference = load_json(tmp_path / "reference.json")
+    scores = predict_proba(load_artifact(tmp_path / "model.npz"), X)[:, 1]
+    expected = histogram(scores, DRIFT_BINS["score"]).tolist()
+    assert reference["counts"]["score"] == expected
+    raw = histogram(pipeline.predict_proba(X)[:, 1], DRIFT_BINS["score"]).tolist()
+    assert reference["counts"]["score"] != raw
+
+
+def test_isotonic_matches_sklearn(scores):
+    y_true, y_prob = scores
+    decision = np.log(y_prob / (1 - y_prob))
+
+    recalibrator = fit_recalibrator(decision, y_true, "isotonic")
+    expected = IsotonicRegression(out_of_bounds="clip").fit(decision, y_true)
+
+    grid = np.linspace(-10, 10, 101)
+    np.testing.assert_allclose(
+        apply_recalibration(recalibrator, grid), expected.predict(grid)
+    )
+
+
+# Edge cases
+def test_probabilities_of_one_fall_in_last_bin():
+    curve = reliability_curve([0, 1, 1], [0.0, 1.0, 1.0], n_bins=4)
+
+    assert list(curve["n"]) == [1, 0, 0, 2]
+    assert brier_score([0, 1, 1], [0.0, 1.0, 1.0]) == 0
+
+
+def test_artifact_without_recalibration_is_unchanged(fitted_pipeline, tmp_path):
+    pipeline, X, _ = fitted_pipeline
+
+    export_logistic(pipeline, tmp_path / "model.npz")
+    artifact = load_artifact(tmp_path / "model.npz")
+
+    assert str(artifact["calibration"]) == "none"
+    assert int(artifact["version"]) == 1
+    np.testing.assert_allclose(predict_proba(artifact, X), pipeline.predict_proba(X))
+
+
+# Error cases
+def test_unknown_method(scores):
+    y_true, y_prob = scores
+
+    with pytest.raises(ValueError):
+        fit_recalibrator(y_prob, y_true, "beta")
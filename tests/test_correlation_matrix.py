@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.run_eda import CORR_COLS, correlation_matrix, encode_columns
+
+
+@pytest.fixture
+def train_df():
+    rng = np.random.default_rng(15)
+    n = 500
+    return pd.DataFrame(
+        {
+            "age": rng.integers(0, 100, size=n),
+            "sex": rng.choice(["male", "female"], size=n),
+            "episode_number": rng.integers(1, 6, size=n),
+            "hospital_outcome": rng.integers(0, 2, size=n),
+            "hospital_outcome_cat": "Survived",
+        }
+    )
+
+
+def _pandas_corr(df):
+    df_ = df.copy()
+    df_["sex"] = df_["sex"].astype("category").cat.codes
+    return df_[CORR_COLS].corr().to_numpy()
+
+
+# Expected use cases
+def test_encode_columns_projects_and_encodes(train_df):
+    encoded = encode_columns(train_df, CORR_COLS)
+
+    assert encoded.shape == (len(train_df), len(CORR_COLS))
+    np.testing.assert_array_equal(encoded[:, 0], train_df["age"])
+    np.testing.assert_array_equal(encoded[:, 1], (train_df["sex"] == "male").astype(int))
+
+
+def test_correlation_matches_pandas(train_df):
+    corr = correlation_matrix(encode_columns(train_df, CORR_COLS))
+
+    np.testing.assert_allclose(corr, _pandas_corr(train_df), atol=1e-12)
+
+
+# Edge cases
+def test_missing_values_use_pairwise_complete_rows(train_df):
+    train_df = train_df.astype({"age": float})
+    train_df.loc[::7, "age"] = np.nan
+
+    corr = correlation_matrix(encode_columns(train_df, CORR_COLS))
+
+    np.testing.assert_allclose(corr, _pandas_corr(train_df), atol=1e-12)
+
+
+def test_constant_column_has_nan_correlation(train_df):
+    train_df["episode_number"] = 1
+
+    corr = correlation_matrix(encode_columns(train_df, CORR_COLS))
+
+    assert np.isnan(corr[2]).all()
+    assert not np.isnan(corr[0, 1])
@@ -0,0 +1,169 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import make_column_transformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import src.count_models as cm
+from src.calibration import fit_recalibrator
+from src.model_artifacts import export_logistic, load_artifact, predict_proba
+
+
+@pytest.fixture
+def training_data(make_training_data):
+    return make_training_data(600)
+
+
+@pytest.fixture
+def model_paths(tmp_path):
+    return {
+        "counts_path": str(tmp_path / "training_counts.csv"),
+        "model_path": str(tmp_path / "logistic_reg.pkl"),
+        "artifact_path": str(tmp_path / "logistic_reg.npz"),
+    }
+
+
+def _train_on_first_batch(X, y, paths, recalibrator=None):
+    # What model_training leaves behind
+    model = _fit_on_records(X, y)
+    counts = cm.build_count_table(X, y)
+    cm.save_count_table(counts, [cm.data_fingerprint(X, y)], paths["counts_path"])
+    joblib.dump(model, paths["model_path"])
+    export_logistic(model, paths["artifact_path"], recalibrator)
+    return model
+
+
+def _fit_on_records(X, y, class_weight=None):
+    return make_pipeline(
+        make_column_transformer(
+            (StandardScaler(), cm.NUMERIC_FEATURES),
+            (OneHotEncoder(drop="if_binary"), cm.CATEGORICAL_FEATURES),
+        ),
+        LogisticRegression(C=0.5, class_weight=class_weight, max_iter=1000),
+    ).fit(X, y)
+
+
+# Expected use cases
+@pytest.mark.parametrize("class_weight", [None, "balanced"])
+def test_fit_from_counts_matches_fit_on_records(training_data, class_weight):
+    X, y = training_data
+
+    counts = cm.build_count_table(X, y)
+    model = cm.fit_from_counts(counts, C=0.5, class_weight=class_weight)
+    expected = _fit_on_records(X, y, class_weight)
+
+    assert counts["count"].sum() == len(X)
+    scaler = model[0].named_transformers_["standardscaler"]
+    expected_scaler = expected[0].named_transformers_["standardscaler"]
+    np.testing.assert_allclose(scaler.mean_, expected_scaler.mean_)
+    np.testing.assert_allclose(scaler.var_, expected_scaler.var_)
+    np.testing.assert_allclose(
+        model.predict_proba(X), expected.predict_proba(X), atol=1e-5
+    )
+
+
+def test_merge_count_tables_adds_counts(training_data):
+    X, y = training_data
+
+    merged = cm.merge_count_tables(
+        cm.build_count_table(X[:250], y[:250]), cm.build_count_table(X[250:], y[250:])
+    )
+    full = cm.build_count_table(X, y)
+
+    key = cm.FEATURES + [cm.TARGET]
+    pd.testing.assert_frame_equal(
+        merged.sort_values(key).reset_index(drop=True),
+        full.sort_values(key).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_refit_from_counts_updates_artifacts(training_data, model_paths):
+    X, y = training_data
+    _train_on_first_batch(X[:400], y[:400], model_paths)
+
+    model = cm.refit_from_counts(X[400:], y[400:], **model_paths)
+
+    assert pd.read_csv(model_paths["counts_path"])["count"].sum() == len(X)
+    assert model[-1].C == 0.5
+    np.testing.assert_allclose(
+        model.predict_proba(X), _fit_on_records(X, y).predict_proba(X), atol=1e-5
+    )
+    np.testing.assert_allclose(
+        predict_proba(load_artifact(model_paths["artifact_path"]), X),
+        model.predict_proba(X),
+        atol=1e-10,
+    )
+
+
+def test_refit_carries_recalibration_over(training_data, model_paths):
+    X, y = training_data
+    first = _fit_on_records(X[:400], y[:400])
+    recalibrator = fit_recalibrator(first.decision_function(X[:400]), y[:400])
+    _train_on_first_batch(X[:400], y[:400], model_paths, recalibrator)
+
+    model = cm.refit_from_counts(X[400:], y[400:], **model_paths)
+
+    artifact = load_artifact(model_paths["artifact_path"])
+    assert str(artifact["calibration"]) == "platt"
+    expected = 1 / (
+        1
+        + np.exp(
+            -(
+                recalibrator["slope"] * model.decision_function(X)
+                + recalibrator["intercept"]
+            )
+        )
+    )
+    np.testing.assert_allclose(predict_proba(artifact, X)[:, 1], expected)
+
+
+# Error cases
+@pytest.mark.parametrize("batch", [slice(0, 400), slice(400, 600)])
+def test_refit_refuses_batches_already_in_the_table(training_data, model_paths, batch):
+    X, y = training_data
+    _train_on_first_batch(X[:400], y[:400], model_paths)
+    if batch.start:
+        cm.refit_from_counts(X[batch], y[batch], **model_paths)
+    table = pd.read_csv(model_paths["counts_path"])
+
+    # Row order does not matter
+    with pytest.raises(ValueError, match="already folded"):
+        cm.refit_from_counts(X[batch][::-1], y[batch][::-1], **model_paths)
+
+    pd.testing.assert_frame_equal(pd.read_csv(model_paths["counts_path"]), table)
+
+
+def test_refit_refuses_a_table_its_batch_list_does_not_describe(
+    training_data, model_paths
+):
+    X, y = training_data
+    _train_on_first_batch(X[:400], y[:400], model_paths)
+    # As if a refit died after replacing the table but before its batch list
+    merged = cm.merge_count_tables(
+        pd.read_csv(model_paths["counts_path"]),
+        cm.build_count_table(X[400:], y[400:]),
+    )
+    merged.to_csv(model_paths["counts_path"], index=False)
+
+    with pytest.raises(ValueError, match="does not match"):
+        cm.refit_from_counts(X[400:], y[400:], **model_paths)
+
+    assert not [
+        name
+        for name in os.listdir(os.path.dirname(model_paths["counts_path"]))
+        if ".tmp-" in name
+    ]
+
+
+def test_refit_from_counts_requires_count_table(training_data, model_paths):
+    X, y = training_data
+
+    with pytest.raises(FileNotFoundError):
+        cm.refit_from_counts(X, y, **model_paths)
@@ -0,0 +1,111 @@
+import http.server
+import io
+import os
+import sys
+import threading
+import zipfile
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.data_loading import fetch_cohorts
+
+PRIMARY = "primary_cohort.csv"
+STUDY = "study_cohort.csv"
+OTHER = "other_cohort.csv"
+
+
+def _nested_zip(cohorts):
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, "w", zipfile.ZIP_DEFLATED) as inner_zip:
+        for name, df in cohorts.items():
+            inner_zip.writestr(name, df.to_csv(index=False))
+    outer = io.BytesIO()
+    with zipfile.ZipFile(outer, "w") as outer_zip:
+        outer_zip.writestr("records.zip", inner.getvalue())
+    return outer.getvalue()
+
+
+@pytest.fixture
+def cohorts():
+    return {
+        PRIMARY: pd.DataFrame({"age_years": [20, 30], "sex_0male_1female": [0, 1]}),
+        STUDY: pd.DataFrame({"age_years": [40], "sex_0male_1female": [1]}),
+        OTHER: pd.DataFrame({"age_years": [50, 60, 70], "sex_0male_1female": [0, 0, 1]}),
+    }
+
+
+@pytest.fixture
+def archive_server(cohorts):
+    """Local stand-in for the UCI server; counts requests per path."""
+    archives = {
+        "/uci.zip": _nested_zip({PRIMARY: cohorts[PRIMARY], STUDY: cohorts[STUDY]}),
+        "/other.zip": _nested_zip({OTHER: cohorts[OTHER]}),
+    }
+    hits = {path: 0 for path in archives}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in archives:
+                self.send_error(404)
+                return
+            hits[self.path] += 1
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(archives[self.path])))
+            self.end_headers()
+            self.wfile.write(archives[self.path])
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", hits
+    server.shutdown()
+    server.server_close()
+
+
+# Expected use cases
+def test_each_archive_is_downloaded_once(archive_server, cohorts, tmp_path):
+    url, hits = archive_server
+    sources = [
+        (f"{url}/uci.zip", PRIMARY),
+        (f"{url}/uci.zip", STUDY),
+        (f"{url}/other.zip", OTHER),
+    ]
+
+    dfs = fetch_cohorts(sources, str(tmp_path / "raw"), n_jobs=3)
+
+    assert hits == {"/uci.zip": 1, "/other.zip": 1}
+    for (_, name), df in zip(sources, dfs):
+        pd.testing.assert_frame_equal(df, cohorts[name])
+        pd.testing.assert_frame_equal(
+            pd.read_csv(tmp_path / "raw" / name), cohorts[name]
+        )
+
+
+# Error cases
+def test_invalid_format_stops_before_download(archive_server, tmp_path):
+    url, hits = archive_server
+
+    with pytest.raises(SystemExit):
+        fetch_cohorts([(f"{url}/uci.zip", "cohort.xlsx")], str(tmp_path))
+    assert hits["/uci.zip"] == 0
+
+
+def test_missing_file_in_archive(archive_server, tmp_path):
+    url, _ = archive_server
+
+    with pytest.raises(SystemExit):
+        fetch_cohorts([(f"{url}/uci.zip", "missing.csv")], str(tmp_path))
+    assert not os.listdir(tmp_path)
+
+
+def test_missing_archive(archive_server, tmp_path):
+    url, _ = archive_server
+
+    with pytest.raises(SystemExit):
+        fetch_cohorts([(f"{url}/nope.zip", PRIMARY)], str(tmp_path))
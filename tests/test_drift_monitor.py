@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import src.drift_monitor as dm
+from src.model_artifacts import logistic_artifact, predict_proba
+from src.record_keys import lookup_table
+
+
+@pytest.fixture
+def population(make_training_data):
+    X, _ = make_training_data(20000)
+    return X, 1 - X["age"].to_numpy() / 150
+
+
+# Expected use cases
+def test_histogram_matches_pandas_binning():
+    ages = pd.Series([0, 9, 10, 55, 129, 130, np.nan, 200, -1])
+
+    counts = dm.histogram(ages, dm.DRIFT_BINS["age"])
+
+    edges = dm.DRIFT_BINS["age"]["edges"]
+    expected = pd.cut(ages, edges, right=False).value_counts(sort=False).to_numpy()
+    expected[-1] += 1  # 130 closes the last bin
+    np.testing.assert_array_equal(counts[:-1], expected)
+    assert counts[-1] == 3
+
+
+def test_incremental_updates_equal_one_pass(population):
+    X, scores = population
+    reference = dm.build_reference(X, scores)
+
+    state = dm.new_state(reference)
+    for start in range(0, len(X), 3000):
+        dm.update_state(state, X[start : start + 3000], scores[start : start + 3000])
+
+    assert state["n"] == len(X)
+    assert state["n_batches"] == 7
+    assert state["counts"] == reference["counts"]
+
+
+def test_reference_from_count_table_equals_records(population):
+    X, _ = population
+    cells = X.value_counts().reset_index(name="count")
+    records = cells.loc[cells.index.repeat(cells["count"])]
+    score = 1 - cells["age"].to_numpy() / 150
+
+    weighted = dm.build_reference(cells, score, weights=cells["count"])
+    expected = dm.build_reference(records, np.repeat(score, cells["count"]))
+
+    assert weighted["n"] == len(X)
+    assert weighted["counts"] == expected["counts"]
+
+
+def test_shifted_population_is_flagged(population):
+    X, scores = population
+    reference = dm.build_reference(X, scores)
+    old = X[X["age"] >= 60]
+
+    state = dm.update_state(dm.new_state(reference), old, 1 - old["age"] / 150)
+    report = dm.drift_report(reference, state).set_index("feature")
+
+    assert report.loc["age", "drifted"]
+    assert report.loc["score", "drifted"]
+    assert not report.loc["sex", "drifted"]
+    assert report.loc["sex", "chi2_pvalue"] > 0.001
+
+
+def test_same_population_has_no_drift(population):
+    X, scores = population
+    reference = dm.build_reference(X, scores)
+
+    state = dm.update_state(dm.new_state(reference), X[:5000], scores[:5000])
+    report = dm.drift_report(reference, state)
+
+    assert not report["drifted"].any()
+    assert (report["psi"] < 0.01).all()
+    assert (report["psi"] >= 0).all()
+
+
+# Edge cases
+def test_unseen_categories_count_as_other(population):
+    X, scores = population
+    reference = dm.build_reference(X, scores)
+    batch = X[:10].assign(sex=["unknown"] * 5 + [None] * 5)
+
+    state = dm.update_state(dm.new_state(reference), batch, scores[:10])
+
+    assert state["counts"]["sex"] == [0, 0, 10]
+
+
+def test_batches_with_missing_features_are_monitored(population, fitted_pipeline):
+    X, scores = population
+    model = logistic_artifact(fitted_pipeline[0])
+    table = lookup_table(lambda records: predict_proba(model, records)[:, 1])
+    batch = X[:6].astype({"age": float}).assign(sex=["male", None] + ["female"] * 4)
+    batch.loc[2, "age"] = np.nan
+    batch.loc[3, "sex"] = "unknown"
+
+    batch_scores = dm.score_batch(batch, table)
+
+    assert np.isnan(batch_scores[1:4]).all()
+    np.testing.assert_allclose(
+        batch_scores[[0, 4, 5]], predict_proba(model, batch.iloc[[0, 4, 5]])[:, 1]
+    )
+    state = dm.update_state(
+        dm.new_state(dm.build_reference(X, scores)), batch, batch_scores
+    )
+    assert state["counts"]["score"][-1] == 3
+    assert state["counts"]["sex"][-1] == 2
+    assert state["counts"]["age"][-1] == 1
+
+
+def test_live_batches_use_the_reference_bins(population):
+    X, scores = population
+    bins = {**dm.DRIFT_BINS, "age": {"edges": [0, 50, 100]}}
+    reference = dm.build_reference(X, scores, bins)
+
+    state = dm.update_state(dm.new_state(reference), X, scores)
+
+    assert state["counts"]["age"] == [
+        int((X["age"] < 50).sum()),
+        int((X["age"] >= 50).sum()),
+        0,
+    ]
+
+
+def test_report_schedule(population):
+    X, scores = population
+    state = dm.new_state(dm.build_reference(X, scores))
+
+    assert not dm.report_due(state)
+    dm.update_state(state, X[:10], scores[:10])
+    assert dm.report_due(state)
+    assert not dm.report_due(state, every_batches=2)
+    # Further partitions of the same batch do not advance the schedule
+    dm.update_state(state, X[10:20], scores[10:20], new_batch=False)
+    assert state["n_batches"] == 1
+    assert not dm.report_due(state, every_batches=2)
+    assert not dm.report_due(state, every_seconds=3600)
+    assert dm.report_due(state, every_seconds=0)
+
+
+# Error cases
+def test_empty_window_cannot_be_reported(population):
+    X, scores = population
+    reference = dm.build_reference(X, scores)
+
+    with pytest.raises(ValueError):
+        dm.drift_report(reference, dm.new_state(reference))
+
+
+def test_unsupported_state_version(tmp_path):
+    path = str(tmp_path / "state.json")
+    dm.save_json({"version": 0}, path)
+
+    with pytest.raises(ValueError):
+        dm.load_json(path)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.utils import mean_abs_shap, get_important_features_important_than
+
+
+@pytest.fixture
+def shap_matrix():
+    # Columns: age, sex, RANDOM_1, episode_number, RANDOM_2, RANDOM_3
+    rng = np.random.default_rng(15)
+    scales = np.array([5.0, 0.1, 1.0, 2.0, 0.5, 0.8])
+    return rng.normal(size=(1000, 6)) * scales
+
+
+@pytest.fixture
+def feature_names():
+    return ["age", "sex", "RANDOM_1", "episode_number", "RANDOM_2", "RANDOM_3"]
+
+
+# Expected use cases
+def test_mean_abs_shap_chunked_matches_full(shap_matrix):
+    expected = np.mean(np.abs(shap_matrix), axis=0)
+
+    np.testing.assert_allclose(mean_abs_shap(shap_matrix, chunk_size=7), expected)
+    chunks = (shap_matrix[i : i + 100] for i in range(0, 1000, 100))
+    np.testing.assert_allclose(mean_abs_shap(chunks), expected)
+
+
+def test_mean_abs_shap_accepts_array_likes(shap_matrix):
+    expected = np.mean(np.abs(shap_matrix), axis=0)
+
+    frame = pd.DataFrame(shap_matrix)
+    np.testing.assert_allclose(mean_abs_shap(frame, chunk_size=7), expected)
+    np.testing.assert_allclose(mean_abs_shap(shap_matrix.tolist()), expected)
+
+
+@pytest.mark.parametrize("sizes", [[100] * 10, [1, 299, 700]])
+def test_mean_abs_shap_accepts_lists_of_chunks(shap_matrix, feature_names, sizes):
+    chunks = np.split(shap_matrix, np.cumsum(sizes)[:-1])
+
+    importances = mean_abs_shap(chunks)
+
+    np.testing.assert_allclose(importances, np.mean(np.abs(shap_matrix), axis=0))
+    assert get_important_features_important_than(
+        tuple(chunks), feature_names
+    ) == get_important_features_important_than(shap_matrix, feature_names)
+
+
+def test_features_above_random_probes(shap_matrix, feature_names):
+    selected = get_important_features_important_than(shap_matrix, feature_names)
+
+    assert selected == ["age", "episode_number"]
+
+
+def test_explicit_random_features(shap_matrix, feature_names):
+    selected = get_important_features_important_than(
+        shap_matrix, feature_names, random_features=["RANDOM_2"]
+    )
+
+    assert selected == ["RANDOM_1", "RANDOM_3", "age", "episode_number"]
+
+
+# Error cases
+def test_missing_random_probe_raises(shap_matrix):
+    with pytest.raises(ValueError, match="random probe"):
+        get_important_features_important_than(
+            shap_matrix, ["a", "b", "c", "d", "e", "f"]
+        )
+
+
+def test_empty_shap_values_raises():
+    with pytest.raises(ValueError, match="No SHAP values"):
+        mean_abs_shap(iter([]))
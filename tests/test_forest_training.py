@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import src.modeling_and_evaluation as me
+from src.model_artifacts import load_artifact, forest_predict_proba
+
+
+@pytest.fixture
+def training_data(make_training_data):
+    return make_training_data(400)
+
+
+@pytest.fixture
+def model_paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(me, "FOREST_MODEL_PATH", str(tmp_path / "random_forest.pkl"))
+    monkeypatch.setattr(me, "FOREST_ARTIFACT_PATH", str(tmp_path / "random_forest.npz"))
+    return tmp_path
+
+
+# Expected use cases
+def test_deduplicate_training_data_keeps_counts(training_data):
+    X, y = training_data
+
+    X_unique, y_unique, counts = me.deduplicate_training_data(X, y)
+
+    assert counts.sum() == len(X)
+    assert not pd.concat([X_unique, y_unique], axis=1).duplicated().any()
+
+
+def test_forest_training_saves_matching_compact_artifact(training_data, model_paths):
+    X, y = training_data
+
+    model = me.forest_training(X, y, n_estimators=20, min_samples_leaf=5, n_jobs=2)
+
+    assert isinstance(model, Pipeline)
+    artifact = load_artifact(me.FOREST_ARTIFACT_PATH)
+    np.testing.assert_allclose(
+        forest_predict_proba(artifact, X), model.predict_proba(X), atol=1e-6
+    )
+
+
+def test_trees_draw_records_by_count(training_data, model_paths):
+    X, y = training_data
+
+    model = me.forest_training(
+        X, y, n_estimators=10, min_samples_leaf=20, max_samples=300, n_jobs=1
+    )
+
+    for tree in model[-1].estimators_:
+        weights = tree.tree_.weighted_n_node_samples
+        leaves = tree.tree_.children_left == -1
+        assert weights[0] == 300
+        assert (weights[leaves] >= 20).all()
+
+
+def test_record_bootstrap_follows_counts():
+    from sklearn.ensemble import RandomForestClassifier
+
+    X = np.array([[0.0], [1.0]])
+    y = np.array([0, 1])
+    counts = np.array([9000, 1000])
+
+    forest = me.record_bootstrap_forest(
+        RandomForestClassifier(n_estimators=50, min_samples_leaf=1, random_state=0),
+        X,
+        y,
+        counts,
+    )
+
+    # Each tree's root holds its drawn records; about 90% come from row 0
+    roots = np.array([tree.tree_.value[0, 0] for tree in forest.estimators_])
+    assert roots[:, 0].mean() == pytest.approx(0.9, abs=0.01)
+
+
+def test_max_samples_option_parses_counts_and_fractions():
+    assert me._parse_max_samples(None, None, "20000") == 20000
+    assert isinstance(me._parse_max_samples(None, None, "20000"), int)
+    assert me._parse_max_samples(None, None, "0.2") == 0.2
+    assert me._parse_max_samples(None, None, None) is None
+
+
+# Error cases
+@pytest.mark.parametrize("max_samples", [0, 401, 0.0, 1.5])
+def test_out_of_range_max_samples_raises(training_data, model_paths, max_samples):
+    X, y = training_data
+
+    with pytest.raises(ValueError, match="max_samples"):
+        me.forest_training(X, y, n_estimators=2, max_samples=max_samples, n_jobs=1)
+
+
+def test_compact_forest_rejects_unknown_category(training_data, model_paths):
+    X, y = training_data
+    me.forest_training(X, y, n_estimators=5, n_jobs=1)
+    artifact = load_artifact(me.FOREST_ARTIFACT_PATH)
+    X.loc[0, "sex"] = "unknown"
+
+    with pytest.raises(ValueError, match="unknown categories"):
+        forest_predict_proba(artifact, X)
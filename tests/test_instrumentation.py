@@ -0,0 +1,90 @@
+import json
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import src.instrumentation as instrumentation
+
+
+@pytest.fixture
+def trace_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, "TRACE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _load_single_trace(trace_dir):
+    traces = list(trace_dir.glob("*.json"))
+    assert len(traces) == 1
+    return json.loads(traces[0].read_text())
+
+
+# Expected use cases
+def test_traced_run_records_spans(trace_dir):
+    with instrumentation.traced_run("demo", params={"n": 3}):
+        with instrumentation.span("step_one", rows=100):
+            pass
+        with instrumentation.span("step_two") as step:
+            step["rows"] = 5
+
+    trace = _load_single_trace(trace_dir)
+    assert trace["command"] == "demo"
+    assert trace["status"] == "ok"
+    assert trace["params"] == {"n": "3"}
+    assert [s["name"] for s in trace["spans"]] == ["step_one", "step_two"]
+    assert trace["spans"][1]["rows"] == 5
+    assert "rows_per_sec" in trace["spans"][0]
+
+
+def test_traced_run_writes_cprofile_report(trace_dir):
+    with instrumentation.traced_run("demo", profile="cprofile"):
+        sum(range(1000))
+
+    assert len(list(trace_dir.glob("*.prof"))) == 1
+
+
+# Edge cases
+def test_span_outside_trace_is_not_recorded(trace_dir):
+    with instrumentation.span("orphan") as step:
+        pass
+
+    assert step["status"] == "ok"
+    assert list(trace_dir.glob("*.json")) == []
+
+
+def test_nested_span_keeps_outer_peak_rss(monkeypatch):
+    # Fake VmHWM: resetting drops the high-water mark to the current RSS
+    memory = {"current": 100, "hwm": 100}
+    monkeypatch.setattr(instrumentation, "peak_rss_mb", lambda: memory["hwm"])
+    monkeypatch.setattr(
+        instrumentation, "_reset_peak_rss", lambda: memory.update(hwm=memory["current"])
+    )
+
+    def allocate(mb):
+        memory["current"] = mb
+        memory["hwm"] = max(memory["hwm"], mb)
+
+    with instrumentation.span("outer") as outer:
+        allocate(500)
+        allocate(100)
+        with instrumentation.span("inner") as inner:
+            allocate(200)
+            allocate(100)
+        with instrumentation.span("inner_again") as inner_again:
+            allocate(300)
+
+    assert inner["peak_rss_mb"] == 200
+    assert inner_again["peak_rss_mb"] == 300
+    assert outer["peak_rss_mb"] == 500
+
+
+# Error cases
+def test_trace_is_written_when_command_exits(trace_dir):
+    with pytest.raises(SystemExit):
+        with instrumentation.traced_run("demo"):
+            with instrumentation.span("failing_step"):
+                sys.exit(1)
+
+    trace = _load_single_trace(trace_dir)
+    assert trace["status"] == "exit: 1"
+    assert trace["spans"][0]["status"] == "error: SystemExit"
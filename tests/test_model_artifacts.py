@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.model_artifacts import (
+    export_logistic,
+    load_artifact,
+    logistic_predict_proba,
+    predict_proba,
+)
+
+
+# Expected use cases
+def test_logistic_artifact_matches_pipeline(fitted_pipeline, tmp_path):
+    pipeline, X, _ = fitted_pipeline
+    path = tmp_path / "logistic_reg.npz"
+
+    export_logistic(pipeline, path)
+    artifact = load_artifact(path)
+
+    np.testing.assert_allclose(
+        logistic_predict_proba(artifact, X), pipeline.predict_proba(X)
+    )
+    np.testing.assert_allclose(predict_proba(artifact, X), pipeline.predict_proba(X))
+
+
+def test_logistic_artifact_scores_plain_dict(fitted_pipeline, tmp_path):
+    pipeline, X, _ = fitted_pipeline
+    path = tmp_path / "logistic_reg.npz"
+    export_logistic(pipeline, path)
+
+    records = {column: X[column].to_numpy() for column in X.columns}
+    scores = predict_proba(load_artifact(path), records)
+
+    np.testing.assert_allclose(scores, pipeline.predict_proba(X))
+
+
+# Edge cases
+def test_version_1_artifact_still_loads(fitted_pipeline, tmp_path):
+    pipeline, X, _ = fitted_pipeline
+    path = tmp_path / "logistic_reg.npz"
+    export_logistic(pipeline, path)
+    # Version 1 logistic artifacts had no calibration entry
+    data = dict(np.load(path))
+    del data["calibration"]
+    data["version"] = np.int64(1)
+    np.savez(path, **data)
+
+    artifact = load_artifact(path)
+
+    assert str(artifact["calibration"]) == "none"
+    np.testing.assert_allclose(predict_proba(artifact, X), pipeline.predict_proba(X))
+
+
+# Error cases
+def test_load_artifact_rejects_other_versions(fitted_pipeline, tmp_path):
+    pipeline, _, _ = fitted_pipeline
+    path = tmp_path / "logistic_reg.npz"
+    export_logistic(pipeline, path)
+    data = dict(np.load(path))
+    data["version"] = np.int64(99)
+    np.savez(path, **data)
+
+    with pytest.raises(ValueError, match="Unsupported artifact version"):
+        load_artifact(path)
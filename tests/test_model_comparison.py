@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.model_comparison import (
+    COMPARISON_MODELS,
+    RECORD_LEVEL_MODELS,
+    build_fold_cache,
+    candidate_models,
+    compare_models,
+)
+
+
+@pytest.fixture
+def train_data():
+    rng = np.random.default_rng(50)
+    n = 3000
+    X = pd.DataFrame(
+        {
+            "age": rng.integers(20, 95, size=n),
+            "episode_number": rng.integers(1, 5, size=n),
+            "sex": rng.choice(["male", "female"], size=n),
+        }
+    )
+    logit = 4 - 0.04 * X["age"] - 0.3 * (X["sex"] == "male")
+    y = pd.Series(
+        (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(int), name="hospital_outcome"
+    )
+    return X, y
+
+
+# Expected use cases
+def test_leaderboard_ranks_every_model(train_data):
+    board, folds = compare_models(*train_data, n_splits=3, n_jobs=1)
+
+    assert sorted(board["model"]) == sorted(COMPARISON_MODELS)
+    assert list(board["rank"]) == [1, 2, 3]
+    assert board["roc_auc"].is_monotonic_decreasing
+    assert (board["n_folds"] == 3).all()
+    assert len(folds) == 3 * len(COMPARISON_MODELS)
+    timings = board[["fit_seconds", "predict_seconds", "prepare_seconds"]]
+    assert (timings >= 0).all().all()
+
+
+def test_weighted_folds_match_record_level_fit(train_data):
+    X, y = train_data
+    X_design = np.column_stack([X["age"], X["episode_number"], X["sex"] == "male"])
+
+    _, folds = compare_models(X, y, models=["logistic"], n_splits=3, n_jobs=1)
+
+    splitter = StratifiedKFold(3, shuffle=True, random_state=15)
+    for (train_idx, val_idx), auc in zip(splitter.split(X, y), folds["roc_auc"]):
+        # Standardizing does not change an unregularized fit's predictions
+        model = LogisticRegression(penalty=None, max_iter=5000)
+        model.fit(X_design[train_idx], y.iloc[train_idx])
+        expected = roc_auc_score(
+            y.iloc[val_idx], model.predict_proba(X_design[val_idx])[:, 1]
+        )
+        # C=1 on standardized features barely regularizes 2000 records
+        assert auc == pytest.approx(expected, abs=1e-3)
+
+
+@pytest.mark.parametrize("model", RECORD_LEVEL_MODELS)
+def test_tree_models_are_fitted_on_records(train_data, model):
+    X, y = train_data
+    X_design = np.column_stack([X["age"], X["episode_number"], X["sex"] == "male"])
+
+    _, folds = compare_models(X, y, models=[model], n_splits=3, n_jobs=1)
+
+    splitter = StratifiedKFold(3, shuffle=True, random_state=15)
+    for (train_idx, val_idx), auc in zip(splitter.split(X, y), folds["roc_auc"]):
+        estimator = candidate_models()[model]
+        estimator.fit(X_design[train_idx].astype(float), y.iloc[train_idx])
+        expected = roc_auc_score(
+            y.iloc[val_idx], estimator.predict_proba(X_design[val_idx])[:, 1]
+        )
+        assert auc == pytest.approx(expected, abs=1e-12)
+
+
+def test_fold_cache_is_memory_mapped(train_data, tmp_path):
+    X, y = train_data
+
+    folds = build_fold_cache(X, y, str(tmp_path), ["raw", "standardized"], 3)
+
+    X_train, X_val = folds[0]["X"]["standardized"]
+    assert isinstance(X_train, np.memmap)
+    np.testing.assert_allclose(
+        np.average(X_train[:, :2], axis=0, weights=folds[0]["w_train"]), 0, atol=1e-9
+    )
+    assert folds[0]["w_train"].sum() + folds[0]["w_val"].sum() == len(X)
+    assert len(list(tmp_path.glob("*.npy"))) == 3 * 8
+
+
+def test_fold_cache_keeps_records_for_record_designs(train_data, tmp_path):
+    X, y = train_data
+
+    folds = build_fold_cache(X, y, str(tmp_path), ["raw"], 3, record_designs=["raw"])
+
+    X_records = folds[0]["X_records"]["raw"]
+    assert isinstance(X_records, np.memmap)
+    assert len(X_records) == len(folds[0]["y_train_records"])
+    assert len(X_records) == folds[0]["w_train"].sum()
+
+
+# Edge cases
+def test_parallel_workers_share_the_cache(train_data):
+    board, _ = compare_models(
+        *train_data, models=["logistic", "hist_gradient_boosting"], n_splits=2, n_jobs=2
+    )
+
+    assert sorted(board["model"]) == ["hist_gradient_boosting", "logistic"]
+
+
+# Error cases
+def test_unknown_model_raises(train_data):
+    with pytest.raises(ValueError, match="Unknown models"):
+        compare_models(*train_data, models=["svm"])
+
+
+def test_too_few_folds_raise(train_data):
+    with pytest.raises(ValueError, match="n_splits"):
+        compare_models(*train_data, n_splits=1)
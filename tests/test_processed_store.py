@@ -0,0 +1,162 @@
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import src.processed_store as processed_store
+from src.processed_store import (
+    MANIFEST_FILENAME,
+    ingest_batch,
+    iter_dataset,
+    iter_partitions,
+    read_dataset,
+    read_manifest,
+    verify_store,
+)
+
+
+def _raw_batch(path, ages):
+    pd.DataFrame(
+        {
+            "age_years": ages,
+            "sex_0male_1female": [i % 2 for i in range(len(ages))],
+            "episode_number": [1] * len(ages),
+            "hospital_outcome_1alive_0dead": [(i + 1) % 2 for i in range(len(ages))],
+        }
+    ).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def batches(tmp_path):
+    return [
+        _raw_batch(tmp_path / "2024-01.csv", [30, 45, 60]),
+        _raw_batch(tmp_path / "2024-02.csv", [72, 81]),
+    ]
+
+
+# Expected use cases
+def test_ingest_appends_partitions(batches, tmp_path):
+    store = str(tmp_path / "store")
+    for batch in batches:
+        ingest_batch(batch, store)
+
+    manifest = read_manifest(store)
+    assert [p["file"] for p in manifest["partitions"]] == [
+        "part-00000.csv",
+        "part-00001.csv",
+    ]
+    assert [p["rows"] for p in manifest["partitions"]] == [3, 2]
+    assert [p["source"] for p in manifest["partitions"]] == ["2024-01.csv", "2024-02.csv"]
+
+    df = read_dataset(store)
+    assert df["age"].tolist() == [30, 45, 60, 72, 81]
+    assert set(df["sex"]) == {"male", "female"}
+    assert "hospital_outcome_cat" in df.columns
+
+
+def test_existing_partitions_are_not_rewritten(batches, tmp_path):
+    store = str(tmp_path / "store")
+    ingest_batch(batches[0], store)
+    first = os.path.join(store, "part-00000.csv")
+    mtime = os.stat(first).st_mtime_ns
+
+    ingest_batch(batches[1], store, compression="gzip")
+
+    assert os.stat(first).st_mtime_ns == mtime
+    assert read_manifest(store)["partitions"][1]["file"] == "part-00001.csv.gz"
+    assert len(read_dataset(store)) == 5
+
+
+def test_iter_partitions_is_lazy_and_accepts_read_options(batches, tmp_path):
+    store = str(tmp_path / "store")
+    for batch in batches:
+        ingest_batch(batch, store)
+
+    parts = iter_partitions(store, usecols=["age"])
+    assert list(next(parts).columns) == ["age"]
+    assert len(next(parts)) == 2
+
+
+def test_iter_dataset_streams_stores_and_reads_csv_whole(batches, tmp_path):
+    store = str(tmp_path / "store")
+    for batch in batches:
+        ingest_batch(batch, store)
+    path = tmp_path / "train.csv"
+    pd.DataFrame({"age": [1, 2]}).to_csv(path, index=False)
+
+    assert [len(df) for df in iter_dataset(store)] == [3, 2]
+    assert [len(df) for df in iter_dataset(path)] == [2]
+
+
+def test_verify_store_counts_rows(batches, tmp_path):
+    store = str(tmp_path / "store")
+    for batch in batches:
+        ingest_batch(batch, store, compression="gzip")
+
+    assert verify_store(store) == 5
+
+
+# Edge cases
+def test_reads_do_not_rehash_partitions(batches, tmp_path, monkeypatch):
+    store = str(tmp_path / "store")
+    for batch in batches:
+        ingest_batch(batch, store)
+
+    def fail(path, block_size=None):
+        raise AssertionError("partition was hashed")
+
+    monkeypatch.setattr(processed_store, "file_sha256", fail)
+    assert len(read_dataset(store)) == 5
+
+
+def test_reingesting_a_batch_is_skipped(batches, tmp_path):
+    store = str(tmp_path / "store")
+    assert ingest_batch(batches[0], store) is not None
+    assert ingest_batch(batches[0], store) is None
+    assert len(read_manifest(store)["partitions"]) == 1
+
+
+def test_read_dataset_reads_plain_csv(tmp_path):
+    path = tmp_path / "train.csv"
+    pd.DataFrame({"age": [1, 2]}).to_csv(path, index=False)
+    assert read_dataset(path)["age"].tolist() == [1, 2]
+
+
+# Error cases
+def test_corrupted_partition_is_detected(batches, tmp_path):
+    store = str(tmp_path / "store")
+    ingest_batch(batches[0], store)
+    with open(os.path.join(store, "part-00000.csv"), "a") as f:
+        f.write("99,male,1,1,Survived\n")
+
+    with pytest.raises(ValueError, match="Checksum"):
+        verify_store(store)
+    with pytest.raises(ValueError, match="Checksum"):
+        read_dataset(store, verify=True)
+
+
+def test_row_count_mismatch_is_detected(batches, tmp_path):
+    store = str(tmp_path / "store")
+    ingest_batch(batches[0], store)
+    manifest = read_manifest(store)
+    manifest["partitions"][0]["rows"] = 4
+    with open(os.path.join(store, MANIFEST_FILENAME), "w") as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(ValueError, match="manifest lists 4"):
+        verify_store(store)
+
+
+def test_unsupported_manifest_version(batches, tmp_path):
+    store = str(tmp_path / "store")
+    ingest_batch(batches[0], store)
+    with open(os.path.join(store, MANIFEST_FILENAME), "w") as f:
+        json.dump({"version": 99, "partitions": []}, f)
+
+    with pytest.raises(ValueError, match="version"):
+        read_manifest(store)
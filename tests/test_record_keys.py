@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.record_keys import (
+    N_FEATURE_KEYS,
+    N_RECORD_KEYS,
+    duplicate_count,
+    lookup_table,
+    pack,
+    packable,
+    record_histogram,
+    unique_keys,
+    unpack,
+)
+
+
+@pytest.fixture
+def records():
+    rng = np.random.default_rng(49)
+    n = 2000
+    return pd.DataFrame(
+        {
+            "age": rng.integers(0, 131, size=n),
+            "sex": rng.choice(["male", "female"], size=n),
+            "episode_number": rng.integers(0, 16, size=n),
+            "hospital_outcome": rng.integers(0, 2, size=n),
+        }
+    )
+
+
+# Expected use cases
+def test_keys_round_trip(records):
+    keys = pack(records, outcome=records["hospital_outcome"])
+
+    assert keys.dtype == np.uint16
+    assert keys.max() < N_RECORD_KEYS
+    pd.testing.assert_frame_equal(unpack(keys, outcome=True), records)
+    assert pack(records).max() < N_FEATURE_KEYS
+
+
+def test_unique_keys_match_value_counts(records):
+    keys, counts = unique_keys(pack(records, outcome=records["hospital_outcome"]))
+
+    unique = unpack(keys, outcome=True).assign(count=counts)
+    expected = records.value_counts().reset_index(name="count")
+    columns = list(records.columns)
+    pd.testing.assert_frame_equal(
+        unique.sort_values(columns).reset_index(drop=True),
+        expected.sort_values(columns).reset_index(drop=True),
+    )
+
+
+def test_histogram_marginals_match_crosstab(records):
+    hist = record_histogram(pack(records, outcome=records["hospital_outcome"]), True)
+
+    expected = pd.crosstab(records["sex"], records["hospital_outcome"])
+    sex_outcome = hist.sum(axis=(0, 2))
+    assert (sex_outcome[0] == expected.loc["male"]).all()
+    assert (sex_outcome[1] == expected.loc["female"]).all()
+    assert sex_outcome[2].sum() == 0
+
+
+def test_duplicate_count_matches_pandas(records):
+    records["hospital_outcome_cat"] = records["hospital_outcome"].map(
+        {0: "Died", 1: "Survived"}
+    )
+
+    assert duplicate_count(records) == records.duplicated().sum()
+    features = records[["age", "sex", "episode_number"]]
+    assert duplicate_count(features) == features.duplicated().sum()
+
+
+def test_lookup_table_scores_every_record(records):
+    def score(X):
+        return X["age"] / 1000 + (X["sex"] == "female") + X["episode_number"] / 10
+
+    table = lookup_table(score)
+
+    np.testing.assert_allclose(table[pack(records)], score(records))
+
+
+# Edge cases
+def test_missing_values_get_their_own_key(records):
+    records = records.astype({"age": float})
+    records.loc[0, "age"] = np.nan
+    records.loc[1, "sex"] = None
+    records.loc[2:3, ["age", "sex", "episode_number"]] = np.nan
+
+    keys = pack(records)
+
+    assert keys[2] == keys[3]
+    assert len({keys[0], keys[1], keys[2]}) == 3
+    unpacked = unpack(keys)
+    assert unpacked.loc[0, "age"] != unpacked.loc[0, "age"]
+    assert unpacked.loc[1, "sex"] is None
+    assert duplicate_count(records) == records.duplicated().sum()
+
+
+def test_packable_flags_rows_without_a_complete_key(records):
+    records = records.astype({"age": float, "episode_number": object})
+    records.loc[0, "age"] = np.nan
+    records.loc[1, "sex"] = "x"
+    records.loc[2, "episode_number"] = 16
+    records.loc[3, "age"] = 40.5
+
+    valid = packable(records)
+
+    assert not valid[:4].any() and valid[4:].all()
+    assert np.isfinite(lookup_table(lambda X: X["age"])[pack(records[valid])]).all()
+
+
+def test_duplicate_count_falls_back_for_other_columns(records):
+    records["note"] = np.arange(len(records))
+    records.loc[0, "age"] = 200
+
+    assert duplicate_count(records) == 0
+
+
+# Error cases
+@pytest.mark.parametrize(
+    "column, value",
+    [("age", 131), ("age", -1), ("age", 40.5), ("episode_number", 16), ("sex", "x")],
+)
+def test_unpackable_values_raise(records, column, value):
+    records = records.astype({column: object})
+    records.loc[0, column] = value
+
+    with pytest.raises(ValueError, match=column):
+        pack(records)
+
+
+def test_non_binary_outcome_raises(records):
+    with pytest.raises(ValueError, match="hospital_outcome"):
+        pack(records, outcome=records["hospital_outcome"] + 1)
@@ -0,0 +1,104 @@
+import json
+import re
+import pandas as pd
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import src.modeling_and_evaluation as me
+
+REPORT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "reports", "sepsis-predictor-report.qmd"
+)
+
+
+@pytest.fixture
+def metrics():
+    return pd.DataFrame(
+        {
+            "dataset": ["train", "test"],
+            "roc auc": [0.70589, 0.58812],
+            "precision": [0.92645, 0.81072],
+            "recall": [1.0, 1.0],
+            "F1 score": [0.96182, 0.89547],
+        }
+    )
+
+
+# Expected use cases
+def test_build_report_data(fitted_pipeline, metrics):
+    model, _, y = fitted_pipeline
+
+    data = me.build_report_data(metrics, model, y)["report_data"]
+
+    assert data["metrics_display"]["test"]["roc_auc"] == "0.588"
+    assert data["metrics_display"]["train"]["f1_score"] == "0.962"
+    coef = model[-1].coef_[0]
+    assert data["coefficients"] == pytest.approx(
+        {"age": coef[0], "episode_number": coef[1], "is_male": coef[2]}
+    )
+    assert data["intercept"] == pytest.approx(model[-1].intercept_[0])
+    assert data["logit_equation"].startswith(f"logit(p) = {data['intercept_display']} ")
+    assert sum(data["class_balance"].values()) == pytest.approx(1)
+    assert data["n_train"] == len(y)
+    assert "shap_importance" not in data
+
+
+def test_report_data_includes_shap_importance(fitted_pipeline, metrics):
+    model, _, y = fitted_pipeline
+    shap_importance = pd.DataFrame(
+        {"feature": ["age", "is_male"], "mean_abs_shap": [0.86477, 0.08907]}
+    )
+
+    data = me.build_report_data(metrics, model, y, shap_importance)["report_data"]
+
+    assert data["shap_importance"] == {"age": 0.86477, "is_male": 0.08907}
+    assert data["shap_importance_display"] == {"age": "0.865", "is_male": "0.089"}
+
+
+def test_write_report_data_round_trips(fitted_pipeline, metrics, tmp_path):
+    model, _, y = fitted_pipeline
+    data = me.build_report_data(metrics, model, y)
+    path = tmp_path / "report" / "report_data.json"
+
+    me.write_report_data(data, str(path))
+
+    with open(path) as f:
+        assert json.load(f) == data
+    assert os.listdir(path.parent) == ["report_data.json"]
+
+
+# Edge cases
+def test_interrupted_write_keeps_previous_bundle(
+    fitted_pipeline, metrics, tmp_path, monkeypatch
+):
+    model, _, y = fitted_pipeline
+    data = me.build_report_data(metrics, model, y)
+    path = tmp_path / "report_data.json"
+    me.write_report_data(data, str(path))
+
+    def interrupted_dump(obj, f, **kwargs):
+        f.write('{"report_data": {')
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(me.json, "dump", interrupted_dump)
+    with pytest.raises(KeyboardInterrupt):
+        me.write_report_data(data, str(path))
+
+    with open(path) as f:
+        assert json.load(f) == data
+
+
+def test_report_only_references_keys_in_bundle():
+    with open(REPORT_PATH) as f:
+        keys = re.findall(r"\{\{< meta report_data\.([\w.]+) >\}\}", f.read())
+    with open(me.REPORT_DATA_PATH) as f:
+        data = json.load(f)["report_data"]
+
+    assert keys
+    for key in keys:
+        value = data
+        for part in key.split("."):
+            value = value[part]
+        assert isinstance(value, str)
@@ -0,0 +1,89 @@
+import pytest
+from threadpoolctl import threadpool_info
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import src.resources as resources
+
+
+@pytest.fixture
+def host(monkeypatch):
+    """A 64-CPU host with 5 GB of memory, as in docker-compose.yml."""
+    monkeypatch.setattr(resources, "available_cpus", lambda: 64)
+    monkeypatch.setattr(resources, "available_memory_mb", lambda: 5 * 1024)
+
+
+# Expected use cases
+def test_threads_are_split_between_workers(host):
+    plan = resources.plan_resources(n_jobs=8)
+
+    assert plan["n_jobs"] == 8
+    assert plan["threads_per_worker"] == 8
+
+
+def test_memory_budget_caps_workers(host):
+    plan = resources.plan_resources(n_jobs=-1, memory_per_worker_mb=1024)
+
+    assert plan["n_jobs"] == 5
+    assert plan["threads_per_worker"] == 12
+
+
+def test_resource_limits_sets_plan_and_thread_limits(host):
+    assert resources.worker_count() == -1
+
+    with resources.resource_limits(n_jobs=4, threads_per_worker=1) as plan:
+        assert resources.worker_count() == 4
+        assert resources.worker_threads() == 1
+        assert all(pool["num_threads"] == 1 for pool in threadpool_info())
+
+    assert plan["n_jobs"] == 4
+    assert resources.worker_count() == -1
+    assert resources.worker_threads() is None
+
+
+def test_bounded_map_caps_tasks_in_flight():
+    from concurrent.futures import ThreadPoolExecutor
+
+    submitted = []
+
+    def chunks():
+        for i in range(20):
+            submitted.append(i)
+            yield i
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = []
+        for value in resources.bounded_map(
+            pool, lambda x, y: x * y, chunks(), range(20), max_in_flight=3
+        ):
+            # Never more than 3 tasks submitted ahead of the consumer
+            assert len(submitted) - len(results) <= 3
+            results.append(value)
+
+    assert results == [i * i for i in range(20)]
+
+
+# Edge cases
+def test_memory_budget_keeps_at_least_one_worker(host):
+    plan = resources.plan_resources(n_jobs=4, memory_per_worker_mb=10 * 1024)
+
+    assert plan["n_jobs"] == 1
+
+
+def test_cgroup_quota_limits_cpus(tmp_path, monkeypatch):
+    cpu_max = tmp_path / "cpu.max"
+    cpu_max.write_text("200000 100000\n")
+    monkeypatch.setattr(resources, "CGROUP_CPU_MAX", str(cpu_max))
+
+    assert resources.available_cpus() <= 2
+
+
+# Error cases
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"n_jobs": 0}, {"n_jobs": -2}, {"threads_per_worker": 0}, {"memory_per_worker_mb": 0}],
+)
+def test_invalid_settings(host, kwargs):
+    with pytest.raises(ValueError):
+        resources.plan_resources(**kwargs)
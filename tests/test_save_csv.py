@@ -0,0 +1,105 @@
+import gzip
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.save_csv import infer_compression, save_csv
+
+
+@pytest.fixture
+def cohort_df():
+    return pd.DataFrame(
+        {
+            "age": [21, 35, 50, 64, 80],
+            "sex": ["male", "female", "female", "male", "male"],
+            "hospital_outcome": [1, 1, 0, 1, 0],
+        }
+    )
+
+
+def _failing_chunks(df):
+    yield df
+    raise RuntimeError("interrupted")
+
+
+# Expected use cases
+def test_matches_to_csv_output(cohort_df, tmp_path):
+    path = tmp_path / "out.csv"
+    n_rows = save_csv(cohort_df, str(path), chunk_size=2)
+
+    assert n_rows == len(cohort_df)
+    assert path.read_text() == cohort_df.to_csv(index=False)
+
+
+def test_writes_chunk_stream_and_creates_directories(cohort_df, tmp_path):
+    path = tmp_path / "nested" / "out.csv"
+    save_csv((cohort_df.iloc[i : i + 2] for i in range(0, 5, 2)), str(path))
+
+    pd.testing.assert_frame_equal(pd.read_csv(path), cohort_df)
+
+
+def test_gzip_inferred_from_extension(cohort_df, tmp_path):
+    path = tmp_path / "out.csv.gz"
+    save_csv(cohort_df, str(path), chunk_size=2)
+
+    with gzip.open(path, "rt") as f:
+        assert f.read() == cohort_df.to_csv(index=False)
+    pd.testing.assert_frame_equal(pd.read_csv(path), cohort_df)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".csv.gz"])
+def test_append_writes_header_once(cohort_df, tmp_path, suffix):
+    path = str(tmp_path / f"out{suffix}")
+    save_csv(cohort_df.iloc[:2], path)
+    save_csv(cohort_df.iloc[2:], path, append=True)
+
+    pd.testing.assert_frame_equal(pd.read_csv(path), cohort_df)
+
+
+# Edge cases
+def test_append_to_missing_file_creates_it(cohort_df, tmp_path):
+    path = str(tmp_path / "out.csv")
+    save_csv(cohort_df, path, append=True)
+
+    pd.testing.assert_frame_equal(pd.read_csv(path), cohort_df)
+
+
+def test_infer_compression():
+    assert infer_compression("a/b.csv") is None
+    assert infer_compression("a/b.csv.gz") == "gzip"
+    assert infer_compression("a/b.csv.ZST") == "zstd"
+
+
+# Error cases
+def test_interrupted_write_keeps_previous_file(cohort_df, tmp_path):
+    path = tmp_path / "out.csv"
+    save_csv(cohort_df.iloc[:2], str(path))
+    before = path.read_text()
+
+    with pytest.raises(RuntimeError):
+        save_csv(_failing_chunks(cohort_df), str(path))
+
+    assert path.read_text() == before
+    assert os.listdir(tmp_path) == ["out.csv"]
+
+
+def test_interrupted_append_is_rolled_back(cohort_df, tmp_path):
+    path = tmp_path / "out.csv"
+    save_csv(cohort_df.iloc[:2], str(path))
+    before = path.read_text()
+
+    with pytest.raises(RuntimeError):
+        save_csv(_failing_chunks(cohort_df), str(path), append=True)
+
+    assert path.read_text() == before
+
+
+def test_invalid_arguments(cohort_df, tmp_path):
+    with pytest.raises(ValueError):
+        save_csv(cohort_df, str(tmp_path / "out.csv"), compression="bz2")
+    with pytest.raises(ValueError):
+        save_csv(cohort_df, str(tmp_path / "out.csv"), chunk_size=0)
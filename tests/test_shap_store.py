@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.utils import (
+    write_shap_store,
+    open_shap_store,
+    iter_shap_store,
+    shap_importance_from_store,
+    iter_tree_shap_chunks,
+    sample_rows,
+)
+
+
+@pytest.fixture
+def shap_matrix():
+    rng = np.random.default_rng(15)
+    return rng.normal(size=(250, 3)) * np.array([2.0, 0.5, 1.0])
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "shap" / "values.shap")
+
+
+# Expected use cases
+def test_shap_store_round_trip(shap_matrix, store_path):
+    chunks = (shap_matrix[i : i + 40] for i in range(0, 250, 40))
+    write_shap_store(store_path, chunks, 250, ["age", "episode_number", "is_male"])
+
+    values, features = open_shap_store(store_path)
+
+    assert features == ["age", "episode_number", "is_male"]
+    assert values.dtype == np.float32
+    assert values.shape == (250, 3)
+    np.testing.assert_allclose(values, shap_matrix, rtol=1e-6)
+    assert sum(len(c) for c in iter_shap_store(store_path, chunk_size=100)) == 250
+
+
+def test_shap_importance_from_store(shap_matrix, store_path):
+    write_shap_store(store_path, [shap_matrix], 250, ["a", "b", "c"])
+
+    table = shap_importance_from_store(store_path, chunk_size=33)
+
+    assert table["feature"].tolist() == ["a", "c", "b"]
+    np.testing.assert_allclose(
+        table["mean_abs_shap"], np.abs(shap_matrix).mean(axis=0)[[0, 2, 1]], rtol=1e-6
+    )
+
+
+def test_batched_tree_shap_matches_single_call():
+    import shap
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(15)
+    X = rng.normal(size=(300, 3))
+    y = (X[:, 0] + rng.normal(size=300) > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=15)
+    model.fit(X, y)
+    expected = shap.TreeExplainer(model).shap_values(X)[..., 1]
+
+    serial = iter_tree_shap_chunks(model, X, chunk_size=70, verbose=False)
+    parallel = iter_tree_shap_chunks(model, X, chunk_size=70, n_jobs=2, verbose=False)
+
+    np.testing.assert_allclose(np.concatenate(list(serial)), expected)
+    np.testing.assert_allclose(np.concatenate(list(parallel)), expected)
+
+
+# Edge cases
+def test_sample_rows_caps_and_sorts():
+    rows = sample_rows(1000, 10, random_state=15)
+
+    assert len(rows) == 10
+    assert (np.diff(rows) > 0).all()
+    assert sample_rows(5, 10) is None
+
+
+# Error cases
+def test_write_shap_store_row_mismatch_raises(shap_matrix, store_path):
+    with pytest.raises(ValueError, match="Expected 300 rows"):
+        write_shap_store(store_path, [shap_matrix], 300, ["a", "b", "c"])
+
+
+def test_open_non_store_file_raises(tmp_path):
+    path = tmp_path / "not_a_store.csv"
+    path.write_text("feature,mean_abs_shap\n")
+    with pytest.raises(ValueError, match="not a SHAP store"):
+        open_shap_store(str(path))
+
+
+@pytest.mark.parametrize("n_jobs", [0, -2, 1.5])
+def test_invalid_n_jobs_raises(n_jobs):
+    from sklearn.tree import DecisionTreeClassifier
+
+    X = np.arange(20.0).reshape(10, 2)
+    model = DecisionTreeClassifier().fit(X, np.arange(10) % 2)
+    with pytest.raises(ValueError, match="n_jobs"):
+        iter_tree_shap_chunks(model, X, n_jobs=n_jobs)
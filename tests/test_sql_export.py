@@ -0,0 +1,88 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.calibration import fit_recalibrator
+from src.model_artifacts import logistic_artifact, predict_proba
+from src.sql_export import scoring_query, sqlite_parity
+
+
+def _score_in_sqlite(artifact, X):
+    with sqlite3.connect(":memory:") as conn:
+        X.to_sql("cohort", conn, index=False)
+        return pd.read_sql_query(scoring_query(artifact, "cohort"), conn)
+
+
+# Expected use cases
+def test_sql_matches_predict_proba(fitted_pipeline):
+    pipeline, X, _ = fitted_pipeline
+
+    parity = sqlite_parity(
+        logistic_artifact(pipeline), X, pipeline.predict_proba(X)[:, 1]
+    )
+
+    assert parity["passed"]
+    assert parity["rows"] == len(X)
+    assert parity["max_abs_diff"] < 1e-12
+
+
+def test_query_keeps_table_columns(fitted_pipeline):
+    pipeline, X, _ = fitted_pipeline
+
+    scored = _score_in_sqlite(logistic_artifact(pipeline), X)
+
+    assert list(scored.columns) == list(X.columns) + ["log_odds", "survival_probability"]
+    np.testing.assert_allclose(scored["log_odds"], pipeline.decision_function(X))
+
+
+@pytest.mark.parametrize("method", ["platt", "isotonic"])
+def test_recalibrated_artifact_matches(fitted_pipeline, method):
+    pipeline, X, y = fitted_pipeline
+    recalibrator = fit_recalibrator(pipeline.decision_function(X), y, method)
+    artifact = logistic_artifact(pipeline, recalibrator)
+
+    parity = sqlite_parity(artifact, X, predict_proba(artifact, X)[:, 1])
+
+    assert parity["passed"]
+
+
+# Edge cases
+def test_unknown_or_missing_values_score_null(fitted_pipeline):
+    pipeline, X, _ = fitted_pipeline
+    X = X[:3].astype({"age": float}).assign(sex=["male", "other", None])
+    X.loc[0, "age"] = np.nan
+
+    scored = _score_in_sqlite(logistic_artifact(pipeline), X)
+
+    assert scored["survival_probability"].isna().all()
+
+
+def test_schema_qualified_table(fitted_pipeline):
+    pipeline, _, _ = fitted_pipeline
+
+    query = scoring_query(logistic_artifact(pipeline), "warehouse.cohort")
+
+    assert 'FROM "warehouse"."cohort" AS src' in query
+
+
+# Error cases
+def test_parity_failure_is_reported(fitted_pipeline):
+    pipeline, X, _ = fitted_pipeline
+
+    parity = sqlite_parity(
+        logistic_artifact(pipeline), X, pipeline.predict_proba(X)[:, 1] + 1e-6
+    )
+
+    assert not parity["passed"]
+
+
+def test_only_logistic_artifacts(fitted_pipeline):
+    pipeline, _, _ = fitted_pipeline
+    artifact = dict(logistic_artifact(pipeline), family=np.array("random_forest"))
+
+    with pytest.raises(ValueError):
+        scoring_query(artifact)
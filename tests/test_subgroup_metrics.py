@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import precision_score, recall_score, roc_auc_score
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from src.utils import MISSING_GROUP, compute_subgroup_metrics
+
+SLICES = [(), ("sex",), ("band",), ("sex", "band")]
+
+
+@pytest.fixture
+def scored_df():
+    rng = np.random.default_rng(15)
+    n = 3000
+    df = pd.DataFrame(
+        {
+            "sex": rng.choice(["male", "female"], size=n),
+            "band": pd.Categorical(
+                rng.choice(["young", "old"], size=n), categories=["young", "old"]
+            ),
+            # Rounded scores, so ties within subgroups are common
+            "score": np.round(rng.random(n), 2),
+        }
+    )
+    df["outcome"] = (rng.random(n) < df["score"]).astype(int)
+    return df
+
+
+def _subgroup(df, row):
+    mask = np.ones(len(df), dtype=bool)
+    for column in ["sex", "band"]:
+        if not pd.isna(row[column]):
+            mask &= (df[column] == row[column]).to_numpy()
+    return df[mask]
+
+
+# Expected use cases
+def test_metrics_match_sklearn_per_subgroup(scored_df):
+    metrics = compute_subgroup_metrics(scored_df, SLICES, "outcome", "score")
+
+    assert list(metrics["slice"].unique()) == ["overall", "sex", "band", "sex x band"]
+    assert len(metrics) == 1 + 2 + 2 + 4
+    for _, row in metrics.iterrows():
+        sub = _subgroup(scored_df, row)
+        predicted = sub["score"] > 0.5
+        assert row["n"] == len(sub)
+        assert row["n_positive"] == sub["outcome"].sum()
+        assert row["auc"] == pytest.approx(roc_auc_score(sub["outcome"], sub["score"]))
+        assert row["precision"] == pytest.approx(
+            precision_score(sub["outcome"], predicted)
+        )
+        assert row["recall"] == pytest.approx(recall_score(sub["outcome"], predicted))
+        assert row["calibration_error"] == pytest.approx(
+            sub["score"].mean() - sub["outcome"].mean()
+        )
+
+
+def test_categorical_levels_keep_their_order(scored_df):
+    metrics = compute_subgroup_metrics(scored_df, [("band",)], "outcome", "score")
+
+    assert list(metrics["band"]) == ["young", "old"]
+
+
+# Edge cases
+def test_single_class_subgroup_has_nan_auc(scored_df):
+    scored_df.loc[scored_df["sex"] == "male", "outcome"] = 1
+
+    metrics = compute_subgroup_metrics(scored_df, [("sex",)], "outcome", "score")
+
+    male = metrics.set_index("sex").loc["male"]
+    assert np.isnan(male["auc"])
+    male_scores = scored_df.loc[scored_df["sex"] == "male", "score"]
+    assert male["recall"] == pytest.approx((male_scores > 0.5).mean())
+
+
+def test_empty_crossings_are_dropped(scored_df):
+    male_old = (scored_df["sex"] == "male") & (scored_df["band"] == "old")
+    scored_df = scored_df[~male_old]
+
+    metrics = compute_subgroup_metrics(scored_df, [("sex", "band")], "outcome", "score")
+
+    assert len(metrics) == 3
+    assert (metrics["n"] > 0).all()
+
+
+def test_missing_group_values_form_their_own_subgroup(scored_df):
+    scored_df["band"] = scored_df["band"].astype(object)
+    scored_df.loc[:99, "band"] = np.nan
+    scored_df.loc[:49, "sex"] = None
+
+    metrics = compute_subgroup_metrics(scored_df, SLICES, "outcome", "score")
+
+    band = metrics[metrics["slice"] == "band"].set_index("band")
+    assert list(band.index) == ["old", "young", MISSING_GROUP]
+    assert band.loc[MISSING_GROUP, "n"] == 100
+    crossed = metrics[metrics["slice"] == "sex x band"]
+    both_missing = (crossed[["sex", "band"]] == MISSING_GROUP).all(axis=1)
+    assert crossed.loc[both_missing, "n"].item() == 50
+    assert crossed["n"].sum() == len(scored_df)
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import src.synthetic_cohort as sc
+from src.synthetic_cohort import (
+    CHUNKS_PER_WORKER,
+    DISTRIBUTION_COLUMNS,
+    MIN_CELL_COUNT,
+    RAW_COLUMNS,
+    SMOOTHING,
+    fit_cohort_distribution,
+    iter_cohort_chunks,
+    write_cohort,
+)
+
+
+@pytest.fixture
+def reference_file(tmp_path):
+    rng = np.random.default_rng(15)
+    n = 2000
+    age = rng.integers(0, 100, size=n)
+    df = pd.DataFrame(
+        {
+            "age_years": age,
+            "sex_0male_1female": rng.integers(0, 2, size=n),
+            "episode_number": rng.integers(1, 4, size=n),
+            # Outcome depends on age, so the joint matters
+            "hospital_outcome_1alive_0dead": (age < 80).astype(int),
+        }
+    )
+    path = tmp_path / "reference.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+# Expected use cases
+def test_fit_cohort_distribution_sums_to_one(reference_file):
+    distribution = fit_cohort_distribution([reference_file])
+
+    assert list(distribution.columns) == DISTRIBUTION_COLUMNS + ["probability"]
+    assert distribution["probability"].sum() == pytest.approx(1.0)
+    # Every cell of the grid keeps at least the smoothing floor
+    floor = SMOOTHING / len(distribution)
+    assert (distribution["probability"] >= floor * (1 - 1e-9)).all()
+
+
+def test_generated_cohort_keeps_joint_structure(reference_file):
+    distribution = fit_cohort_distribution([reference_file])
+
+    cohort = pd.concat(iter_cohort_chunks(distribution, 5000, chunk_size=1000))
+
+    assert len(cohort) == 5000
+    assert list(cohort.columns) == RAW_COLUMNS
+    old = cohort["age_years"] >= 80
+    # Only the smoothing mass breaks the joint structure
+    assert (cohort.loc[old, "hospital_outcome_1alive_0dead"] == 0).mean() > 0.95
+    assert (cohort.loc[~old, "hospital_outcome_1alive_0dead"] == 1).mean() > 0.95
+
+
+def test_rare_records_do_not_change_the_distribution(reference_file, tmp_path):
+    reference = pd.read_csv(reference_file)
+    rare = pd.DataFrame(
+        [[97, 1, 9, 1]] * (MIN_CELL_COUNT - 1), columns=reference.columns
+    )
+    with_rare = tmp_path / "with_rare.csv"
+    pd.concat([reference, rare]).to_csv(with_rare, index=False)
+
+    distribution = fit_cohort_distribution([reference_file])
+    rare_distribution = fit_cohort_distribution([str(with_rare)])
+
+    # The rare cell is suppressed, so only the normalization shifts
+    np.testing.assert_allclose(
+        rare_distribution["probability"],
+        distribution["probability"],
+        rtol=MIN_CELL_COUNT / len(reference),
+    )
+    cohort = pd.concat(iter_cohort_chunks(rare_distribution, 5000, chunk_size=5000))
+    assert not ((cohort["age_years"] == 97) & (cohort["episode_number"] == 9)).any()
+
+
+# Edge cases
+def test_generation_is_deterministic_across_workers(reference_file):
+    distribution = fit_cohort_distribution([reference_file])
+
+    serial = pd.concat(iter_cohort_chunks(distribution, 3000, chunk_size=700, seed=1))
+    parallel = pd.concat(
+        iter_cohort_chunks(distribution, 3000, chunk_size=700, seed=1, n_jobs=2)
+    )
+
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_write_cohort_csv_round_trip(reference_file, tmp_path):
+    distribution = fit_cohort_distribution([reference_file])
+    output = str(tmp_path / "synthetic" / "cohort.csv")
+
+    write_cohort(distribution, 2500, output, chunk_size=1000)
+
+    written = pd.read_csv(output)
+    assert list(written.columns) == RAW_COLUMNS
+    assert len(written) == 2500
+
+
+def test_chunks_in_flight_stay_bounded(reference_file, monkeypatch):
+    submitted = []
+
+    class CountingPool(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            submitted.append(args[1])
+            return super().submit(fn, *args)
+
+    monkeypatch.setattr(sc, "ProcessPoolExecutor", CountingPool)
+    distribution = fit_cohort_distribution([reference_file])
+
+    consumed = 0
+    for chunk in iter_cohort_chunks(distribution, 2000, chunk_size=50, n_jobs=2):
+        consumed += 1
+        assert len(submitted) - consumed < 2 * CHUNKS_PER_WORKER
+
+    assert consumed == len(submitted) == 40
+
+
+# Error cases
+def test_write_cohort_unknown_format_raises(reference_file, tmp_path):
+    distribution = fit_cohort_distribution([reference_file])
+
+    with pytest.raises(ValueError, match="Output format must be one of"):
+        write_cohort(distribution, 10, str(tmp_path / "x"), output_format="xlsx")